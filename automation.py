@@ -0,0 +1,195 @@
+"""
+Parameter automation: timed ramps of continuous TriCaster controls.
+
+A fade or a manual T-bar move is a stream of small writes. ``Ramp`` produces
+one value per frame from an easing curve, and never queues: if the previous
+write hasn't been answered when the next frame comes round, that frame is
+skipped and the one after it sends the then-current value. A slow unit costs
+smoothness, never lag. The exact end value is always sent last.
+
+``Automation`` keeps one ramp per parameter: starting a new ramp on a parameter
+stops the one already running there. It also keeps reports of recent ramps.
+"""
+
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+
+def _ease_in_out_sine(t: float) -> float:
+    return -(math.cos(math.pi * t) - 1) / 2
+
+
+EASINGS: dict[str, Callable[[float], float]] = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 3,
+    "ease_in_out": lambda t: 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2,
+    "sine": _ease_in_out_sine,
+    "smoothstep": lambda t: t * t * (3 - 2 * t),
+}
+
+_BEZIER = re.compile(r"cubic-bezier\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)")
+
+
+def easing(spec: str) -> Callable[[float], float]:
+    """A named curve from EASINGS, or a CSS-style 'cubic-bezier(x1, y1, x2, y2)'. Raises ValueError."""
+    if spec in EASINGS:
+        return EASINGS[spec]
+    match = _BEZIER.fullmatch(spec.strip())
+    if match is None:
+        raise ValueError(f"unknown easing {spec!r}; use one of {', '.join(EASINGS)} or cubic-bezier(x1, y1, x2, y2)")
+    x1, y1, x2, y2 = map(float, match.groups())
+    if not (0 <= x1 <= 1 and 0 <= x2 <= 1):
+        raise ValueError("cubic-bezier x values must be between 0 and 1")
+    return _cubic_bezier(x1, y1, x2, y2)
+
+
+def _cubic_bezier(x1: float, y1: float, x2: float, y2: float) -> Callable[[float], float]:
+    def coord(t: float, a: float, b: float) -> float:
+        return 3 * a * t * (1 - t) ** 2 + 3 * b * t * t * (1 - t) + t ** 3
+
+    def curve(x: float) -> float:
+        # x(t) is monotonic for x1, x2 in [0, 1], so bisection always converges.
+        lo, hi = 0.0, 1.0
+        for _ in range(30):
+            mid = (lo + hi) / 2
+            if coord(mid, x1, x2) < x:
+                lo = mid
+            else:
+                hi = mid
+        return coord((lo + hi) / 2, y1, y2)
+
+    return curve
+
+
+@dataclass
+class RampReport:
+    """How a finished (or stopped) ramp went."""
+
+    parameter: str
+    start: float
+    end: float
+    duration: float
+    easing: str
+    frame_rate: float
+    status: str = "running"  # running, done, stopped, failed
+    updates: int = 0
+    skipped: int = 0  # frames dropped because the previous write was still in flight
+    errors: int = 0
+    last_error: str | None = None
+    elapsed: float = 0.0  # from start until the final value was acknowledged
+    overshoot: float = 0.0  # furthest any sent value went past the end value
+
+    @property
+    def rate(self) -> float:
+        """Achieved writes per second."""
+        return self.updates / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def overrun(self) -> float:
+        """Seconds the final value landed after the planned end."""
+        return max(self.elapsed - self.duration, 0.0)
+
+
+class Ramp:
+    """Drive one parameter from ``start`` to ``end`` over ``duration`` seconds."""
+
+    def __init__(
+        self,
+        parameter: str,
+        start: float,
+        end: float,
+        duration: float,
+        curve: str,
+        send: Callable[[float], Awaitable[object]],
+        rate: float,
+    ):
+        if not rate > 0:
+            raise ValueError(f"frame rate must be positive, not {rate:g}")
+        self.curve = easing(curve)
+        self.send = send
+        self.rate = rate
+        self.report = RampReport(parameter, start, end, max(duration, 0.0), curve, rate)
+        self._inflight: asyncio.Task | None = None
+
+    def value_at(self, elapsed: float) -> float:
+        r = self.report
+        progress = min(elapsed / r.duration, 1.0) if r.duration else 1.0
+        return r.start + (r.end - r.start) * self.curve(progress)
+
+    async def run(self) -> RampReport:
+        r = self.report
+        began = time.monotonic()
+        frame = 1 / self.rate
+        try:
+            tick = 0
+            while True:
+                now = time.monotonic()
+                if now - began >= r.duration:
+                    break
+                if self._inflight is None or self._inflight.done():
+                    self._inflight = asyncio.create_task(self._send(self.value_at(now - began)))
+                else:
+                    r.skipped += 1
+                tick += 1
+                await asyncio.sleep(max(began + tick * frame - time.monotonic(), 0))
+            if self._inflight is not None:
+                await self._inflight
+            # Done only once the end value itself is in; a ramp that never got there failed.
+            r.status = "done" if await self._send(r.end) else "failed"
+        except asyncio.CancelledError:
+            r.status = "stopped"
+            if self._inflight is not None:
+                self._inflight.cancel()
+            raise
+        finally:
+            r.elapsed = time.monotonic() - began
+        return r
+
+    async def _send(self, value: float) -> bool:
+        r = self.report
+        try:
+            await self.send(value)
+        except Exception as e:
+            r.errors += 1
+            r.last_error = f"{type(e).__name__}: {e}"
+            return False
+        r.updates += 1
+        past = (value - r.end) * (1 if r.end >= r.start else -1)
+        r.overshoot = max(r.overshoot, past)
+        return True
+
+
+class Automation:
+    """Runs ramps, at most one per parameter, and remembers recent reports."""
+
+    def __init__(self, history: int = 20):
+        self.running: dict[str, tuple[Ramp, asyncio.Task]] = {}
+        self.history: deque[RampReport] = deque(maxlen=history)
+
+    def start(self, ramp: Ramp) -> asyncio.Task:
+        """Run ``ramp`` in the background, stopping any ramp already driving the same parameter."""
+        self.stop(ramp.report.parameter)
+        task = asyncio.create_task(ramp.run())
+        parameter = ramp.report.parameter
+        self.running[parameter] = (ramp, task)
+
+        def finished(_: asyncio.Task) -> None:
+            if self.running.get(parameter, (None, None))[1] is task:
+                del self.running[parameter]
+            self.history.append(ramp.report)
+
+        task.add_done_callback(finished)
+        return task
+
+    def stop(self, parameter: str | None = None) -> int:
+        """Stop the ramp on ``parameter`` (every ramp if None). Returns how many were stopped."""
+        targets = list(self.running) if parameter is None else [parameter] if parameter in self.running else []
+        for name in targets:
+            self.running.pop(name)[1].cancel()
+        return len(targets)
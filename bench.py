@@ -0,0 +1,517 @@
+"""
+Benchmarks for the TriCaster MCP server.
+
+Runs against the local TriCaster simulator (simulator.py) so no hardware is needed:
+
+    uv run python bench.py concurrency --calls 20 --delay 0.2
+    uv run python bench.py concurrency --http10   # simulate an HTTP/1.0-only unit
+    uv run python bench.py xml --elements 10000   # tree vs streaming XML parsing
+    uv run python bench.py tools --json results.json   # per-tool cold/warm latency
+    uv run python bench.py priority --readers 24   # cut latency while file listings flood the pool
+    uv run python bench.py faults --drop 0.01      # tail latency with hedging, time-to-fail with the breaker
+    uv run python bench.py media --files 20000     # media index crawl, incremental refresh and search
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from simulator import SimulatedShow, Simulator
+
+
+def _point_server_at(simulator: Simulator):
+    """Import server.py configured to talk to ``simulator``."""
+    for name in ("TRICASTER_HOSTS", "TRICASTER_GROUPS", "TRICASTER_DEFAULT_HOST"):
+        os.environ.pop(name, None)
+    os.environ["TRICASTER_HOST"] = "127.0.0.1"
+    os.environ["TRICASTER_PORT"] = str(simulator.port)
+    import server
+
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Concurrency and connection reuse
+# ---------------------------------------------------------------------------
+
+async def bench_concurrency(calls: int, delay: float, jitter: float, http10: bool) -> None:
+    """Show that concurrent tool calls overlap instead of queueing behind each other."""
+    async with Simulator(latency=delay, jitter=jitter, http10=http10, timecode_interval=0) as simulator:
+        server = _point_server_at(simulator)
+        start = time.perf_counter()
+        for _ in range(calls):
+            await server.call_tool("get_tally", {"fresh": True})
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(server.call_tool("get_tally", {"fresh": True}) for _ in range(calls)))
+        concurrent = time.perf_counter() - start
+        await server._default_unit.client.close()
+
+    mode = "HTTP/1.0" if http10 else "keep-alive"
+    print(f"{calls} x get_tally against a simulated {mode} TriCaster with {delay * 1000:.0f} ms latency")
+    print(f"  sequential: {sequential * 1000:8.1f} ms")
+    print(f"  concurrent: {concurrent * 1000:8.1f} ms  ({sequential / concurrent:.1f}x overlap, "
+          f"pool size {server._default_unit.client.max_connections})")
+    print("  connections: " + ", ".join(f"{k}={v}" for k, v in server._default_unit.client.stats.items()))
+
+
+# ---------------------------------------------------------------------------
+# Priority lanes
+# ---------------------------------------------------------------------------
+
+async def bench_priority(readers: int, cuts: int, delay: float, files: int) -> None:
+    """Cut latency and per-lane queue wait while bulk file listings keep every connection busy."""
+    import transport
+    from metrics import Metrics
+
+    show = SimulatedShow(files=files)
+    async with Simulator(show, latency=delay, timecode_interval=0, seed=1) as simulator:
+        server = _point_server_at(simulator)
+        unit = server._default_unit
+        client = unit.client
+        print(f"{cuts} cuts while {readers} concurrent browse_media loops ({files} clips) run against a "
+              f"{delay * 1000:.0f} ms TriCaster, pool size {client.max_connections}")
+        for label, lanes, classify in (
+            ("single queue", transport._Lanes(client.max_connections, 0, client.max_connections), None),
+            ("priority lanes", transport._Lanes(client.max_connections, server.RESERVED_CONNECTIONS,
+                                                client.max_connections // 2), server._request_priority),
+        ):
+            client._lanes, client.classify = lanes, classify
+            unit.metrics = client.metrics = Metrics()
+            stop = asyncio.Event()
+
+            async def flood():
+                while not stop.is_set():
+                    await server.call_tool("browse_media", {"fresh": True})
+
+            flooding = [asyncio.create_task(flood()) for _ in range(readers)]
+            await asyncio.sleep(delay * 3)
+            latencies = []
+            for _ in range(cuts):
+                start = time.perf_counter()
+                await server.call_tool("cut_transition", {})
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+            stop.set()
+            await asyncio.gather(*flooding)
+            latencies.sort()
+            print(f"  {label}: cut p50 {_percentile(latencies, 50) * 1000:.1f} / "
+                  f"p95 {_percentile(latencies, 95) * 1000:.1f} / max {latencies[-1] * 1000:.1f} ms")
+            for lane, h in sorted(client.metrics.queue_wait.items()):
+                print(f"    queue wait {lane:6s}: {h.count:5d} requests, p50 {h.quantile(0.5) * 1000:7.1f} / "
+                      f"p95 {h.quantile(0.95) * 1000:7.1f} / max {h.max * 1000:7.1f} ms")
+        await client.close()
+
+
+# ---------------------------------------------------------------------------
+# Dropped and slow responses
+# ---------------------------------------------------------------------------
+
+async def bench_faults(reads: int, drop: float, slow: float, slow_delay: float, delay: float) -> None:
+    """Read tail latency with and without hedging, then time-to-fail and recovery when the unit goes away."""
+    import transport
+
+    async with Simulator(latency=delay, timecode_interval=0, seed=1, drop=drop, slow=slow,
+                         slow_delay=slow_delay) as simulator:
+        server = _point_server_at(simulator)
+        client = server._default_unit.client
+        print(f"{reads} fresh get_tally reads, 8 at a time, against a {delay * 1000:.0f} ms TriCaster that drops "
+              f"{drop:.0%} of responses and delays {slow:.0%} by {slow_delay:g} s (timeout {client.timeout:g} s)")
+        for label, hedge in (("no hedging", None), ("hedged", server._hedgeable)):
+            client.hedge = hedge
+            client.stats.update(hedged=0, hedge_wins=0)
+            latencies, errors = [], 0
+            gate = asyncio.Semaphore(8)
+
+            async def read():
+                nonlocal errors
+                async with gate:
+                    start = time.perf_counter()
+                    text = (await server.call_tool("get_tally", {"fresh": True}))[0].text
+                    latencies.append(time.perf_counter() - start)
+                    errors += text.startswith("Error")
+
+            await asyncio.gather(*(read() for _ in range(reads)))
+            latencies.sort()
+            print(f"  {label:10s}: p50 {_percentile(latencies, 50) * 1000:7.1f} / p95 "
+                  f"{_percentile(latencies, 95) * 1000:7.1f} / p99 {_percentile(latencies, 99) * 1000:7.1f} / "
+                  f"max {latencies[-1] * 1000:7.1f} ms, {errors} errors, {client.stats['hedged']} hedges "
+                  f"({client.stats['hedge_wins']} won)")
+
+        simulator.drop = simulator.slow = 0
+        simulator.offline = True
+        print(f"unit goes offline; cut_transition calls (on-air deadline {server.ON_AIR_DEADLINE:g} s):")
+        for i in range(6):
+            start = time.perf_counter()
+            text = (await server.call_tool("cut_transition", {}))[0].text
+            print(f"  call {i + 1}: failed after {(time.perf_counter() - start) * 1000:7.1f} ms"
+                  f"{' (circuit open)' if 'failing fast' in text else ''}")
+        simulator.offline = False
+        back = time.perf_counter()
+        while client.circuit_open:
+            await asyncio.sleep(0.01)
+        print(f"  unit back: breaker closed by the probe after {(time.perf_counter() - back) * 1000:.0f} ms")
+        await client.close()
+        print(f"without deadlines or breaker each of those calls would wait the full {client.timeout:g} s; "
+              f"probe interval starts at {transport.BREAKER_PROBE_INTERVAL[0]:g} s")
+
+
+# ---------------------------------------------------------------------------
+# Media index
+# ---------------------------------------------------------------------------
+
+async def bench_media(files: int, delay: float) -> None:
+    """Crawl time by parallelism, incremental refresh cost, and search latency per mode."""
+    from media_index import MediaIndex
+
+    show = SimulatedShow(files=files, nested=True)
+    async with Simulator(show, latency=delay, timecode_interval=0) as simulator:
+        server = _point_server_at(simulator)
+        client = server._default_unit.client
+
+        def fetch(key: str):
+            return client.get(f"/v1/dictionary?key={server.quote(key)}")
+
+        print(f"{files} clips in {files // 100 + 1} folders, one level listed per request, "
+              f"{delay * 1000:.0f} ms latency")
+        for concurrency in (1, 4, 8):
+            index = MediaIndex(fetch, concurrency)
+            report = await index.refresh()
+            print(f"  crawl, {concurrency} at a time: {report.elapsed * 1000:7.1f} ms for {report.fetched} folders")
+        show.files.append((show.files[-1][0].rpartition("\\")[0] + "\\River Bridge.mov", "River Bridge"))
+        show.changed({"filebrowser"})
+        report = await index.refresh()
+        print(f"  refresh after adding one clip: {report.elapsed * 1000:7.1f} ms, {report.fetched} fetched, "
+              f"{report.skipped} skipped, {report.changed} re-indexed")
+        queries = (("prefix", "river"), ("substring", "iver bri"), ("fuzzy", "rivr brige"), ("auto", "clip 12"))
+        for mode, query in queries:
+            index.search(query, mode)  # build lazy structures
+            start = time.perf_counter()
+            for _ in range(20):
+                rows, _, total = index.search(query, mode, limit=5)
+            print(f"  search {mode:9s} {query!r:13s}: {(time.perf_counter() - start) / 20 * 1000:6.2f} ms, "
+                  f"{total} matches, first {rows[0][0].name!r}")
+        await client.close()
+
+
+# ---------------------------------------------------------------------------
+# XML parsing
+# ---------------------------------------------------------------------------
+
+async def _measure(fn, repeat: int = 3) -> tuple[float, float]:
+    """Return (best-of-``repeat`` milliseconds, peak traced MiB) for ``fn``.
+
+    Timing runs untraced because tracemalloc slows allocation-heavy code
+    several-fold; peak memory comes from one extra traced run.
+    """
+
+    async def run():
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024)
+
+
+async def bench_xml(elements: int) -> None:
+    """Compare full-tree parsing with the streaming scanner on large simulated dictionaries."""
+    from shortcut_states import ShortcutStates
+    from xmlstream import scan_text
+
+    show = SimulatedShow(shortcuts=elements, files=elements)
+    first, last = next(iter(show.shortcuts)), next(reversed(show.shortcuts))
+    states_text, files_text = show.dictionary("shortcut_states"), show.dictionary("filebrowser")
+    states_size, files_size = len(states_text.encode()), len(files_text.encode())
+
+    def tree_states():
+        {el.get("name"): el.get("value") for el in ET.fromstring(states_text)}
+
+    def tree_files():
+        [(el.get("name"), el.get("path")) for el in ET.fromstring(files_text).iter("file")]
+
+    async def shortcut_via_tree(name: str):
+        root = ET.fromstring(await server.dictionary("shortcut_states", fresh=True))
+        return next((el.get("value") for el in root if el.get("name") == name), None)
+
+    async def files_via_tree():
+        root = ET.fromstring(await server.dictionary("filebrowser", fresh=True))
+        return [(el.get("name"), el.get("path")) for el in root.iter("file")]
+
+    rows = [
+        (f"shortcut_states ({states_size // 1024} KiB)", "ET.fromstring tree", await _measure(tree_states)),
+        ("", "streaming scanner", await _measure(lambda: ShortcutStates.from_xml(states_text))),
+        (f"filebrowser ({files_size // 1024} KiB)", "ET.fromstring tree", await _measure(tree_files)),
+        ("", "streaming scanner", await _measure(lambda: list(scan_text(files_text, {"file"})))),
+    ]
+    async with Simulator(show, timecode_interval=0) as simulator:
+        server = _point_server_at(simulator)
+        await server._default_unit.client.get("/v1/version")  # warm the pool
+        rows += [
+            ("last shortcut over HTTP", "download + tree", await _measure(lambda: shortcut_via_tree(last))),
+            ("", "stream + scan", await _measure(lambda: server._scan_shortcut_value(last))),
+            ("first shortcut over HTTP", "download + tree", await _measure(lambda: shortcut_via_tree(first))),
+            ("", "stream + early stop", await _measure(lambda: server._scan_shortcut_value(first))),
+            ("filebrowser over HTTP", "download + tree", await _measure(files_via_tree)),
+            ("", "stream + scan", await _measure(lambda: server._browse_media_stream("filebrowser"))),
+        ]
+        await server._default_unit.client.close()
+
+    print(f"XML parsing, {elements} elements per document")
+    print(f"  {'document':<28} {'method':<22} {'time ms':>9} {'peak MiB':>9}")
+    for doc, method, (ms, mib) in rows:
+        print(f"  {doc:<28} {method:<22} {ms:9.1f} {mib:9.2f}")
+
+
+# ---------------------------------------------------------------------------
+# Per-tool latency
+# ---------------------------------------------------------------------------
+
+# Arguments used when benchmarking a tool. Tools not listed here get one built
+# from their schema (first enum value, or a placeholder per JSON type).
+_SAMPLE_ARGS: dict[str, dict] = {
+    "switch_program": {"source": "input2"},
+    "switch_preview": {"source": "input3"},
+    "set_transition_effect": {"effect": "Dissolve"},
+    "set_audio_mute": {"channel": "input1", "mute": False},
+    "set_audio_volume": {"channel": "input1", "volume": -3},
+    "browse_media": {"path": "d:\\media\\clips\\folder0"},
+    "run_macro": {"name": "Macro 1"},
+    "send_shortcut": {"name": "main_background_cut"},
+    "get_dictionary": {"key": "switcher"},
+    "set_datalink": {"key": "score_home", "value": "3"},
+    "run_batch": {
+        "steps": [
+            {"op": "send_shortcut", "name": "main_b_row_named_input", "value": "input4"},
+            {"op": "send_shortcut", "name": "main_background_auto"},
+            {"op": "set_datalink", "key": "lower_third", "value": "Guest"},
+        ]
+    },
+}
+
+_PLACEHOLDERS = {"string": "input1", "integer": 1, "number": 0, "boolean": True, "array": [], "object": {}}
+
+
+def _sample_args(tool) -> dict:
+    if tool.name in _SAMPLE_ARGS:
+        return dict(_SAMPLE_ARGS[tool.name])
+    properties = tool.inputSchema.get("properties", {})
+    return {
+        name: properties[name]["enum"][0] if "enum" in properties[name] else _PLACEHOLDERS[properties[name]["type"]]
+        for name in tool.inputSchema.get("required", [])
+    }
+
+
+class _ParseTimer:
+    """Accumulate time spent inside the XML parsers while installed."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._patched: list[tuple[object, str, object]] = []
+
+    def _wrap(self, owner, attr: str) -> None:
+        original = getattr(owner, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+
+        self._patched.append((owner, attr, original))
+        setattr(owner, attr, timed)
+
+    def __enter__(self) -> "_ParseTimer":
+        from xmlstream import ElementScanner
+
+        self._wrap(ET, "fromstring")
+        self._wrap(ElementScanner, "feed")
+        self._wrap(ElementScanner, "close")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+async def bench_tools(
+    iterations: int,
+    latency: float,
+    jitter: float,
+    http10: bool,
+    fresh: bool,
+    notifications: bool,
+    shortcuts: int,
+    files: int,
+) -> dict:
+    """Run every listed tool through call_tool: once cold (empty cache and pool), then ``iterations`` warm."""
+    show = SimulatedShow(shortcuts=shortcuts, files=files)
+    async with Simulator(show, latency=latency, jitter=jitter, http10=http10, timecode_interval=0, seed=1) as sim:
+        server = _point_server_at(sim)
+        if notifications:
+            server._default_unit.mirror.start()
+            await asyncio.sleep(0.1)
+        results = {}
+        for tool in await server.list_tools():
+            args = _sample_args(tool)
+            if fresh and "fresh" in tool.inputSchema["properties"]:
+                args["fresh"] = True
+            await server._default_unit.client.close()
+            server._invalidate_all()
+            opened = server._default_unit.client.stats["connections_opened"]
+            samples, parse_ms, sent, requests, errors = [], [], [], [], 0
+            for _ in range(iterations + 1):
+                bytes_before, requests_before = sim.stats["bytes_sent"], sim.stats["requests"]
+                with _ParseTimer() as parse:
+                    start = time.perf_counter()
+                    text = (await server.call_tool(tool.name, args))[0].text
+                    samples.append((time.perf_counter() - start) * 1000)
+                errors += text.startswith(("Error communicating", "Unknown tool"))
+                parse_ms.append(parse.seconds * 1000)
+                sent.append(sim.stats["bytes_sent"] - bytes_before)
+                requests.append(sim.stats["requests"] - requests_before)
+            warm = sorted(samples[1:])
+            results[tool.name] = {
+                "args": args,
+                "cold_ms": round(samples[0], 3),
+                "p50_ms": round(_percentile(warm, 50), 3),
+                "p95_ms": round(_percentile(warm, 95), 3),
+                "p99_ms": round(_percentile(warm, 99), 3),
+                "mean_ms": round(sum(warm) / len(warm), 3),
+                "parse_ms_cold": round(parse_ms[0], 3),
+                "parse_ms_mean": round(sum(parse_ms[1:]) / iterations, 3),
+                "bytes_cold": sent[0],
+                "bytes_mean": round(sum(sent[1:]) / iterations, 1),
+                "requests_cold": requests[0],
+                "requests_mean": round(sum(requests[1:]) / iterations, 3),
+                "connections_opened": server._default_unit.client.stats["connections_opened"] - opened,
+                "errors": errors,
+            }
+        await server._default_unit.mirror.stop()
+        await server._default_unit.client.close()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "latency_s": latency,
+            "jitter_s": jitter,
+            "http10": http10,
+            "fresh": fresh,
+            "notifications": notifications,
+            "shortcuts": shortcuts,
+            "files": files,
+        },
+        "tools": results,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _print_tools(report: dict) -> None:
+    meta = report["meta"]
+    print(f"{len(report['tools'])} tools x {meta['iterations']} warm calls, simulated latency "
+          f"{meta['latency_s'] * 1000:.0f} ms + up to {meta['jitter_s'] * 1000:.0f} ms jitter"
+          + (", fresh reads" if meta["fresh"] else "") + (", notifications on" if meta["notifications"] else ""))
+    print(f"  {'tool':<22} {'cold':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'parse':>7} {'bytes':>8} {'req':>5} {'conn':>4}")
+    for name, r in report["tools"].items():
+        flag = "  ERR" if r["errors"] else ""
+        print(f"  {name:<22} {r['cold_ms']:8.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['parse_ms_mean']:7.2f} {r['bytes_mean']:8.0f} {r['requests_mean']:5.2f} "
+              f"{r['connections_opened']:4d}{flag}")
+    print("  times in ms; parse, bytes and req are warm means per call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="bench", required=True)
+    conc = sub.add_parser("concurrency", help="sequential vs concurrent tool calls and connection reuse")
+    conc.add_argument("--calls", type=int, default=20, help="number of tool calls to issue")
+    conc.add_argument("--delay", type=float, default=0.2, help="simulated TriCaster latency in seconds")
+    conc.add_argument("--jitter", type=float, default=0.0, help="extra random latency of up to this many seconds")
+    conc.add_argument("--http10", action="store_true", help="simulate an HTTP/1.0 unit without keep-alive")
+    xml = sub.add_parser("xml", help="tree vs streaming parsing of large dictionaries")
+    xml.add_argument("--elements", type=int, default=10_000, help="shortcuts and clips in the simulated dictionaries")
+    tools = sub.add_parser("tools", help="cold and warm latency of every tool, optionally saved as JSON")
+    tools.add_argument("--iterations", type=int, default=50, help="warm calls per tool")
+    tools.add_argument("--latency", type=float, default=0.005, help="simulated TriCaster latency in seconds")
+    tools.add_argument("--jitter", type=float, default=0.002, help="extra random latency of up to this many seconds")
+    tools.add_argument("--http10", action="store_true", help="simulate an HTTP/1.0 unit without keep-alive")
+    tools.add_argument("--fresh", action="store_true", help="pass fresh=true to every tool that accepts it")
+    tools.add_argument("--notifications", action="store_true", help="serve reads from the change-notification mirror")
+    tools.add_argument("--shortcuts", type=int, default=500, help="extra entries in shortcut_states")
+    tools.add_argument("--files", type=int, default=500, help="clips in the filebrowser listing")
+    tools.add_argument("--json", metavar="PATH", help="write the results to PATH ('-' for stdout)")
+    prio = sub.add_parser("priority", help="cut latency while bulk file listings saturate the connection pool")
+    prio.add_argument("--readers", type=int, default=24, help="concurrent browse_media loops")
+    prio.add_argument("--cuts", type=int, default=40, help="cut_transition calls to time")
+    prio.add_argument("--delay", type=float, default=0.05, help="simulated TriCaster latency in seconds")
+    prio.add_argument("--files", type=int, default=2000, help="clips in the filebrowser listing")
+    faults = sub.add_parser("faults", help="tail latency and time-to-fail against a lossy or vanished unit")
+    faults.add_argument("--reads", type=int, default=400, help="fresh get_tally calls per run")
+    faults.add_argument("--drop", type=float, default=0.01, help="fraction of responses never sent")
+    faults.add_argument("--slow", type=float, default=0.02, help="fraction of responses delayed")
+    faults.add_argument("--slow-delay", type=float, default=1.0, help="extra seconds for delayed responses")
+    faults.add_argument("--delay", type=float, default=0.01, help="simulated TriCaster latency in seconds")
+    media = sub.add_parser("media", help="media index crawl, incremental refresh and search latency")
+    media.add_argument("--files", type=int, default=20_000, help="clips in the simulated library")
+    media.add_argument("--delay", type=float, default=0.01, help="simulated TriCaster latency in seconds")
+    args = parser.parse_args()
+    if args.bench == "concurrency":
+        asyncio.run(bench_concurrency(args.calls, args.delay, args.jitter, args.http10))
+    elif args.bench == "xml":
+        asyncio.run(bench_xml(args.elements))
+    elif args.bench == "priority":
+        asyncio.run(bench_priority(args.readers, args.cuts, args.delay, args.files))
+    elif args.bench == "faults":
+        asyncio.run(bench_faults(args.reads, args.drop, args.slow, args.slow_delay, args.delay))
+    elif args.bench == "media":
+        asyncio.run(bench_media(args.files, args.delay))
+    else:
+        report = asyncio.run(bench_tools(
+            args.iterations, args.latency, args.jitter, args.http10, args.fresh, args.notifications,
+            args.shortcuts, args.files,
+        ))
+        if args.json == "-":
+            print(json.dumps(report, indent=2))
+            return
+        _print_tools(report)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
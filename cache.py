@@ -0,0 +1,81 @@
+"""
+TTL cache for TriCaster dictionary reads.
+
+Entries are keyed by dictionary key (``tally``, ``switcher``, ``filebrowser:<path>``
+...). Each key family has its own time-to-live, the cache is bounded with LRU
+eviction, and writes invalidate only the families they affect.
+"""
+
+import time
+from collections import OrderedDict
+
+
+def base_key(key: str) -> str:
+    """Return the dictionary family of a key, e.g. ``filebrowser:d:\\clips`` -> ``filebrowser``."""
+    return key.split(":", 1)[0]
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-family TTL."""
+
+    def __init__(self, ttls: dict[str, float], default_ttl: float = 1.0, max_entries: int = 64):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        # key -> (expires_at, fetched_at, value), both on the monotonic clock.
+        self._entries: OrderedDict[str, tuple[float, float, str]] = OrderedDict()
+        # Bumped on invalidation so a read that started before a write can't
+        # repopulate the cache with pre-write state when it completes.
+        self._generations: dict[str, int] = {}
+        self._epoch = 0
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(base_key(key), self.default_ttl)
+
+    def get(self, key: str) -> str | None:
+        """Return the cached value, or None if missing or expired."""
+        hit = self.lookup(key)
+        return hit[0] if hit is not None else None
+
+    def lookup(self, key: str) -> tuple[str, float] | None:
+        """Return (value, fetched_at) for a live entry, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[2], entry[1]
+
+    def generation(self, key: str) -> tuple[int, int]:
+        """Token to pass to ``put`` so stale fetches are discarded."""
+        return self._epoch, self._generations.get(base_key(key), 0)
+
+    def put(self, key: str, value: str, generation: tuple[int, int], fetched_at: float | None = None) -> None:
+        """Store a fetched value unless the key was invalidated while it was in flight."""
+        ttl = self.ttl_for(key)
+        if ttl <= 0 or generation != self.generation(key):
+            return
+        if fetched_at is None:
+            fetched_at = time.monotonic()
+        self._entries[key] = (fetched_at + ttl, fetched_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, *families: str) -> None:
+        """Drop every entry belonging to the given dictionary families."""
+        for family in families:
+            self._generations[family] = self._generations.get(family, 0) + 1
+        for key in [k for k in self._entries if base_key(k) in families]:
+            del self._entries[key]
+        self.stats["invalidations"] += 1
+
+    def invalidate_all(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+        self.stats["invalidations"] += 1
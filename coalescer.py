@@ -0,0 +1,126 @@
+"""
+Per-key write coalescing.
+
+Scoreboard clocks push DataLink values several times a second and fader rides
+send bursts of volume changes. Sending every one of them in order only delays
+the value that matters: the latest. ``WriteCoalescer`` keeps at most one
+pending write per key. A new value replaces the pending one, which is dropped
+unsent, and each key is sent at most ``rate`` times per second. Writes for
+one key go out one at a time, in order. ``flush`` sends everything pending
+immediately.
+"""
+
+import asyncio
+import contextvars
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class _Slot:
+    __slots__ = ("send", "context", "future", "urgent", "sending", "task", "wake", "last_sent")
+
+    def __init__(self):
+        self.send: Callable[[], Awaitable[str]] | None = None
+        self.context: contextvars.Context | None = None
+        self.future: asyncio.Future | None = None
+        self.urgent = False  # send the pending write without waiting out the rate limit
+        self.sending: asyncio.Task | None = None  # the write in flight
+        self.task: asyncio.Task | None = None
+        self.wake = asyncio.Event()
+        self.last_sent = float("-inf")
+
+
+class WriteCoalescer:
+    """Latest-value-wins write queue with a per-key send rate limit."""
+
+    def __init__(self, rate: float = 10.0):
+        self.rate = rate
+        self.stats = {"submitted": 0, "sent": 0, "coalesced": 0, "errors": 0}
+        self._slots: dict[Hashable, _Slot] = {}
+
+    @property
+    def pending(self) -> int:
+        return sum(slot.send is not None for slot in self._slots.values())
+
+    def submit(self, key: Hashable, send: Callable[[], Awaitable[str]], urgent: bool = False) -> asyncio.Future:
+        """Queue ``send`` as the next write for ``key``.
+
+        The returned future resolves to send()'s response once it has gone out, or
+        to None if a newer write for the same key replaced it first. ``send`` runs
+        in a copy of the caller's context. An ``urgent`` write skips the rate limit
+        but still waits for a write to the same key that is already in flight.
+        """
+        self.stats["submitted"] += 1
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+        if slot.future is not None:
+            self.stats["coalesced"] += 1
+            if not slot.future.done():
+                slot.future.set_result(None)
+        slot.send, slot.context = send, contextvars.copy_context()
+        slot.future = asyncio.get_running_loop().create_future()
+        future = slot.future
+        if urgent:
+            slot.urgent = True
+            slot.wake.set()
+        if slot.task is None:
+            slot.task = asyncio.create_task(self._drain(key, slot))
+        return future
+
+    async def flush(self, *keys: Hashable) -> int:
+        """Send every pending write (or those for ``keys``) now, ignoring the rate limit.
+
+        Returns how many were pending. Also waits for writes already in flight.
+        """
+        slots = self._slots.values() if not keys else filter(None, map(self._slots.get, keys))
+        pending, waits = 0, set()
+        for slot in slots:
+            if slot.sending is not None:
+                waits.add(slot.sending)
+            if slot.send is not None:
+                pending += 1
+                waits.add(slot.future)
+                slot.urgent = True
+                slot.wake.set()
+        if waits:
+            # Not gather(): cancelling the flush mustn't cancel the writers' futures.
+            await asyncio.wait(waits)
+        return pending
+
+    async def _drain(self, key: Hashable, slot: _Slot) -> None:
+        try:
+            while True:
+                # Also runs once the queue is empty, so a write right after a burst still honours last_sent.
+                delay = slot.last_sent + 1 / self.rate - time.monotonic() if self.rate > 0 else 0
+                if delay > 0 and not slot.urgent:
+                    slot.wake.clear()
+                    try:
+                        await asyncio.wait_for(slot.wake.wait(), delay)
+                    except TimeoutError:
+                        pass
+                    continue
+                if slot.send is None:
+                    break
+                send, context, future = slot.send, slot.context, slot.future
+                slot.send = slot.context = slot.future = None
+                slot.urgent = False
+                slot.last_sent = time.monotonic()
+                try:
+                    slot.sending = asyncio.create_task(send(), context=context)
+                    result = await slot.sending
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.stats["sent"] += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    slot.sending = None
+        finally:
+            slot.task = None
+            # Idle and past its rate window: forget the key, so arbitrary feed keys don't pile up.
+            if slot.send is None and self._slots.get(key) is slot:
+                del self._slots[key]
@@ -0,0 +1,80 @@
+"""
+Parsed DataLink table with change tokens.
+
+``/v1/datalink`` returns every DataLink key at once. ``DataLinkTable`` keeps
+the parsed key -> value map and notes which version of the table each key
+last changed in. A caller holding a token from an earlier read can ask for
+just the keys that changed since then instead of the whole table again.
+"""
+
+import secrets
+import time
+
+from metrics import parsing
+from xmlstream import scan_text
+
+
+def parse_datalink(xml: str) -> dict[str, str]:
+    """Key -> value for every element carrying ``key`` (or ``name``) and ``value`` attributes."""
+    values: dict[str, str] = {}
+    with parsing():
+        for _, attrs in scan_text(xml):
+            key = attrs.get("key") or attrs.get("name")
+            if key and "value" in attrs:
+                values[key] = attrs["value"]
+    return values
+
+
+class DataLinkTable:
+    """Current DataLink values and the version each key last changed in."""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.fetched_at = float("-inf")
+        self._written_at = float("-inf")
+        # Tokens from another server run (or a reset table) must not be mistaken for ours.
+        self._epoch = secrets.token_hex(3)
+        self._version = 0
+        self._changed: dict[str, int] = {}  # key -> version it last changed in; removed keys stay
+        self._xml = None
+
+    @property
+    def token(self) -> str:
+        return f"{self._epoch}-{self._version}"
+
+    def load(self, xml: str, fetched_at: float) -> None:
+        """Replace the table with a fresh ``/v1/datalink`` read. Raises ET.ParseError."""
+        if fetched_at < self._written_at:
+            return  # the read may predate a write we already recorded
+        self.fetched_at = fetched_at
+        if xml == self._xml:
+            return
+        values = parse_datalink(xml)
+        self._xml = xml
+        changed = [k for k, v in values.items() if self.values.get(k) != v]
+        changed += [k for k in self.values if k not in values]
+        self._record(changed)
+        self.values = values
+
+    def set(self, key: str, value: str) -> None:
+        """Record a write the unit accepted."""
+        self._written_at = time.monotonic()
+        if self.values.get(key) != value:
+            self.values[key] = value
+            self._xml = None
+            self._record([key])
+
+    def changes_since(self, token: str | None) -> dict[str, str | None] | None:
+        """Keys changed since ``token`` (removed keys map to None), or None if the token isn't ours."""
+        epoch, _, version = (token or "").partition("-")
+        if epoch != self._epoch or not version.isdigit() or int(version) > self._version:
+            return None
+        since = int(version)
+        return {k: self.values.get(k) for k, v in self._changed.items() if v > since}
+
+    def _record(self, keys: list[str]) -> None:
+        if keys:
+            self._version += 1
+            for key in keys:
+                self._changed[key] = self._version
+
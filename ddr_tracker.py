@@ -0,0 +1,144 @@
+"""
+Local-clock extrapolation of DDR timecode.
+
+A playing DDR's position moves at ``play_speed`` seconds per second, so one
+``ddr_timecode`` sample is enough to answer "how long is left" for a while
+without asking the TriCaster again. ``DDRTracker`` keeps the last sample of
+each DDR and extrapolates it from the monotonic clock. It asks for a new
+sample when:
+
+- a local write may have changed a DDR (``invalidate``);
+- the extrapolated clip has run out, since loop, autoplay or the next playlist
+  clip decide what happens then;
+- the check interval has passed. The interval doubles each time a sample lands
+  where the extrapolation said it would. It drops back to the minimum when the
+  drift exceeds the threshold or the DDR's state (speed, clip, duration)
+  changed behind our back.
+"""
+
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+
+from metrics import parsing
+
+# Attributes that identify what a DDR is doing; a change in any of them is a state change.
+_STATE_ATTRS = ("play_speed", "clip_index", "num_clips", "file_duration")
+
+
+@dataclass
+class DDRReading:
+    """A DDR's position at one moment, measured or extrapolated."""
+
+    elapsed: float
+    remaining: float
+    duration: float
+    speed: float
+    attrs: dict[str, str]
+    age: float  # seconds since the underlying sample was taken
+    extrapolated: bool
+
+
+class _Sample:
+    __slots__ = ("elapsed", "remaining", "speed", "attrs", "at")
+
+    def __init__(self, attrs: dict[str, str], at: float):
+        self.elapsed = float(attrs.get("clip_seconds_elapsed", 0) or 0)
+        self.remaining = float(attrs.get("clip_seconds_remaining", 0) or 0)
+        self.speed = float(attrs.get("play_speed", 0) or 0)
+        self.attrs = attrs
+        self.at = at
+
+    def at_time(self, now: float) -> tuple[float, float]:
+        """Extrapolated (elapsed, remaining) at ``now`` on the monotonic clock."""
+        moved = (now - self.at) * self.speed
+        return self.elapsed + moved, self.remaining - moved
+
+
+class DDRTracker:
+    """Extrapolated DDR positions from occasional ``ddr_timecode`` samples."""
+
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 10.0, drift_threshold: float = 0.25):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.drift_threshold = drift_threshold
+        self.stats = {"samples": 0, "extrapolated": 0, "drift_resyncs": 0, "state_changes": 0}
+        self._samples: dict[int, _Sample] = {}
+        self._intervals: dict[int, float] = {}
+        self._stale = True
+        self._sampled_at = float("-inf")
+        self._invalidated_at = float("-inf")
+
+    @property
+    def sampled_at(self) -> float:
+        """Monotonic time of the newest sample, for callers deciding whether they have fresher data."""
+        return self._sampled_at
+
+    def reading(self, ddr: int, now: float | None = None) -> DDRReading | None:
+        """Extrapolated position of ``ddr``, or None if it's time to take a new sample."""
+        sample = self._samples.get(ddr)
+        if self._stale or sample is None:
+            return None
+        now = time.monotonic() if now is None else now
+        if now - sample.at > self._intervals.get(ddr, self.min_interval):
+            return None
+        elapsed, remaining = sample.at_time(now)
+        if sample.speed and remaining <= 0:
+            return None
+        self.stats["extrapolated"] += 1
+        return _reading(sample, elapsed, remaining, now, extrapolated=bool(sample.speed))
+
+    def sample(self, ddr: int, now: float | None = None) -> DDRReading | None:
+        """The latest sample of ``ddr`` as-is, or None if the last document didn't include it."""
+        sample = self._samples.get(ddr)
+        if sample is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return _reading(sample, sample.elapsed, sample.remaining, now, extrapolated=False)
+
+    def update(self, xml: str, fetched_at: float) -> None:
+        """Take a ``ddr_timecode`` sample fetched at ``fetched_at``. Raises ET.ParseError."""
+        if fetched_at <= self._sampled_at or fetched_at < self._invalidated_at:
+            return  # a copy of a sample we already have, or one taken before the last write
+        with parsing():
+            root = ET.fromstring(xml)
+            players = {}
+            for el in root:
+                if el.tag.startswith("ddr") and el.tag[3:].isdigit():
+                    players[int(el.tag[3:])] = _Sample(dict(el.attrib), fetched_at)
+        self.stats["samples"] += 1
+        for ddr, new in players.items():
+            self._intervals[ddr] = self._next_interval(ddr, self._samples.get(ddr), new)
+        self._samples = players
+        self._sampled_at = fetched_at
+        self._stale = False
+
+    def invalidate(self) -> None:
+        """A local write may have changed a DDR; the next reading must come from a new sample."""
+        self._stale = True
+        self._invalidated_at = time.monotonic()
+        self._intervals.clear()
+
+    def _next_interval(self, ddr: int, old: _Sample | None, new: _Sample) -> float:
+        if old is None or any(old.attrs.get(a) != new.attrs.get(a) for a in _STATE_ATTRS):
+            if old is not None:
+                self.stats["state_changes"] += 1
+            return self.min_interval
+        predicted, _ = old.at_time(new.at)
+        if abs(predicted - new.elapsed) > self.drift_threshold:
+            self.stats["drift_resyncs"] += 1
+            return self.min_interval
+        return min(self._intervals.get(ddr, self.min_interval) * 2, self.max_interval)
+
+
+def _reading(sample: _Sample, elapsed: float, remaining: float, now: float, extrapolated: bool) -> DDRReading:
+    duration = float(sample.attrs.get("file_duration", 0) or 0)
+    return DDRReading(
+        elapsed=max(elapsed, 0.0),
+        remaining=max(remaining, 0.0),
+        duration=duration,
+        speed=sample.speed,
+        attrs=sample.attrs,
+        age=now - sample.at,
+        extrapolated=extrapolated,
+    )
@@ -0,0 +1,219 @@
+"""
+Watch local data files and push their values into DataLink.
+
+Scores, results and timers often arrive as JSON or CSV files that another
+system rewrites all the time. ``FeedWatcher`` re-reads a file only when its
+size or modification time changes. It diffs the parsed values against what it
+last pushed and sends only the keys that changed.
+
+On Linux the watcher wakes on inotify events for the files' directories, which
+also catches writers that replace a file by renaming over it. Elsewhere, or if
+inotify is unavailable, it polls ``os.stat``. In both modes a periodic stat
+sweep catches anything the events missed (network shares, for one).
+
+File formats:
+
+- ``.json``: an object. Nested objects and lists are flattened with dots
+  (``{"home": {"score": 3}}`` -> ``home.score = 3``).
+- ``.csv``: ``key,value`` rows. An optional ``key,value`` header is skipped.
+"""
+
+import asyncio
+import csv
+import ctypes
+import ctypes.util
+import io
+import json
+import os
+import struct
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+# inotify(7) event mask bits.
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def load_values(path: str) -> dict[str, str]:
+    """Parse a feed file into DataLink key -> value. Raises OSError or ValueError."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        text = f.read()
+    if path.lower().endswith(".json"):
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("top level must be an object")
+        values: dict[str, str] = {}
+        _flatten(data, "", values)
+        return values
+    if path.lower().endswith(".csv"):
+        rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+        if rows and [c.strip().lower() for c in rows[0][:2]] == ["key", "value"]:
+            rows = rows[1:]
+        return {row[0].strip(): row[1] if len(row) > 1 else "" for row in rows}
+    raise ValueError("unsupported file type (expected .json or .csv)")
+
+
+def _flatten(value, prefix: str, out: dict[str, str]) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(v, f"{prefix}{k}.", out)
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            _flatten(v, f"{prefix}{i}.", out)
+    elif isinstance(value, bool):
+        out[prefix[:-1]] = "true" if value else "false"
+    else:
+        out[prefix[:-1]] = "" if value is None else str(value)
+
+
+class Feed:
+    """One watched file and what has been pushed from it."""
+
+    def __init__(self, path: str, prefix: str = ""):
+        self.path = os.path.abspath(path)
+        self.prefix = prefix
+        self.pushed: dict[str, str] = {}
+        self.stats = {"loads": 0, "keys_sent": 0, "keys_unchanged": 0, "errors": 0}
+        self.last_error: str | None = None
+        self.loaded_at: float | None = None  # wall clock, for display
+        self._signature: tuple[int, int] | None = None
+
+
+class FeedWatcher:
+    """Background task that keeps DataLink in step with a set of feed files."""
+
+    def __init__(
+        self,
+        feeds: list[Feed],
+        push: Callable[[str, str], Awaitable[str | None]],
+        poll_interval: float = 0.25,
+        sweep_interval: float = 5.0,
+        debounce: float = 0.05,
+    ):
+        self.feeds = feeds
+        self.push = push
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self.debounce = debounce
+        self.mode = "stopped"
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._inotify_fd: int | None = None
+
+    def start(self) -> None:
+        """Start watching on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        self.mode = "inotify" if self._open_inotify() else "poll"
+        interval = self.sweep_interval if self._inotify_fd is not None else self.poll_interval
+        try:
+            while True:
+                await asyncio.gather(*(self._sync(feed) for feed in self.feeds))
+                try:
+                    await asyncio.wait_for(self._wake.wait(), interval)
+                    # Let a burst of events (write, close, rename) settle into one reload.
+                    await asyncio.sleep(self.debounce)
+                except TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            self._close_inotify()
+            self.mode = "stopped"
+
+    async def _sync(self, feed: Feed) -> None:
+        """Reload ``feed`` if it changed on disk and push the keys whose values differ."""
+        try:
+            st = os.stat(feed.path)
+        except OSError as e:
+            self._fail(feed, f"{type(e).__name__}: {e.strerror or e}")
+            return
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature == feed._signature:
+            return
+        try:
+            values = await asyncio.to_thread(load_values, feed.path)
+        except (OSError, ValueError) as e:
+            # Often a half-written file; the writer's next event or the sweep retries it.
+            self._fail(feed, f"{type(e).__name__}: {e}")
+            return
+        feed._signature = signature
+        feed.stats["loads"] += 1
+        feed.loaded_at = time.time()
+        changed = {feed.prefix + k: v for k, v in values.items() if feed.pushed.get(feed.prefix + k) != v}
+        feed.stats["keys_unchanged"] += len(values) - len(changed)
+        results = await asyncio.gather(*(self.push(k, v) for k, v in changed.items()), return_exceptions=True)
+        errors = []
+        for (key, value), result in zip(changed.items(), results):
+            if isinstance(result, BaseException):
+                errors.append(f"{key}: {result or type(result).__name__}")
+            elif result is not None:
+                feed.pushed[key] = value
+                feed.stats["keys_sent"] += 1
+        if errors:
+            # Forget the signature so the unsent keys are retried on the next sweep.
+            feed._signature = None
+            self._fail(feed, f"{len(errors)} key(s) failed, e.g. {errors[0]}")
+        else:
+            feed.last_error = None
+
+    def _fail(self, feed: Feed, message: str) -> None:
+        if message != feed.last_error:
+            feed.stats["errors"] += 1
+        feed.last_error = message
+
+    def _open_inotify(self) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                return False
+            mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+            for directory in {os.path.dirname(feed.path) for feed in self.feeds}:
+                if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                    os.close(fd)
+                    return False
+            asyncio.get_running_loop().add_reader(fd, self._on_inotify)
+        except (OSError, AttributeError):
+            return False
+        self._inotify_fd = fd
+        return True
+
+    def _on_inotify(self) -> None:
+        try:
+            data = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        names = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            start = offset + _EVENT.size
+            names.add(os.fsdecode(data[start:start + length].rstrip(b"\0")))
+            offset = start + length
+        if any(os.path.basename(feed.path) in names for feed in self.feeds):
+            self._wake.set()
+
+    def _close_inotify(self) -> None:
+        if self._inotify_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify_fd)
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
@@ -0,0 +1,399 @@
+"""
+Local, searchable index of the TriCaster media library.
+
+``filebrowser:<path>`` lists one folder. ``MediaIndex`` crawls the library
+once with a few folders in flight at a time. After that, finding a clip by
+name is a local lookup instead of a walk over the network.
+
+Storage is compact. Each folder path is kept once, and each file is a name
+plus the index of its folder. Searches come in three kinds:
+
+- prefix: on the whole name or any word in it;
+- substring: narrowed through a trigram index;
+- fuzzy: trigram overlap, reranked by string similarity.
+
+Results page with opaque cursors. Each cursor holds the sort key of the last
+row shown, so paging stays stable while the index is refreshed underneath.
+
+Refreshes are incremental. A listing can report subfolders with a ``modified``,
+``size`` or ``count`` stamp. A subfolder whose stamp is unchanged is not fetched
+again, and neither is anything below it. Every listing is split by parent folder
+and hashed, so only folders whose contents changed are re-indexed. Units whose
+stamps don't reflect changes deep in a folder need an occasional ``full`` refresh.
+"""
+
+import asyncio
+import base64
+import bisect
+import difflib
+import hashlib
+import json
+import re
+import time
+from array import array
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass, field
+
+from metrics import parsing
+from xmlstream import scan_text
+
+# Listing elements that name a subfolder, and the attributes that change when its contents do.
+FOLDER_TAGS = frozenset({"folder", "directory"})
+STAMP_ATTRS = ("modified", "size", "count")
+
+# Fuzzy search: trigram candidates reranked, and the lowest score still reported.
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SCORE = 0.45
+
+# Search result tiers, best first.
+_PREFIX, _WORD_PREFIX, _SUBSTRING, _FUZZY = range(4)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _parent(path: str) -> str:
+    return path.rpartition("\\")[0]
+
+
+class _Folder:
+    __slots__ = ("path", "stamp", "digest", "entries", "fetched", "error")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stamp: str | None = None  # as last reported by the parent's listing
+        self.digest: bytes | None = None  # hash of the folder's own files
+        self.entries: list[int] = []
+        self.fetched = False  # listed directly, rather than covered by a recursive parent listing
+        self.error: str | None = None
+
+
+@dataclass
+class RefreshReport:
+    """What one crawl did."""
+
+    full: bool
+    started: float = field(default_factory=time.time)
+    elapsed: float = 0.0
+    fetched: int = 0  # folder listings requested
+    changed: int = 0  # folders whose files were re-indexed
+    unchanged: int = 0  # folders listed again with identical files
+    skipped: int = 0  # subfolders not fetched because their stamp was unchanged
+    removed: int = 0  # folders that disappeared
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    name: str
+    path: str
+    folder: str
+
+
+class MediaIndex:
+    """Crawled copy of the media library with name search and cursor paging."""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[str]], concurrency: int = 4):
+        self.fetch = fetch  # dictionary key -> XML
+        self.concurrency = concurrency
+        self.folders: dict[str, _Folder] = {}
+        self.last_refresh: RefreshReport | None = None
+        self.stats = {"refreshes": 0, "folders_fetched": 0, "folders_changed": 0, "folders_skipped": 0,
+                      "fetch_errors": 0, "searches": 0}
+        self._names: list[str | None] = []  # None once removed
+        self._lower: list[str] = []
+        self._files: list[str] = []  # last path component
+        self._folder_of = array("I")
+        self._folder_paths: list[str] = []
+        self._folder_ids: dict[str, int] = {}
+        self._grams: dict[str, array] = {}
+        # Sorted (lowercase name, entry) and (word, entry) for prefix search; None when stale.
+        self._sorted: list[tuple[str, int]] | None = None
+        self._words: list[tuple[str, int]] | None = None
+        self._dead = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self._names) - self._dead
+
+    @property
+    def refreshing(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def refresh(self, full: bool = False) -> asyncio.Task:
+        """Start a crawl (or join the one running) and return its task; it resolves to a RefreshReport."""
+        if not self.refreshing:
+            self._task = asyncio.create_task(self._crawl(full))
+        return self._task
+
+    async def _crawl(self, full: bool) -> RefreshReport:
+        report = RefreshReport(full)
+        began = time.monotonic()
+        seen: set[str] = set()
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        queue.put_nowait("")
+
+        async def worker() -> None:
+            while True:
+                path = await queue.get()
+                try:
+                    await self._visit(path, full, queue, seen, report)
+                except Exception as e:
+                    # A worker that died would leave queue.join() waiting forever.
+                    self._failed(path, e, seen, report)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(self.concurrency, 1))]
+        joined = asyncio.create_task(queue.join())
+        try:
+            # A worker can still end early (only on a BaseException); then stop rather than hang.
+            await asyncio.wait([joined, *workers], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            joined.cancel()
+            for task in workers:
+                task.cancel()
+        if not joined.done() or joined.cancelled():
+            raise RuntimeError("media crawl stopped: every worker exited before the queue was empty")
+        # Anything neither listed nor kept by an unchanged stamp is gone.
+        for path in [p for p in self.folders if p not in seen]:
+            self._drop_folder(path)
+            report.removed += 1
+        report.elapsed = time.monotonic() - began
+        self.last_refresh = report
+        self.stats["refreshes"] += 1
+        self._compact()
+        return report
+
+    async def _visit(self, path: str, full: bool, queue: asyncio.Queue, seen: set[str], report: RefreshReport):
+        folder = self.folders.setdefault(path, _Folder(path))
+        seen.add(path)
+        report.fetched += 1
+        self.stats["folders_fetched"] += 1
+        try:
+            xml = await self.fetch(f"filebrowser:{path}" if path else "filebrowser")
+            with parsing():
+                items = list(scan_text(xml, {"file", *FOLDER_TAGS}))
+        except Exception as e:  # OSError, TimeoutError, ParseError, or a malformed response
+            self._failed(path, e, seen, report)
+            return
+        folder.fetched, folder.error = True, None
+        groups: dict[str, list[tuple[str, str]]] = {path: []}
+        for tag, attrs in items:
+            child = attrs.get("path", "").rstrip("\\")
+            if tag in FOLDER_TAGS:
+                if not child or child in seen:
+                    continue
+                seen.add(child)
+                stamp = "|".join(attrs.get(a, "") for a in STAMP_ATTRS)
+                stamp = stamp if stamp.strip("|") else None
+                known = self.folders.get(child)
+                if not full and known is not None and known.fetched and stamp is not None and stamp == known.stamp:
+                    report.skipped += 1
+                    self.stats["folders_skipped"] += 1
+                    self._keep_subtree(child, seen)
+                    continue
+                self.folders.setdefault(child, _Folder(child)).stamp = stamp
+                queue.put_nowait(child)
+            elif attrs.get("name"):
+                # A listing may include whole subtrees; file each entry under its own folder.
+                groups.setdefault(_parent(child), []).append((attrs["name"], child))
+        for parent, files in groups.items():
+            if parent != path:
+                seen.add(parent)
+                self.folders.setdefault(parent, _Folder(parent))
+            self._store(self.folders[parent], files, report)
+
+    def _failed(self, path: str, error: Exception, seen: set[str], report: RefreshReport) -> None:
+        # Keep what we had. Forgetting the stamp makes the next refresh try again.
+        folder = self.folders.setdefault(path, _Folder(path))
+        folder.error, folder.stamp = f"{type(error).__name__}: {error}", None
+        report.errors.append(f"{path or '(root)'}: {folder.error}")
+        self.stats["fetch_errors"] += 1
+        self._keep_subtree(path, seen)
+
+    def _store(self, folder: _Folder, files: list[tuple[str, str]], report: RefreshReport) -> None:
+        digest = hashlib.blake2b("\0".join(f"{n}\1{p}" for n, p in files).encode(), digest_size=16).digest()
+        if digest == folder.digest:
+            report.unchanged += 1
+            return
+        report.changed += 1
+        self.stats["folders_changed"] += 1
+        folder.digest = digest
+        self._remove_entries(folder)
+        folder.entries = [self._add(name, path) for name, path in files]
+
+    def _keep_subtree(self, path: str, seen: set[str]) -> None:
+        prefix = path + "\\" if path else ""
+        seen.update(p for p in self.folders if p.startswith(prefix))
+
+    def _drop_folder(self, path: str) -> None:
+        self._remove_entries(self.folders.pop(path))
+
+    def _add(self, name: str, path: str) -> int:
+        entry = len(self._names)
+        folder = _parent(path)
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self._folder_ids[folder] = len(self._folder_paths)
+            self._folder_paths.append(folder)
+        lower = name.lower()
+        self._names.append(name)
+        self._lower.append(lower)
+        self._files.append(path.rpartition("\\")[2])
+        self._folder_of.append(folder_id)
+        for gram in _trigrams(f" {lower} "):
+            self._grams.setdefault(gram, array("I")).append(entry)
+        self._sorted = self._words = None
+        return entry
+
+    def _remove_entries(self, folder: _Folder) -> None:
+        for entry in folder.entries:
+            self._names[entry] = None
+        self._dead += len(folder.entries)
+        folder.entries = []
+        self._sorted = self._words = None
+
+    def _compact(self) -> None:
+        """Renumber entries once removed ones outweigh live ones, rebuilding the postings."""
+        if self._dead < 1000 or self._dead < len(self._names) // 2:
+            return
+        live = [(self._names[i], self._path(i)) for i in range(len(self._names)) if self._names[i] is not None]
+        by_folder: dict[str, list[int]] = {}
+        self._names, self._lower, self._files, self._folder_of = [], [], [], array("I")
+        self._folder_paths, self._folder_ids, self._grams, self._dead = [], {}, {}, 0
+        for name, path in live:
+            by_folder.setdefault(_parent(path), []).append(self._add(name, path))
+        for folder in self.folders.values():
+            folder.entries = by_folder.get(folder.path, [])
+
+    def _path(self, entry: int) -> str:
+        folder = self._folder_paths[self._folder_of[entry]]
+        return f"{folder}\\{self._files[entry]}" if folder else self._files[entry]
+
+    def _file(self, entry: int) -> MediaFile:
+        return MediaFile(self._names[entry], self._path(entry), self._folder_paths[self._folder_of[entry]])
+
+    def search(
+        self, query: str, mode: str = "auto", folder: str = "", limit: int = 20, cursor: str | None = None
+    ) -> tuple[list[tuple[MediaFile, str]], str | None, int]:
+        """Files matching ``query``, best first: (rows of (file, how it matched), next cursor, total).
+
+        ``mode`` is prefix, substring, fuzzy or auto (all three, in that order of preference).
+        Raises ValueError for a bad mode or cursor.
+        """
+        if mode not in ("auto", "prefix", "substring", "fuzzy"):
+            raise ValueError(f"unknown search mode {mode!r}")
+        self.stats["searches"] += 1
+        q = " ".join(query.lower().split())
+        ranked: dict[int, tuple[int, float]] = {}
+        if mode in ("auto", "prefix"):
+            for entry, tier in self._prefix(q):
+                ranked.setdefault(entry, (tier, 1.0))
+        if mode in ("auto", "substring"):
+            for entry in self._substring(q):
+                ranked.setdefault(entry, (_SUBSTRING, 1.0))
+        if mode == "fuzzy" or (mode == "auto" and len(ranked) < limit):
+            for entry, score in self._fuzzy(q):
+                ranked.setdefault(entry, (_FUZZY, score))
+        folder = folder.rstrip("\\").lower()
+        rows = sorted(
+            ((tier, round(-score, 3), self._lower[e], self._path(e)), e)
+            for e, (tier, score) in ranked.items()
+            if not folder or self._folder_paths[self._folder_of[e]].lower().startswith(folder)
+        )
+        page, next_cursor = _page(rows, cursor, limit)
+        how = ("prefix", "word prefix", "substring", "fuzzy")
+        return [(self._file(e), how[key[0]] + (f" {-key[1]:.2f}" if key[0] == _FUZZY else "")) for key, e in page], \
+            next_cursor, len(rows)
+
+    def listing(
+        self, folder: str = "", recursive: bool = False, limit: int = 50, cursor: str | None = None
+    ) -> tuple[list[str], list[MediaFile], str | None, int]:
+        """(subfolders, files, next cursor, total files) under ``folder``. Raises ValueError for a bad cursor."""
+        folder = folder.rstrip("\\")
+        prefix = folder + "\\" if folder else ""
+        lower = prefix.lower()
+        subfolders = sorted({
+            prefix + p[len(prefix):].split("\\", 1)[0]
+            for p in self.folders if p.lower().startswith(lower) and len(p) > len(prefix)
+        }) if not recursive else []
+        entries = [
+            e for f in self.folders.values()
+            if f.path.lower() == folder.lower() or (recursive and f.path.lower().startswith(lower))
+            for e in f.entries
+        ]
+        rows = sorted(((self._path(e).lower(), self._path(e)), e) for e in entries)
+        page, next_cursor = _page(rows, cursor, limit)
+        return subfolders, [self._file(e) for _, e in page], next_cursor, len(rows)
+
+    def _prefix(self, q: str) -> list[tuple[int, int]]:
+        if not q:
+            return []
+        if self._sorted is None:
+            self._sorted = sorted(self._live())
+            self._words = sorted((word, e) for lower, e in self._sorted for word in set(_WORD.findall(lower)))
+        found = []
+        for lower, e in self._sorted[bisect.bisect_left(self._sorted, (q,)):]:
+            if not lower.startswith(q):
+                break
+            found.append((e, _PREFIX))
+        # "bri" finds "River Bridge"; for "river bri" the rest of the query must follow the word.
+        first = q.split()[0]
+        for word, e in self._words[bisect.bisect_left(self._words, (first,)):]:
+            if not word.startswith(first):
+                break
+            if q in self._lower[e]:
+                found.append((e, _WORD_PREFIX))
+        return found
+
+    def _substring(self, q: str) -> list[int]:
+        if len(q) < 3:
+            return [e for lower, e in self._live() if q and q in lower]
+        postings = [self._grams.get(g) for g in _trigrams(q)]
+        if not all(postings):
+            return []
+        shortest = min(postings, key=len)
+        return [e for e in shortest if self._names[e] is not None and q in self._lower[e]]
+
+    def _fuzzy(self, q: str) -> list[tuple[int, float]]:
+        grams = _trigrams(f" {q} ")
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        results = []
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(q)
+        for e, n in shared.most_common(FUZZY_CANDIDATES):
+            if self._names[e] is None:
+                continue
+            matcher.set_seq1(self._lower[e])
+            # How much of the query is found, and how closely the name as a whole matches it.
+            score = 0.6 * n / len(grams) + 0.4 * matcher.ratio()
+            if score >= FUZZY_MIN_SCORE:
+                results.append((e, score))
+        return results
+
+    def _live(self) -> Iterator[tuple[str, int]]:
+        return ((lower, e) for e, lower in enumerate(self._lower) if self._names[e] is not None)
+
+
+def _page(rows: list[tuple[tuple, int]], cursor: str | None, limit: int) -> tuple[list[tuple[tuple, int]], str | None]:
+    """Keyset pagination over rows sorted by key: the page after ``cursor`` and the cursor for the next one."""
+    start = 0
+    if cursor:
+        try:
+            after = tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+            start = bisect.bisect_right(rows, (after, float("inf")))
+        except (ValueError, TypeError):
+            raise ValueError("invalid cursor (it must come from the same kind of query)") from None
+    page = rows[start:start + limit]
+    more = start + limit < len(rows)
+    next_cursor = base64.urlsafe_b64encode(json.dumps(page[-1][0]).encode()).decode() if more and page else None
+    return page, next_cursor
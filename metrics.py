@@ -0,0 +1,289 @@
+"""
+In-process metrics for the TriCaster MCP server.
+
+Every tool call and every ``/v1/*`` request is counted with its errors,
+latency histogram and response bytes; tool calls also record how long they
+spent parsing XML. Requests also record how long they queued for a connection,
+per priority lane. ``Metrics.summary()`` renders a readable report for the
+``get_server_metrics`` tool and ``openmetrics()`` the same data for one or more hosts in
+OpenMetrics text format for scraping or dumping to a file.
+"""
+
+import bisect
+import functools
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qs, urlsplit
+
+# Latency histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with quantile estimates."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket, capped at the largest sample."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else lower * 2 or 1.0
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def cumulative(self) -> Iterator[tuple[str, int]]:
+        """Yield (le, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, n in zip(self.bounds, self.counts):
+            total += n
+            yield f"{bound:g}", total
+        yield "+Inf", total + self.counts[-1]
+
+
+class Series:
+    """Counters and a latency histogram for one tool or endpoint."""
+
+    __slots__ = ("count", "errors", "error_types", "latency", "bytes", "parse_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.error_types: dict[str, int] = {}
+        self.latency = Histogram()
+        self.bytes = 0
+        self.parse_seconds = 0.0
+
+    def observe(self, seconds: float, nbytes: int = 0, error: BaseException | None = None) -> None:
+        self.count += 1
+        self.latency.observe(seconds)
+        self.bytes += nbytes
+        if error is not None:
+            self.errors += 1
+            kind = type(error).__name__
+            self.error_types[kind] = self.error_types.get(kind, 0) + 1
+
+
+class _Call:
+    """Per-tool-call scratch space carried through the call's context."""
+
+    __slots__ = ("parse_seconds", "parsing")
+
+    def __init__(self):
+        self.parse_seconds = 0.0
+        self.parsing = False
+
+
+_current_call: ContextVar[_Call | None] = ContextVar("tricaster_current_call", default=None)
+
+
+@contextmanager
+def parsing() -> Iterator[None]:
+    """Charge the enclosed block to the current tool call's parse time.
+
+    Nested blocks count once, so parse helpers can be instrumented independently.
+    """
+    call = _current_call.get()
+    if call is None or call.parsing:
+        yield
+        return
+    call.parsing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.parse_seconds += time.perf_counter() - start
+        call.parsing = False
+
+
+def timed_parse(fn):
+    """Decorator form of ``parsing()`` for synchronous parse helpers."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with parsing():
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def endpoint_labels(path: str) -> tuple[str, str]:
+    """Split a request path into (endpoint, dictionary family), e.g. ('/v1/dictionary', 'tally')."""
+    url = urlsplit(path)
+    if url.path != "/v1/dictionary":
+        return url.path, ""
+    key = parse_qs(url.query).get("key", [""])[0]
+    return url.path, key.split(":", 1)[0]
+
+
+class Metrics:
+    """Registry of per-tool and per-endpoint series."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.tools: dict[str, Series] = {}
+        self.endpoints: dict[tuple[str, str], Series] = {}
+        self.queue_wait: dict[str, Histogram] = {}  # priority lane -> wait for a connection slot
+
+    @contextmanager
+    def tool_call(self, name: str) -> Iterator[None]:
+        """Time a tool call, recording its parse time and whether it raised."""
+        call = _Call()
+        token = _current_call.set(call)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_call.reset(token)
+            series = self.tools.setdefault(name, Series())
+            series.observe(time.perf_counter() - start, error=error)
+            series.parse_seconds += call.parse_seconds
+
+    def record_response_bytes(self, name: str, nbytes: int) -> None:
+        self.tools.setdefault(name, Series()).bytes += nbytes
+
+    def observe_request(self, path: str, seconds: float, nbytes: int, error: BaseException | None = None) -> None:
+        """Transport hook: one ``/v1/*`` exchange finished."""
+        self.endpoints.setdefault(endpoint_labels(path), Series()).observe(seconds, nbytes, error)
+
+    def observe_queue_wait(self, lane: str, seconds: float) -> None:
+        """Transport hook: a request waited ``seconds`` for a connection slot."""
+        self.queue_wait.setdefault(lane, Histogram()).observe(seconds)
+
+    def summary(self, title: str = "Server Metrics") -> str:
+        uptime = time.time() - self.started
+        lines = [f"=== {title} (uptime {uptime / 60:.1f} min) ==="]
+        lines.append("Tools:")
+        lines += _table(sorted(self.tools.items()), parse=True) or ["  (no calls yet)"]
+        lines.append("TriCaster requests:")
+        endpoints = sorted(
+            ((f"{path} [{key}]" if key else path), series) for (path, key), series in self.endpoints.items()
+        )
+        lines += _table(endpoints, parse=False) or ["  (no requests yet)"]
+        if self.queue_wait:
+            lines.append("Queue wait:")
+            lines += [
+                f"  {lane}: {h.count} requests, p50 {h.quantile(0.5) * 1000:.1f} / "
+                f"p95 {h.quantile(0.95) * 1000:.1f} / max {h.max * 1000:.1f} ms"
+                for lane, h in sorted(self.queue_wait.items())
+            ]
+        return "\n".join(lines)
+
+
+def openmetrics(
+    hosts: dict[str, Metrics],
+    extra: dict[str, dict[str, dict[str, int]]] | None = None,
+    gauges: dict[str, dict[str, float]] | None = None,
+) -> str:
+    """Render every host's series in OpenMetrics text format, labelled by host.
+
+    ``extra`` adds plain counters per host and family, e.g.
+    {"studio": {"cache": {"hits": 12}}} -> ``tricaster_cache_total{host="studio",event="hits"} 12``.
+    ``gauges`` adds levels and state flags per host, e.g.
+    {"studio": {"circuit_open": 0}} -> ``tricaster_circuit_open{host="studio"} 0``.
+    """
+    out: list[str] = []
+    tools = [({"host": h, "tool": n}, s) for h, m in hosts.items() for n, s in sorted(m.tools.items())]
+    _family(out, "tricaster_tool", "tool call", tools)
+    requests = [
+        ({"host": h, "endpoint": p, "key": k}, s) for h, m in hosts.items() for (p, k), s in sorted(m.endpoints.items())
+    ]
+    _family(out, "tricaster_request", "TriCaster HTTP request", requests)
+    waits = [({"host": h, "lane": lane}, w) for h, m in hosts.items() for lane, w in sorted(m.queue_wait.items())]
+    if waits:
+        out.append("# TYPE tricaster_queue_wait_seconds histogram")
+        out.append("# UNIT tricaster_queue_wait_seconds seconds")
+        out.append("# HELP tricaster_queue_wait_seconds Time requests waited for a connection slot.")
+        for labels, w in waits:
+            for le, n in w.cumulative():
+                out.append(f"tricaster_queue_wait_seconds_bucket{_labels({**labels, 'le': le})} {n}")
+            out.append(f"tricaster_queue_wait_seconds_sum{_labels(labels)} {w.sum:.6f}")
+            out.append(f"tricaster_queue_wait_seconds_count{_labels(labels)} {w.count}")
+    families: dict[str, list[str]] = {}
+    for host, counters in (extra or {}).items():
+        for family, values in counters.items():
+            families.setdefault(family, []).extend(
+                f"tricaster_{family}_total{_labels({'host': host, 'event': event})} {n}" for event, n in values.items()
+            )
+    for family, lines in families.items():
+        out.append(f"# TYPE tricaster_{family} counter")
+        out += lines
+    levels: dict[str, list[str]] = {}
+    for host, values in (gauges or {}).items():
+        for name, value in values.items():
+            levels.setdefault(name, []).append(f"tricaster_{name}{_labels({'host': host})} {value:g}")
+    for name, lines in levels.items():
+        out.append(f"# TYPE tricaster_{name} gauge")
+        out += lines
+    out.append("# EOF")
+    return "\n".join(out) + "\n"
+
+
+def _table(rows: list[tuple[str, Series]], parse: bool) -> list[str]:
+    lines = []
+    for name, s in rows:
+        h = s.latency
+        line = (
+            f"  {name}: {s.count} calls, {s.errors} errors, "
+            f"p50 {h.quantile(0.5) * 1000:.1f} / p95 {h.quantile(0.95) * 1000:.1f} / "
+            f"p99 {h.quantile(0.99) * 1000:.1f} ms, {s.bytes / max(s.count, 1):.0f} B/call"
+        )
+        if parse:
+            line += f", parse {s.parse_seconds * 1000 / max(s.count, 1):.2f} ms/call"
+        if s.error_types:
+            line += " (" + ", ".join(f"{k} x{v}" for k, v in sorted(s.error_types.items())) + ")"
+        lines.append(line)
+    return lines
+
+
+def _family(out: list[str], prefix: str, what: str, series: list[tuple[dict[str, str], Series]]) -> None:
+    out.append(f"# TYPE {prefix}_calls counter")
+    out.append(f"# HELP {prefix}_calls Completed {what}s.")
+    out += [f"{prefix}_calls_total{_labels(labels)} {s.count}" for labels, s in series]
+    out.append(f"# TYPE {prefix}_errors counter")
+    out.append(f"# HELP {prefix}_errors Failed {what}s.")
+    out += [f"{prefix}_errors_total{_labels(labels)} {s.errors}" for labels, s in series]
+    out.append(f"# TYPE {prefix}_response_bytes counter")
+    out += [f"{prefix}_response_bytes_total{_labels(labels)} {s.bytes}" for labels, s in series]
+    if prefix == "tricaster_tool":
+        out.append(f"# TYPE {prefix}_parse_seconds counter")
+        out += [f"{prefix}_parse_seconds_total{_labels(labels)} {s.parse_seconds:.6f}" for labels, s in series]
+    out.append(f"# TYPE {prefix}_latency_seconds histogram")
+    out.append(f"# UNIT {prefix}_latency_seconds seconds")
+    for labels, s in series:
+        for le, n in s.latency.cumulative():
+            out.append(f"{prefix}_latency_seconds_bucket{_labels({**labels, 'le': le})} {n}")
+        out.append(f"{prefix}_latency_seconds_sum{_labels(labels)} {s.latency.sum:.6f}")
+        out.append(f"{prefix}_latency_seconds_count{_labels(labels)} {s.latency.count}")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
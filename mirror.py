@@ -0,0 +1,185 @@
+"""
+Push-fed mirror of TriCaster state dictionaries.
+
+The TriCaster announces state changes on a WebSocket at
+``/v1/change_notifications``; each message names the dictionaries that
+changed. ``StateMirror`` keeps an in-memory copy of a handful of dictionaries
+and refetches only the ones named in a notification, so read tools can answer
+without a network round trip. While the subscription is down ``get`` returns
+None and callers fall back to polling.
+"""
+
+import asyncio
+import re
+import time
+from urllib.parse import quote
+
+from transport import TriCasterClient, WebSocket, open_websocket
+
+MIRRORED_KEYS = ("switcher", "tally", "shortcut_states", "ddr_timecode")
+
+
+class StateMirror:
+    """In-process copy of selected dictionaries, kept current by change notifications."""
+
+    def __init__(
+        self,
+        client: TriCasterClient,
+        keys: tuple[str, ...] = MIRRORED_KEYS,
+        path: str = "/v1/change_notifications",
+        resync_interval: float = 30.0,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.client = client
+        self.keys = keys
+        self.path = path
+        self.resync_interval = resync_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.live = False
+        self.stats = {"notifications": 0, "refetches": 0, "reconnects": 0}
+        # key -> (xml, fetched_at on the monotonic clock)
+        self._values: dict[str, tuple[str, float]] = {}
+        self._dirty: set[str] = set(keys)
+        self._pending: set[str] = set()
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def get(self, key: str) -> str | None:
+        """Return the mirrored XML for ``key``, or None if it can't be trusted right now."""
+        hit = self.lookup(key)
+        return hit[0] if hit is not None else None
+
+    def lookup(self, key: str) -> tuple[str, float] | None:
+        """Return (xml, fetched_at) for ``key``, or None if it can't be trusted right now."""
+        if not self.live or key in self._dirty:
+            return None
+        return self._values.get(key)
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for any mirrored dictionary to be refetched.
+
+        Returns True if one was; False on timeout or while the mirror is offline.
+        """
+        if not self.live:
+            await asyncio.sleep(timeout)
+            return False
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def invalidate(self, *keys: str) -> None:
+        """Mark keys as changed by a local write and refetch them in the background."""
+        for key in keys:
+            if key in self.keys:
+                self._dirty.add(key)
+                if self.live or key in self._refreshing:
+                    self._schedule(key)
+
+    def start(self) -> None:
+        """Start the background subscriber on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = self.retry_delay
+        while True:
+            try:
+                ws = await open_websocket(self.client.host, self.client.port, self.path, self.client.timeout)
+            except (OSError, TimeoutError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+            try:
+                await self._session(ws)
+            except (OSError, asyncio.IncompleteReadError, TimeoutError):
+                pass
+            finally:
+                ws.close()
+                self._go_offline()
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+
+    async def _session(self, ws: WebSocket) -> None:
+        """Sync everything once, then follow notifications until the socket drops."""
+        await self._sync_all()
+        self.live = True
+        resync = asyncio.create_task(self._resync_loop())
+        try:
+            while True:
+                message = await ws.recv()
+                self.stats["notifications"] += 1
+                for key in self._changed_keys(message):
+                    self._dirty.add(key)
+                    self._schedule(key)
+        finally:
+            resync.cancel()
+
+    async def _resync_loop(self) -> None:
+        # Guards against notifications the unit never sent.
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            await self._sync_all()
+
+    async def _sync_all(self) -> None:
+        self._dirty.update(self.keys)
+        await asyncio.gather(*(self._schedule(key) for key in self.keys), return_exceptions=True)
+
+    def _changed_keys(self, message: str) -> list[str]:
+        tokens = set(re.findall(r"[A-Za-z0-9_]+", message))
+        return [key for key in self.keys if key in tokens]
+
+    def _schedule(self, key: str) -> asyncio.Task:
+        """Refetch ``key``, coalescing with a refetch that is already running."""
+        task = self._refreshing.get(key)
+        if task is not None:
+            # Whatever is in flight may predate this change; fetch once more when it lands.
+            self._pending.add(key)
+            return task
+        task = asyncio.create_task(self._refresh(key))
+        self._refreshing[key] = task
+        return task
+
+    async def _refresh(self, key: str) -> None:
+        try:
+            while True:
+                self._pending.discard(key)
+                fetched_at = time.monotonic()
+                xml = await self.client.get(f"/v1/dictionary?key={quote(key)}")
+                self.stats["refetches"] += 1
+                if key not in self._pending:
+                    self._values[key] = (xml, fetched_at)
+                    self._dirty.discard(key)
+                    # Wake current waiters and start a new round for the next change.
+                    self._changed.set()
+                    self._changed = asyncio.Event()
+                    return
+        except (OSError, TimeoutError):
+            # Leave the key dirty; the next notification or resync retries it.
+            pass
+        finally:
+            if self._refreshing.get(key) is asyncio.current_task():
+                del self._refreshing[key]
+
+    def _go_offline(self) -> None:
+        self.live = False
+        self._values.clear()
+        self._dirty.update(self.keys)
+        self._pending.clear()
+        for task in self._refreshing.values():
+            task.cancel()
@@ -0,0 +1,236 @@
+"""
+Cue scheduler for time-critical actions.
+
+A tool call reaches the TriCaster whenever the model and network get it
+there, which is fine for "cut to camera 2" but not for "take DSK2 off three
+seconds before the clip ends". ``Scheduler`` holds cued actions in a heap
+ordered by monotonic deadline and fires each one from a single dispatcher
+task:
+
+- Shortly before a deadline it runs the ``prewarm`` hook, so the action
+  doesn't pay for a TCP handshake.
+- It sleeps until just before the deadline, then yields in a tight loop for
+  the last couple of milliseconds.
+- It records how late each dispatch was (jitter).
+
+Cues whose deadline depends on changing state (a DDR that may be paused or
+scrubbed) carry a ``retime`` coroutine. It is re-run about once a second
+until the deadline is close enough to lock in.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+# How long before a deadline the dispatcher stops sleeping and spins on the event loop.
+SPIN_WINDOW = 0.002
+
+
+class Cue:
+    """One scheduled action and, once it has run, how it went."""
+
+    def __init__(
+        self,
+        cue_id: int,
+        label: str,
+        action: Callable[[], Awaitable[str]],
+        due: float,
+        timing: str,
+        retime: Callable[[], Awaitable[float | None]] | None = None,
+    ):
+        self.id = cue_id
+        self.label = label
+        self.action = action
+        self.due = due  # monotonic; math.inf while a retimed cue has no deadline yet
+        self.timing = timing
+        self.retime = retime
+        self.created = time.time()
+        self.status = "pending"  # pending, running, done, failed, cancelled
+        self.jitter: float | None = None  # seconds between the deadline and the dispatch
+        self.duration: float | None = None  # seconds the action took to complete
+        self.fired_at: float | None = None  # wall clock
+        self.result: str | None = None
+        self.notes: list[str] = []
+        self.context = contextvars.copy_context()
+        self.version = 0
+
+    def due_wall(self) -> float:
+        """Deadline on the wall clock (inf if not yet known)."""
+        return time.time() + (self.due - time.monotonic())
+
+
+class Scheduler:
+    """Heap-based dispatcher for cues."""
+
+    def __init__(
+        self,
+        prewarm: Callable[[], Awaitable[object]] | None = None,
+        prewarm_lead: float = 0.5,
+        retime_interval: float = 1.0,
+        history: int = 50,
+    ):
+        self.prewarm = prewarm
+        self.prewarm_lead = prewarm_lead
+        self.retime_interval = retime_interval
+        self.cues: dict[int, Cue] = {}  # pending and running
+        self.history: deque[Cue] = deque(maxlen=history)
+        self.jitters: deque[float] = deque(maxlen=200)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        # (when, seq, version, kind, cue); entries whose version no longer matches are skipped.
+        self._heap: list[tuple[float, int, int, str, Cue]] = []
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def add(
+        self,
+        label: str,
+        action: Callable[[], Awaitable[str]],
+        due: float,
+        timing: str,
+        retime: Callable[[], Awaitable[float | None]] | None = None,
+    ) -> Cue:
+        """Cue ``action`` for monotonic time ``due``. It runs in a copy of the caller's context."""
+        cue = Cue(next(self._ids), label, action, due, timing, retime)
+        self.cues[cue.id] = cue
+        self._plan(cue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return cue
+
+    def cancel(self, cue_id: int) -> Cue | None:
+        """Cancel a pending cue. Returns it, or None if there is no such pending cue."""
+        cue = self.cues.get(cue_id)
+        if cue is None or cue.status != "pending":
+            return None
+        cue.status = "cancelled"
+        cue.version += 1
+        self._finish(cue)
+        return cue
+
+    def get(self, cue_id: int) -> Cue | None:
+        return self.cues.get(cue_id) or next((c for c in self.history if c.id == cue_id), None)
+
+    def pending(self) -> list[Cue]:
+        return sorted(self.cues.values(), key=lambda c: c.due)
+
+    def jitter_summary(self) -> dict[str, float] | None:
+        """Mean, p95 and max dispatch lateness in ms over recent cues, or None before any fired."""
+        if not self.jitters:
+            return None
+        ordered = sorted(self.jitters)
+        return {
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _plan(self, cue: Cue) -> None:
+        """(Re)queue the warm-up, fire and retime events for ``cue``'s current deadline."""
+        cue.version += 1
+        now = time.monotonic()
+        if cue.retime is not None and cue.due - now > self.prewarm_lead:
+            self._push(min(now + self.retime_interval, cue.due - self.prewarm_lead), "retime", cue)
+        if cue.due != math.inf:
+            if self.prewarm is not None:
+                self._push(cue.due - self.prewarm_lead, "warm", cue)
+            self._push(cue.due, "fire", cue)
+        self._wake.set()
+
+    def _push(self, when: float, kind: str, cue: Cue) -> None:
+        heapq.heappush(self._heap, (when, next(self._seq), cue.version, kind, cue))
+
+    async def _run(self) -> None:
+        while True:
+            while self._heap and self._heap[0][2] != self._heap[0][4].version:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            when, _, version, kind, cue = self._heap[0]
+            delay = when - time.monotonic() - (SPIN_WINDOW if kind == "fire" else 0)
+            if delay > 0:
+                # Wake early if an earlier cue arrives or this one is cancelled or retimed.
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            heapq.heappop(self._heap)
+            if kind == "fire":
+                while time.monotonic() < when:
+                    await asyncio.sleep(0)
+                if cue.version == version:  # not cancelled while spinning
+                    self._fire(cue)
+            elif kind == "warm":
+                self._spawn(self._warm(cue), cue)
+            else:
+                self._spawn(self._retime(cue), cue)
+
+    def _fire(self, cue: Cue) -> None:
+        started = time.monotonic()
+        cue.jitter = started - cue.due
+        cue.fired_at = time.time()
+        cue.status = "running"
+        cue.version += 1
+        self.jitters.append(cue.jitter)
+        self._spawn(self._execute(cue, started), cue)
+
+    def _spawn(self, coro, cue: Cue) -> None:
+        task = asyncio.create_task(coro, context=cue.context)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, cue: Cue, started: float) -> None:
+        try:
+            cue.result = await cue.action()
+            cue.status = "done"
+        except Exception as e:
+            cue.result = f"{type(e).__name__}: {e}"
+            cue.status = "failed"
+        cue.duration = time.monotonic() - started
+        self._finish(cue)
+
+    async def _warm(self, cue: Cue) -> None:
+        try:
+            await self.prewarm()
+        except Exception as e:
+            _note(cue, f"pre-warm failed: {type(e).__name__}: {e}")
+
+    async def _retime(self, cue: Cue) -> None:
+        try:
+            due = await cue.retime()
+        except Exception as e:
+            due = cue.due  # keep the last deadline and try again next round
+            _note(cue, f"retime failed: {type(e).__name__}: {e}")
+        if cue.status == "pending":
+            cue.due = math.inf if due is None else due
+            self._plan(cue)
+
+    def _finish(self, cue: Cue) -> None:
+        self.cues.pop(cue.id, None)
+        self.history.append(cue)
+
+
+def _note(cue: Cue, message: str) -> None:
+    # A retime that keeps failing would otherwise add a note every second.
+    if not cue.notes or cue.notes[-1] != message:
+        cue.notes.append(message)
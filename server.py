@@ -5,82 +5,500 @@ Controls a Vizrt TriCaster via its HTTP API (v1 shortcut/dictionary/trigger/data
 Reference: Vizrt Automation, Integration & Control User Guide v8-5
 """
 
-import http.client
+import asyncio
+import datetime as dt
+import math
+import operator
+import re
+import time
 import xml.etree.ElementTree as ET
-from urllib.parse import urlencode, quote
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import aclosing
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qs, urlencode, quote
 import os
 import mcp.server.stdio
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 
+from automation import EASINGS, Automation, Ramp, RampReport
+from cache import TTLCache
+from coalescer import WriteCoalescer
+from datalink import DataLinkTable
+from feeds import Feed, FeedWatcher
+from media_index import MediaIndex, RefreshReport
+from ddr_tracker import DDRReading, DDRTracker
+from metrics import Metrics, openmetrics, parsing, timed_parse
+from mirror import StateMirror
+from scheduler import Cue, Scheduler
+from shortcut_states import MISSING_VALUE, ShortcutStates, coerce, parse_shortcut_states
+from transport import BULK, NORMAL, URGENT, TriCasterClient, deadline
+from xmlstream import scan_stream, scan_text
+
 TRICASTER_HOST = os.environ.get("TRICASTER_HOST", "10.10.13.162")
 TRICASTER_PORT = int(os.environ.get("TRICASTER_PORT", "80"))
+# Several units from one server: "name=host[:port],name=host[:port],...". The first is the
+# default for tools called without a ``host`` argument. Unset to control just TRICASTER_HOST.
+TRICASTER_HOSTS = os.environ.get("TRICASTER_HOSTS", "")
+# Mirror groups of units from TRICASTER_HOSTS: "name=unit+unit,...", e.g. "show=main+backup".
+# Passing a group as ``host`` sends every write to all members at once; reads use the first.
+TRICASTER_GROUPS = os.environ.get("TRICASTER_GROUPS", "")
+# Unit or group used when a tool is called without ``host`` (default: the first unit).
+TRICASTER_DEFAULT_HOST = os.environ.get("TRICASTER_DEFAULT_HOST", "")
+# Seconds one request may take. A tool call also has a deadline for all of its requests together:
+# TOOL_DEADLINE, or ON_AIR_DEADLINE for switcher, DSK and FTB tools so a lost response is reported
+# quickly instead of stalling the show.
 TIMEOUT = 5
+TOOL_DEADLINE = float(os.environ.get("TRICASTER_TOOL_DEADLINE", "10"))
+ON_AIR_DEADLINE = float(os.environ.get("TRICASTER_ON_AIR_DEADLINE", "2"))
+MAX_CONNECTIONS = int(os.environ.get("TRICASTER_MAX_CONNECTIONS", "6"))
+# Connection slots per unit held back for URGENT requests, so a cut never queues behind reads.
+RESERVED_CONNECTIONS = int(os.environ.get("TRICASTER_RESERVED_CONNECTIONS", "1"))
+# Follow /v1/change_notifications and answer state reads from memory. Set to 0 to always poll.
+NOTIFICATIONS = os.environ.get("TRICASTER_NOTIFICATIONS", "1") != "0"
+
+# Seconds a dictionary read may be served from cache, per dictionary family.
+# Fast-moving state gets short TTLs; lists that only change between shows get long ones.
+CACHE_TTLS = {
+    "tally": 0.5,
+    "switcher": 0.5,
+    "ddr_timecode": 0.25,
+    "shortcut_states": 1.0,
+    "audiomixer": 5.0,
+    "macros_list": 30.0,
+    "switcher_ui_effects": 30.0,
+    "filebrowser": 30.0,
+    "session": 30.0,
+    "datalink": 0.5,  # the parsed /v1/datalink table behind get_datalink_changes
+}
+CACHE_MAX_ENTRIES = 64
+
+# Write the OpenMetrics text dump here every METRICS_DUMP_INTERVAL seconds (unset to disable),
+# e.g. for a node_exporter textfile collector.
+METRICS_FILE = os.environ.get("TRICASTER_METRICS_FILE")
+METRICS_DUMP_INTERVAL = 15
+
+# set_datalink / set_audio_volume: most sends per second per key. A value that arrives while
+# one is waiting replaces it unsent, so bursts only ever deliver the latest value.
+COALESCE_RATE = float(os.environ.get("TRICASTER_COALESCE_RATE", "10"))
+
+# JSON/CSV files whose values are pushed into DataLink as they change: "[prefix=]path,...".
+# The prefix is prepended to every key from that file. Writes go to TRICASTER_DEFAULT_HOST.
+TRICASTER_FEEDS = os.environ.get("TRICASTER_FEEDS", "")
+
+# Automation ramps (fades, T-bar moves) send at most one value per frame of the unit's session
+# frame rate, read from its "session" dictionary. This rate is used when the unit doesn't report one.
+FRAME_RATE = float(os.environ.get("TRICASTER_FRAME_RATE", "29.97"))
+
+# Media index behind find_media / list_media: folder listings fetched at once while crawling, and
+# seconds between background refreshes (0: build on first use, refresh only on request). Every
+# MEDIA_FULL_REFRESH_EVERY-th background refresh also refetches folders whose stamp looks unchanged.
+MEDIA_CRAWL_CONCURRENCY = int(os.environ.get("TRICASTER_MEDIA_CRAWL_CONCURRENCY", "4"))
+MEDIA_REFRESH_INTERVAL = float(os.environ.get("TRICASTER_MEDIA_REFRESH", "300"))
+MEDIA_FULL_REFRESH_EVERY = 12
+# Seconds a media tool waits for the first crawl before answering from what is indexed so far.
+MEDIA_BUILD_WAIT = 5
+
+# wait_for: longest allowed timeout, and the range its polling interval adapts within (seconds).
+WAIT_MAX_TIMEOUT = 300
+WAIT_POLL_INTERVAL = (0.1, 1.0)
+
+# Dictionaries that make up the get_show_state snapshot.
+_SHOW_STATE_KEYS = ("switcher", "tally", "shortcut_states", "audiomixer", "ddr_timecode")
+
+# Dictionary families each shortcut can change (all matching rules apply).
+# Shortcuts that match no rule, and triggers such as macros, clear the whole cache.
+SHORTCUT_INVALIDATES: list[tuple[str, tuple[str, ...]]] = [
+    ("main_*", ("switcher", "tally")),
+    ("*_mute", ("shortcut_states",)),
+    ("*_volume", ("shortcut_states",)),
+    ("*_toggle", ("shortcut_states",)),
+    ("ddr*", ("ddr_timecode", "shortcut_states")),
+]
+
+# Request priority lanes. Switcher, DSK and FTB shortcuts are URGENT; dictionaries that are large
+# or only change between shows are BULK (at most half the pool); everything else is NORMAL.
+URGENT_SHORTCUTS = ("main_*",)
+BULK_DICTIONARIES = frozenset({"filebrowser", "shortcut_states", "macros_list", "switcher_ui_effects"})
+
+# Idempotent reads; one slower than its endpoint's recent p95 gets a second copy sent in parallel.
+HEDGED_ENDPOINTS = ("/v1/dictionary", "/v1/version")
 
 
 # ---------------------------------------------------------------------------
 # Low-level HTTP helpers
 # ---------------------------------------------------------------------------
 
-def _get(path: str) -> str:
-    """Send an HTTP GET to the TriCaster. Uses Connection: close to handle HTTP/1.0."""
-    conn = http.client.HTTPConnection(TRICASTER_HOST, TRICASTER_PORT, timeout=TIMEOUT)
-    try:
-        conn.request("GET", path, headers={"Connection": "close"})
-        resp = conn.getresponse()
-        body = resp.read().decode("utf-8", errors="replace").strip()
-        return body
-    finally:
-        conn.close()
+def _request_priority(method: str, path: str) -> int:
+    """Priority lane for a TriCaster request (see URGENT_SHORTCUTS / BULK_DICTIONARIES)."""
+    endpoint, _, query = path.partition("?")
+    if endpoint == "/v1/shortcut":
+        name = parse_qs(query).get("name", [""])[0]
+        return URGENT if any(fnmatchcase(name, p) for p in URGENT_SHORTCUTS) else NORMAL
+    if endpoint == "/v1/dictionary":
+        key = parse_qs(query).get("key", [""])[0]
+        return BULK if key.split(":", 1)[0] in BULK_DICTIONARIES else NORMAL
+    return NORMAL
+
+
+def _hedgeable(method: str, path: str) -> bool:
+    return method == "GET" and path.partition("?")[0] in HEDGED_ENDPOINTS
+
+
+class Unit:
+    """One TriCaster: its own connection pool, cache, notification mirror and metrics."""
+
+    def __init__(self, name: str, host: str, port: int):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.metrics = Metrics()
+        self.client = TriCasterClient(
+            host,
+            port,
+            timeout=TIMEOUT,
+            max_connections=MAX_CONNECTIONS,
+            metrics=self.metrics,
+            classify=_request_priority,
+            reserved_connections=RESERVED_CONNECTIONS,
+            hedge=_hedgeable,
+        )
+        self.cache = TTLCache(CACHE_TTLS, max_entries=CACHE_MAX_ENTRIES)
+        self.mirror = StateMirror(self.client)
+        self.ddr = DDRTracker()
+        self.writes = WriteCoalescer(COALESCE_RATE)
+        self.datalink = DataLinkTable()
+        self.media = MediaIndex(
+            lambda key: self.client.get(f"/v1/dictionary?key={quote(key)}"), MEDIA_CRAWL_CONCURRENCY
+        )
+
+
+def _parse_hosts(spec: str) -> dict[str, Unit]:
+    """Build the unit registry from TRICASTER_HOSTS, or TRICASTER_HOST/PORT when it is unset."""
+    units: dict[str, Unit] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, address = entry.rpartition("=")
+        host, _, port = address.partition(":")
+        name = name.strip() or host
+        if name in units:
+            raise ValueError(f"TRICASTER_HOSTS lists {name!r} twice")
+        units[name] = Unit(name, host.strip(), int(port or 80))
+    return units or {"default": Unit("default", TRICASTER_HOST, TRICASTER_PORT)}
+
+
+def _parse_groups(spec: str, units: dict[str, Unit]) -> dict[str, tuple[Unit, ...]]:
+    """Build mirror groups from TRICASTER_GROUPS; the first member of each is its primary."""
+    groups: dict[str, tuple[Unit, ...]] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, members = entry.partition("=")
+        name = name.strip()
+        if name in units or name in groups:
+            raise ValueError(f"TRICASTER_GROUPS name {name!r} is already a unit or group")
+        missing = [m.strip() for m in members.split("+") if m.strip() not in units]
+        if missing:
+            raise ValueError(f"TRICASTER_GROUPS {name!r} names unknown units: {', '.join(missing)}")
+        groups[name] = tuple(units[m.strip()] for m in members.split("+"))
+    return groups
+
+
+UNITS = _parse_hosts(TRICASTER_HOSTS)
+GROUPS = _parse_groups(TRICASTER_GROUPS, UNITS)
+_default_unit = next(iter(UNITS.values()))
+DEFAULT_HOST = TRICASTER_DEFAULT_HOST or _default_unit.name
+# The unit(s) the current tool call is talking to, primary first; call_tool sets it from ``host``.
+_current_target: ContextVar[tuple[Unit, ...]] = ContextVar("tricaster_target", default=(_default_unit,))
+# Fan-out reports for the current tool call, appended to its result by call_tool.
+_fanout_log: ContextVar[list[str] | None] = ContextVar("tricaster_fanout_log", default=None)
+
+
+def _resolve_target(name: str) -> tuple[Unit, ...] | None:
+    if name in GROUPS:
+        return GROUPS[name]
+    return (UNITS[name],) if name in UNITS else None
+
+
+if _resolve_target(DEFAULT_HOST) is None:
+    raise ValueError(f"TRICASTER_DEFAULT_HOST {DEFAULT_HOST!r} is not a configured unit or group")
+if not FRAME_RATE > 0:
+    raise ValueError(f"TRICASTER_FRAME_RATE must be positive, not {FRAME_RATE:g}")
+
+
+def _unit() -> Unit:
+    """The unit reads go to: the target itself, or a group's primary."""
+    return _current_target.get()[0]
+
+
+async def _with_unit(unit: Unit, fn, *args, **kwargs):
+    """Run ``fn`` against ``unit``. Use inside gather(), whose tasks each get their own context."""
+    _current_target.set((unit,))
+    return await fn(*args, **kwargs)
 
 
-def _post(path: str, body: str) -> str:
+async def _get(path: str) -> str:
+    """Send an HTTP GET to the TriCaster."""
+    return await _unit().client.get(path)
+
+
+async def _post(path: str, body: str) -> str:
     """Send an HTTP POST (XML shortcut) to the TriCaster."""
-    conn = http.client.HTTPConnection(TRICASTER_HOST, TRICASTER_PORT, timeout=TIMEOUT)
-    try:
-        encoded = body.encode("utf-8")
-        headers = {
-            "Content-Type": "text/xml",
-            "Content-Length": str(len(encoded)),
-            "Connection": "close",
-        }
-        conn.request("POST", path, body=encoded, headers=headers)
-        resp = conn.getresponse()
-        return resp.read().decode("utf-8", errors="replace").strip()
-    finally:
-        conn.close()
+    return await _unit().client.post(path, body)
 
 
-def shortcut(name: str, value: str | None = None, **kwargs) -> str:
+async def shortcut(name: str, value: str | None = None, **kwargs) -> str:
     """Send a shortcut command via GET."""
     params = {"name": name}
     if value is not None:
         params["value"] = str(value)
     params.update({k: str(v) for k, v in kwargs.items()})
-    return _get(f"/v1/shortcut?{urlencode(params)}")
+    return await _write(f"/v1/shortcut?{urlencode(params)}", name, lambda unit: _invalidate_for_shortcut(name, unit))
+
+
+async def _write(path: str, label: str, after: Callable[[Unit], None] | None = None) -> str:
+    """Send a write to the current target, fanning out to every group member concurrently.
+
+    ``after(unit)`` runs for each unit that accepted the write (cache invalidation and
+    the like). Returns the primary's response (or the first member that answered).
+    Per-member completion times and failures are logged for call_tool to report; the
+    write only raises if every member failed.
+    """
+    members = _current_target.get()
+    if len(members) == 1:
+        resp = await members[0].client.get(path)
+        if after is not None:
+            after(members[0])
+        return resp
+
+    start = time.perf_counter()
+    elapsed: dict[str, float] = {}
+
+    async def send(unit: Unit) -> str:
+        try:
+            resp = await unit.client.get(path)
+        finally:
+            elapsed[unit.name] = (time.perf_counter() - start) * 1000
+        if after is not None:
+            after(unit)
+        return resp
+
+    results = await asyncio.gather(*(send(unit) for unit in members), return_exceptions=True)
+    ok = [(unit, r) for unit, r in zip(members, results) if not isinstance(r, BaseException)]
+    failed = [(unit, r) for unit, r in zip(members, results) if isinstance(r, BaseException)]
+    if not ok:
+        raise failed[0][1]
+    _log_fanout(label, [unit for unit, _ in ok], failed, elapsed)
+    return ok[0][1]
+
+
+def _log_fanout(
+    label: str,
+    sent: list[Unit],
+    failed: list[tuple[Unit, BaseException]],
+    elapsed: dict[str, float],
+    superseded: list[Unit] | None = None,
+) -> None:
+    """Log a group write's per-member completion times (ms), skew and failures for call_tool to report."""
+    log = _fanout_log.get()
+    if log is None:
+        return
+    line = f"[mirror] {label}: " + ", ".join(f"{unit.name} {elapsed[unit.name]:.1f} ms" for unit in sent)
+    if sent:
+        times = [elapsed[unit.name] for unit in sent]
+        line += f" (skew {max(times) - min(times):.1f} ms)"
+    if superseded:
+        line += "; replaced by a newer value on " + ", ".join(unit.name for unit in superseded)
+    if failed:
+        line += "; FAILED " + ", ".join(f"{unit.name}: {e or type(e).__name__}" for unit, e in failed)
+    log.append(line)
+
+
+async def dictionary(key: str, fresh: bool = False) -> str:
+    """Read a state dictionary (XML) from the TriCaster.
+
+    Served from the live notification mirror when it is connected, otherwise from
+    cache if recent enough. Pass ``fresh=True`` to bypass both for reads that must
+    reflect the unit right now.
+    """
+    return (await _read_dictionary(key, fresh))[0]
+
+
+async def dictionaries(*keys: str, fresh: bool = False) -> dict[str, str]:
+    """Read several dictionaries concurrently, fetching each distinct key once."""
+    return {key: xml for key, (xml, _) in (await _read_dictionaries(*keys, fresh=fresh)).items()}
+
+
+async def _read_dictionary(key: str, fresh: bool) -> tuple[str, float]:
+    """Return (xml, fetched_at), where fetched_at is the monotonic time the XML left the unit."""
+    unit = _unit()
+    if not fresh:
+        hit = unit.mirror.lookup(key) or unit.cache.lookup(key)
+        if hit is not None:
+            return hit
+    generation = unit.cache.generation(key)
+    fetched_at = time.monotonic()
+    xml = await unit.client.get(f"/v1/dictionary?key={quote(key)}")
+    unit.cache.put(key, xml, generation, fetched_at)
+    return xml, fetched_at
 
 
-def dictionary(key: str) -> str:
-    """Read a state dictionary (XML) from the TriCaster."""
-    return _get(f"/v1/dictionary?key={quote(key)}")
+async def _ddr_reading(ddr: int, fresh: bool) -> DDRReading | None:
+    """Position of ``ddr``, extrapolated locally while the last sample can be trusted.
+
+    Returns None if ddr_timecode has no such DDR. Raises ET.ParseError.
+    """
+    unit = _unit()
+    if not fresh:
+        # A mirrored copy newer than our sample is free; the tracker ignores older ones.
+        mirrored = unit.mirror.lookup("ddr_timecode")
+        if mirrored is not None:
+            unit.ddr.update(*mirrored)
+        reading = unit.ddr.reading(ddr)
+        if reading is not None:
+            return reading
+    # The mirror only resyncs timecode occasionally, so new samples come from the cache or the unit.
+    hit = None if fresh else unit.cache.lookup("ddr_timecode")
+    xml, fetched_at = hit or await _read_dictionary("ddr_timecode", fresh=True)
+    unit.ddr.update(xml, fetched_at)
+    return unit.ddr.reading(ddr) or unit.ddr.sample(ddr)
+
+
+def dictionary_stream(key: str):
+    """Stream a dictionary straight from the TriCaster as raw body chunks (never cached).
+
+    Use with ``async with``; see TriCasterClient.stream.
+    """
+    return _unit().client.stream(f"/v1/dictionary?key={quote(key)}")
+
 
+async def _read_dictionaries(*keys: str, fresh: bool = False) -> dict[str, tuple[str, float]]:
+    unique = list(dict.fromkeys(keys))
+    results = await asyncio.gather(*(_read_dictionary(key, fresh) for key in unique))
+    return dict(zip(unique, results))
 
-def trigger(name: str, value: str | None = None) -> str:
+
+async def trigger(name: str, value: str | None = None) -> str:
     """Send a trigger command."""
     params = {"name": name}
     if value is not None:
         params["value"] = str(value)
-    return _get(f"/v1/trigger?{urlencode(params)}")
+    return await _write(f"/v1/trigger?{urlencode(params)}", f"trigger {name}", _invalidate_all)
 
 
-def datalink_set(key: str, value: str) -> str:
+async def datalink_set(key: str, value: str) -> str:
     """Set a DataLink key/value."""
-    return _get(f"/v1/datalink?{urlencode({'key': key, 'value': value})}")
+    return await _write(
+        f"/v1/datalink?{urlencode({'key': key, 'value': value})}",
+        f"datalink {key}",
+        lambda unit: unit.datalink.set(key, value),
+    )
+
+
+async def _coalesced(key: str, send: Callable[[], Awaitable[str]], urgent: bool = False) -> str | None:
+    """Send a latest-value-wins write; None if a newer write for ``key`` replaced it before it went out.
+
+    Each member of the target queues it in its own coalescer, so writes to a group and to one of
+    its members stay in order on that member. ``urgent`` skips the rate limit. Like _write, this
+    only raises if every member failed.
+    """
+    members = _current_target.get()
+    start = time.perf_counter()
+    elapsed: dict[str, float] = {}
+
+    def timed(unit: Unit) -> asyncio.Future:
+        future = copy_context().run(_submit, unit, key, send, urgent)
+        future.add_done_callback(lambda _: elapsed.setdefault(unit.name, (time.perf_counter() - start) * 1000))
+        return future
+
+    results = await asyncio.gather(*(timed(unit) for unit in members), return_exceptions=True)
+    failed = [(unit, r) for unit, r in zip(members, results) if isinstance(r, BaseException)]
+    if len(failed) == len(members):
+        raise failed[0][1]
+    sent = [(unit, r) for unit, r in zip(members, results) if r is not None and not isinstance(r, BaseException)]
+    if len(members) > 1:
+        superseded = [unit for unit, r in zip(members, results) if r is None]
+        _log_fanout(key.replace("datalink:", "datalink ", 1), [unit for unit, _ in sent], failed, elapsed, superseded)
+    # None only if no member sent it: every one that didn't fail had a newer value replace it.
+    return sent[0][1] if sent else None
+
+
+def _submit(unit: Unit, key: str, send: Callable[[], Awaitable[str]], urgent: bool) -> asyncio.Future:
+    _current_target.set((unit,))  # send() runs in a copy of this context, against ``unit`` alone
+    return unit.writes.submit(key, send, urgent)
+
+
+async def _set_shortcut(name: str, value: str | None = None) -> str | None:
+    """shortcut(), except that volume writes share set_audio_volume's coalescer slot, unthrottled.
+
+    Any path that may write a ``*_volume`` shortcut uses this, so an earlier set_audio_volume
+    still waiting on the rate limit can't land after it. None if a newer value replaced it.
+    """
+    if name.endswith("_volume"):
+        return await _coalesced(name, lambda: shortcut(name, value), urgent=True)
+    return await shortcut(name, value)
+
+
+async def _set_datalink(key: str, value: str) -> str | None:
+    """datalink_set() through set_datalink's coalescer slot, unthrottled, for the same reason."""
+    return await _coalesced(f"datalink:{key}", lambda: datalink_set(key, value), urgent=True)
+
+
+async def _datalink_table(fresh: bool = False) -> DataLinkTable:
+    """The unit's parsed DataLink table, refetched once it is older than its cache TTL."""
+    unit = _unit()
+    table = unit.datalink
+    if fresh or time.monotonic() - table.fetched_at > CACHE_TTLS["datalink"]:
+        fetched_at = time.monotonic()
+        table.load(await unit.client.get("/v1/datalink"), fetched_at)
+    return table
+
 
+def _parse_feeds(spec: str) -> list[Feed]:
+    feeds = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, path = entry.rpartition("=")
+        feeds.append(Feed(path.strip(), prefix.strip()))
+    return feeds
 
-def datalink_get_all() -> str:
+
+async def _push_feed_value(key: str, value: str) -> str | None:
+    """Feed watcher hook: set a DataLink key on the default target through the coalescer."""
+    _current_target.set(_resolve_target(DEFAULT_HOST))
+    return await _coalesced(f"datalink:{key}", lambda: datalink_set(key, value))
+
+
+FEEDS = _parse_feeds(TRICASTER_FEEDS)
+_feed_watcher = FeedWatcher(FEEDS, _push_feed_value)
+
+
+async def datalink_get_all() -> str:
     """Get all current DataLink key/value pairs (XML)."""
-    return _get("/v1/datalink")
+    return await _get("/v1/datalink")
+
+
+def _invalidate_for_shortcut(name: str, unit: Unit | None = None) -> None:
+    """Drop the cached dictionaries a shortcut may have changed on ``unit`` (default: current)."""
+    families = {
+        family
+        for pattern, affected in SHORTCUT_INVALIDATES
+        if fnmatchcase(name, pattern)
+        for family in affected
+    }
+    unit = unit or _unit()
+    if families:
+        unit.cache.invalidate(*families)
+        unit.mirror.invalidate(*families)
+        if "ddr_timecode" in families:
+            unit.ddr.invalidate()
+    else:
+        _invalidate_all(unit)
+
+
+def _invalidate_all(unit: Unit | None = None) -> None:
+    unit = unit or _unit()
+    unit.cache.invalidate_all()
+    unit.mirror.invalidate(*unit.mirror.keys)
+    unit.ddr.invalidate()
 
 
 # ---------------------------------------------------------------------------
@@ -89,656 +507,1627 @@ def datalink_get_all() -> str:
 
 server = Server("tricaster-mcp")
 
+_FRESH = {
+    "type": "boolean",
+    "description": "Bypass the short-lived state cache and read directly from the TriCaster",
+    "default": False,
+}
+_HOST = {
+    "type": "string",
+    "description": (
+        f"Which TriCaster to control (default '{DEFAULT_HOST}')"
+        + (f". Groups send writes to all their members: {', '.join(GROUPS)}" if GROUPS else "")
+    ),
+    "enum": list(UNITS) + list(GROUPS),
+}
+_DDR = {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]}
+_DSK = {"type": "integer", "description": "DSK number (1 or 2)", "enum": [1, 2]}
+_RECORDER = {"type": "integer", "description": "Recorder number (default 1)", "default": 1}
+_CHANNEL = {"type": "string", "description": "Channel name, e.g. 'master', 'input1', 'ddr1'"}
+
+
+def _number(args: dict, name: str, default: float) -> float:
+    """A finite numeric argument, or ``default`` if absent. Raises ValueError with a message for the result."""
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        number = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"'{name}' must be a number, not {value!r}")
+    return number
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A tool's MCP definition together with its handler and the dictionaries it reads."""
+
+    tool: Tool
+    handler: Callable[[dict], Awaitable[str]]
+    reads: tuple[str, ...] = ()
+    deadline: float | None = TOOL_DEADLINE
+
+
+# Registration order is the order clients see in list_tools.
+TOOLS: dict[str, ToolSpec] = {}
+
+
+def tool(
+    name: str,
+    description: str,
+    properties: dict | None = None,
+    required: list[str] | None = None,
+    reads: tuple[str, ...] = (),
+    fresh: bool | None = None,
+    deadline: float | None = TOOL_DEADLINE,
+):
+    """Register ``handler(args) -> str`` as an MCP tool.
+
+    ``reads`` lists the dictionary families the tool reads; tools that read
+    cached state (or pass ``fresh=True``) get the ``fresh`` argument added.
+    Every tool takes an optional ``host`` naming the unit to act on.
+    ``deadline`` bounds all of the call's requests together (None: only the
+    per-request TIMEOUT, for tools that wait on purpose).
+    """
+    properties = dict(properties or {})
+    if fresh if fresh is not None else bool(reads):
+        properties["fresh"] = _FRESH
+    properties["host"] = _HOST
+
+    def register(handler: Callable[[dict], Awaitable[str]]):
+        schema = {"type": "object", "properties": properties, "required": required or []}
+        TOOLS[name] = ToolSpec(
+            Tool(name=name, description=description, inputSchema=schema), handler, reads, deadline
+        )
+        return handler
+
+    return register
+
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
-    return [
-        # ── System info ────────────────────────────────────────────────────
-        Tool(
-            name="get_system_info",
-            description="Get TriCaster model, version, session name, and resolution.",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="get_tally",
-            description=(
-                "Get tally state for all inputs — which sources are on Program "
-                "and which are on Preview."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="list_sources",
-            description=(
-                "List all available input sources by name (inputs, DDRs, buffers, graphics, etc.). "
-                "Use this to discover valid source names before calling switch_program or switch_preview."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-
-        # ── Switcher ───────────────────────────────────────────────────────
-        Tool(
-            name="get_switcher_state",
-            description=(
-                "Get the current switcher state: Program source, Preview source, "
-                "active effect/transition, and T-bar position."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="switch_program",
-            description=(
-                "Cut directly to a new Program source (no transition). "
-                "Use list_sources to see valid source names. "
-                "Common sources: input1–inputN, ddr1, ddr2, gfx1, gfx2, bfr1–bfrN, black."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "source": {
-                        "type": "string",
-                        "description": "Source name, e.g. 'input1', 'ddr1', 'gfx1', 'black'",
-                    }
-                },
-                "required": ["source"],
-            },
-        ),
-        Tool(
-            name="switch_preview",
-            description=(
-                "Set the Preview row to a new source without going to air. "
-                "Use list_sources to see valid source names."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "source": {
-                        "type": "string",
-                        "description": "Source name, e.g. 'input2', 'ddr1', 'gfx2'",
-                    }
-                },
-                "required": ["source"],
-            },
-        ),
-        Tool(
-            name="auto_transition",
-            description=(
-                "Perform an Auto transition on the main switcher background layer "
-                "(takes Preview to Program using the current effect)."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="cut_transition",
-            description="Perform an instant Cut transition (Program ↔ Preview).",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="set_transition_effect",
-            description=(
-                "Set the active transition effect on the main background switcher "
-                "(e.g. 'Cut', 'Dissolve', 'Wipe', or any effect name from the effects bin). "
-                "Use get_switcher_state to see available effects."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "effect": {
-                        "type": "string",
-                        "description": "Effect name, e.g. 'Dissolve', 'Wipe', 'Cut'",
-                    }
-                },
-                "required": ["effect"],
-            },
-        ),
+    return _TOOL_LIST
 
-        # ── DSK (downstream keyers) ────────────────────────────────────────
-        Tool(
-            name="dsk_on",
-            description="Bring a DSK (downstream keyer) layer on air.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "dsk": {
-                        "type": "integer",
-                        "description": "DSK number (1 or 2)",
-                        "enum": [1, 2],
-                    }
-                },
-                "required": ["dsk"],
-            },
-        ),
-        Tool(
-            name="dsk_off",
-            description="Take a DSK (downstream keyer) layer off air.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "dsk": {
-                        "type": "integer",
-                        "description": "DSK number (1 or 2)",
-                        "enum": [1, 2],
-                    }
-                },
-                "required": ["dsk"],
-            },
-        ),
-        Tool(
-            name="dsk_auto",
-            description="Auto-transition a DSK layer on or off.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "dsk": {"type": "integer", "description": "DSK number (1 or 2)", "enum": [1, 2]}
-                },
-                "required": ["dsk"],
-            },
-        ),
 
-        # ── Recording ─────────────────────────────────────────────────────
-        Tool(
-            name="start_record",
-            description="Start recording. Optionally specify recorder number (default: 1).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "recorder": {
-                        "type": "integer",
-                        "description": "Recorder number (default 1)",
-                        "default": 1,
-                    }
-                },
-                "required": [],
-            },
-        ),
-        Tool(
-            name="stop_record",
-            description="Stop recording. Optionally specify recorder number (default: 1).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "recorder": {
-                        "type": "integer",
-                        "description": "Recorder number (default 1)",
-                        "default": 1,
-                    }
-                },
-                "required": [],
-            },
-        ),
-        Tool(
-            name="get_record_state",
-            description="Get the current recording state (active/inactive). Optionally specify recorder number (default: 1).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "recorder": {
-                        "type": "integer",
-                        "description": "Recorder number (default 1)",
-                        "default": 1,
-                    }
-                },
-                "required": [],
-            },
-        ),
-
-        # ── Streaming ─────────────────────────────────────────────────────
-        Tool(
-            name="start_stream",
-            description="Start streaming on the primary streamer.",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="stop_stream",
-            description="Stop streaming on the primary streamer.",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="get_stream_state",
-            description="Get the current streaming state (active/inactive).",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-
-        # ── Fade to Black ─────────────────────────────────────────────────
-        Tool(
-            name="fade_to_black",
-            description=(
-                "Fade the program output to black using an auto transition. "
-                "Call again to fade back up from black."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="take_to_black",
-            description="Instantly cut the program output to black (no transition).",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-
-        # ── Audio mixer ───────────────────────────────────────────────────
-        Tool(
-            name="get_audio_state",
-            description=(
-                "Get the current state of all audio channels: mute status and volume levels. "
-                "Returns a summary of the audio mixer."
-            ),
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="set_audio_mute",
-            description=(
-                "Mute or unmute an audio channel. "
-                "Channel names: 'master', 'input1'–'input8', 'ddr1', 'ddr2', 'aux1', 'phones'."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "channel": {
-                        "type": "string",
-                        "description": "Channel name, e.g. 'master', 'input1', 'ddr1'",
-                    },
-                    "mute": {
-                        "type": "boolean",
-                        "description": "True to mute, False to unmute",
-                    },
-                },
-                "required": ["channel", "mute"],
-            },
-        ),
-        Tool(
-            name="set_audio_volume",
-            description=(
-                "Set the volume (gain) of an audio channel. "
-                "Value is a float; 0 = unity gain, negative = lower, positive = louder. "
-                "Channel names: 'master', 'input1'–'input8', 'ddr1', 'ddr2', 'aux1', 'phones'."
-            ),
-            inputSchema={
+@server.call_tool()
+async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    target = _resolve_target(arguments.get("host") or DEFAULT_HOST)
+    if target is None:
+        text = f"Unknown TriCaster {arguments['host']!r}. Configured: {', '.join([*UNITS, *GROUPS])}"
+        return [TextContent(type="text", text=text)]
+    unit = target[0]
+    label = name if name in TOOLS else "(unknown)"
+    fanout: list[str] = []
+    tokens = _current_target.set(target), _fanout_log.set(fanout)
+    try:
+        with unit.metrics.tool_call(label):
+            result = await _handle(name, arguments)
+    except Exception as e:
+        result = f"Error communicating with TriCaster: {e}"
+    finally:
+        _current_target.reset(tokens[0])
+        _fanout_log.reset(tokens[1])
+    if fanout:
+        result += "\n" + "\n".join(fanout)
+    unit.metrics.record_response_bytes(label, len(result.encode()))
+    return [TextContent(type="text", text=result)]
+
+
+async def _handle(name: str, args: dict) -> str:
+    spec = TOOLS.get(name)
+    if spec is None:
+        return f"Unknown tool: {name}"
+    with deadline(spec.deadline):
+        return await spec.handler(args)
+
+
+# ---------------------------------------------------------------------------
+# Tools
+# ---------------------------------------------------------------------------
+
+# ── System info ─────────────────────────────────────────────────────────
+
+@tool("get_system_info", "Get TriCaster model, version, session name, and resolution.")
+async def get_system_info(args: dict) -> str:
+    return await _get("/v1/version")
+
+
+@tool(
+    "get_tally",
+    "Get tally state for all inputs — which sources are on Program and which are on Preview.",
+    reads=("tally",),
+)
+async def get_tally(args: dict) -> str:
+    xml = await dictionary("tally", fresh=args.get("fresh", False))
+    return _parse_tally(xml)
+
+
+@tool(
+    "list_sources",
+    "List all available input sources by name (inputs, DDRs, buffers, graphics, etc.). "
+    "Use this to discover valid source names before calling switch_program or switch_preview.",
+    reads=("tally", "switcher"),
+)
+async def list_sources(args: dict) -> str:
+    xml = await dictionaries("tally", "switcher", fresh=args.get("fresh", False))
+    return _parse_source_list(xml["tally"], xml["switcher"])
+
+
+@tool(
+    "get_show_state",
+    "One-call snapshot of the whole show: switcher, tally, recording, streaming, "
+    "audio, and both DDRs, with how old each section is. "
+    "Use this instead of calling the individual get_* tools one by one.",
+    reads=_SHOW_STATE_KEYS,
+)
+async def get_show_state(args: dict) -> str:
+    return await _show_state(args.get("fresh", False))
+
+
+# ── Switcher ────────────────────────────────────────────────────────────
+
+@tool(
+    "get_switcher_state",
+    "Get the current switcher state: Program source, Preview source, "
+    "active effect/transition, and T-bar position.",
+    reads=("switcher",),
+)
+async def get_switcher_state(args: dict) -> str:
+    xml = await dictionary("switcher", fresh=args.get("fresh", False))
+    return _parse_switcher_state(xml)
+
+
+@tool(
+    "switch_program",
+    "Cut directly to a new Program source (no transition). "
+    "Use list_sources to see valid source names. "
+    "Common sources: input1–inputN, ddr1, ddr2, gfx1, gfx2, bfr1–bfrN, black.",
+    {"source": {"type": "string", "description": "Source name, e.g. 'input1', 'ddr1', 'gfx1', 'black'"}},
+    ["source"],
+    deadline=ON_AIR_DEADLINE,
+)
+async def switch_program(args: dict) -> str:
+    source = args["source"]
+    resp = await shortcut("main_a_row_named_input", source)
+    return f"Program cut to '{source}'. Response: {resp}"
+
+
+@tool(
+    "switch_preview",
+    "Set the Preview row to a new source without going to air. "
+    "Use list_sources to see valid source names.",
+    {"source": {"type": "string", "description": "Source name, e.g. 'input2', 'ddr1', 'gfx2'"}},
+    ["source"],
+    deadline=ON_AIR_DEADLINE,
+)
+async def switch_preview(args: dict) -> str:
+    source = args["source"]
+    resp = await shortcut("main_b_row_named_input", source)
+    return f"Preview set to '{source}'. Response: {resp}"
+
+
+@tool(
+    "auto_transition",
+    "Perform an Auto transition on the main switcher background layer "
+    "(takes Preview to Program using the current effect).",
+    deadline=ON_AIR_DEADLINE,
+)
+async def auto_transition(args: dict) -> str:
+    resp = await shortcut("main_background_auto")
+    return f"Auto transition executed. Response: {resp}"
+
+
+@tool("cut_transition", "Perform an instant Cut transition (Program ↔ Preview).", deadline=ON_AIR_DEADLINE)
+async def cut_transition(args: dict) -> str:
+    resp = await shortcut("main_background_cut")
+    return f"Cut transition executed. Response: {resp}"
+
+
+@tool(
+    "set_transition_effect",
+    "Set the active transition effect on the main background switcher "
+    "(e.g. 'Cut', 'Dissolve', 'Wipe', or any effect name from the effects bin). "
+    "Use get_switcher_state to see available effects.",
+    {"effect": {"type": "string", "description": "Effect name, e.g. 'Dissolve', 'Wipe', 'Cut'"}},
+    ["effect"],
+    deadline=ON_AIR_DEADLINE,
+)
+async def set_transition_effect(args: dict) -> str:
+    effect = args["effect"].lower()
+    if effect in ("fade", "dissolve"):
+        resp = await shortcut("main_background_select_fade", "true")
+        return f"Transition effect set to fade/dissolve. Response: {resp}"
+    elif effect == "cut":
+        resp = await shortcut("main_background_select_fade", "false")
+        return f"Transition effect set to cut. Response: {resp}"
+    else:
+        # Try selecting by effect path/name for file-based effects
+        resp = await shortcut("main_background_effect_select", args["effect"])
+        return f"Transition effect '{args['effect']}' selected. Response: {resp}"
+
+
+# ── DSK (downstream keyers) ─────────────────────────────────────────────
+
+@tool("dsk_on", "Bring a DSK (downstream keyer) layer on air.", {"dsk": _DSK}, ["dsk"], deadline=ON_AIR_DEADLINE)
+async def dsk_on(args: dict) -> str:
+    dsk = args["dsk"]
+    resp = await shortcut(f"main_dsk{dsk}_on")
+    return f"DSK{dsk} brought on air. Response: {resp}"
+
+
+@tool("dsk_off", "Take a DSK (downstream keyer) layer off air.", {"dsk": _DSK}, ["dsk"], deadline=ON_AIR_DEADLINE)
+async def dsk_off(args: dict) -> str:
+    dsk = args["dsk"]
+    resp = await shortcut(f"main_dsk{dsk}_off")
+    return f"DSK{dsk} taken off air. Response: {resp}"
+
+
+@tool("dsk_auto", "Auto-transition a DSK layer on or off.", {"dsk": _DSK}, ["dsk"], deadline=ON_AIR_DEADLINE)
+async def dsk_auto(args: dict) -> str:
+    dsk = args["dsk"]
+    resp = await shortcut(f"main_dsk{dsk}_auto")
+    return f"DSK{dsk} auto transition. Response: {resp}"
+
+
+# ── Recording ───────────────────────────────────────────────────────────
+
+def _record_shortcut(recorder: int) -> str:
+    return "record_toggle" if recorder == 1 else f"record{recorder}_toggle"
+
+
+@tool(
+    "start_record",
+    "Start recording. Optionally specify recorder number (default: 1).",
+    {"recorder": _RECORDER},
+)
+async def start_record(args: dict) -> str:
+    recorder = args.get("recorder", 1)
+    resp = await shortcut(_record_shortcut(recorder), "1")
+    return f"Recorder {recorder} start sent. Response: {resp}"
+
+
+@tool(
+    "stop_record",
+    "Stop recording. Optionally specify recorder number (default: 1).",
+    {"recorder": _RECORDER},
+)
+async def stop_record(args: dict) -> str:
+    recorder = args.get("recorder", 1)
+    resp = await shortcut(_record_shortcut(recorder), "0")
+    return f"Recorder {recorder} stop sent. Response: {resp}"
+
+
+@tool(
+    "get_record_state",
+    "Get the current recording state (active/inactive). Optionally specify recorder number (default: 1).",
+    {"recorder": _RECORDER},
+    reads=("shortcut_states",),
+)
+async def get_record_state(args: dict) -> str:
+    recorder = args.get("recorder", 1)
+    return await _get_shortcut_state(
+        _record_shortcut(recorder), f"Recording (recorder {recorder})", fresh=args.get("fresh", False)
+    )
+
+
+# ── Streaming ───────────────────────────────────────────────────────────
+
+@tool("start_stream", "Start streaming on the primary streamer.")
+async def start_stream(args: dict) -> str:
+    resp = await shortcut("streaming_toggle", "1")
+    return f"Stream start sent. Response: {resp}"
+
+
+@tool("stop_stream", "Stop streaming on the primary streamer.")
+async def stop_stream(args: dict) -> str:
+    resp = await shortcut("streaming_toggle", "0")
+    return f"Stream stop sent. Response: {resp}"
+
+
+@tool("get_stream_state", "Get the current streaming state (active/inactive).", reads=("shortcut_states",))
+async def get_stream_state(args: dict) -> str:
+    return await _get_shortcut_state("streaming_toggle", "Streaming", fresh=args.get("fresh", False))
+
+
+# ── Fade to Black ───────────────────────────────────────────────────────
+
+@tool(
+    "fade_to_black",
+    "Fade the program output to black using an auto transition. "
+    "Call again to fade back up from black.",
+    deadline=ON_AIR_DEADLINE,
+)
+async def fade_to_black(args: dict) -> str:
+    resp = await shortcut("main_ftb_auto")
+    return f"Fade to black executed. Response: {resp}"
+
+
+@tool("take_to_black", "Instantly cut the program output to black (no transition).", deadline=ON_AIR_DEADLINE)
+async def take_to_black(args: dict) -> str:
+    resp = await shortcut("main_ftb_take")
+    return f"Take to black executed. Response: {resp}"
+
+
+# ── Audio mixer ─────────────────────────────────────────────────────────
+
+@tool(
+    "get_audio_state",
+    "Get the current state of all audio channels: mute status and volume levels. "
+    "Returns a summary of the audio mixer.",
+    reads=("audiomixer", "shortcut_states"),
+)
+async def get_audio_state(args: dict) -> str:
+    xml = await dictionaries("audiomixer", "shortcut_states", fresh=args.get("fresh", False))
+    return _parse_audio_state(xml["audiomixer"], xml["shortcut_states"])
+
+
+@tool(
+    "set_audio_mute",
+    "Mute or unmute an audio channel. "
+    "Channel names: 'master', 'input1'–'input8', 'ddr1', 'ddr2', 'aux1', 'phones'.",
+    {"channel": _CHANNEL, "mute": {"type": "boolean", "description": "True to mute, False to unmute"}},
+    ["channel", "mute"],
+)
+async def set_audio_mute(args: dict) -> str:
+    channel = args["channel"]
+    mute_val = "true" if args["mute"] else "false"
+    resp = await shortcut(f"{channel}_mute", mute_val)
+    state = "muted" if args["mute"] else "unmuted"
+    return f"Channel '{channel}' {state}. Response: {resp}"
+
+
+@tool(
+    "set_audio_volume",
+    "Set the volume (gain) of an audio channel. "
+    "Value is a float; 0 = unity gain, negative = lower, positive = louder. "
+    "Channel names: 'master', 'input1'–'input8', 'ddr1', 'ddr2', 'aux1', 'phones'.",
+    {"channel": _CHANNEL, "volume": {"type": "number", "description": "Volume level as a float (0 = unity)"}},
+    ["channel", "volume"],
+)
+async def set_audio_volume(args: dict) -> str:
+    channel = args["channel"]
+    volume = args["volume"]
+    name = f"{channel}_volume"
+    resp = await _coalesced(name, lambda: shortcut(name, str(volume)))
+    if resp is None:
+        return f"Channel '{channel}' volume {volume} skipped: a newer volume replaced it before it was sent."
+    return f"Channel '{channel}' volume set to {volume}. Response: {resp}"
+
+
+# ── DDR (media players) ─────────────────────────────────────────────────
+
+@tool(
+    "get_ddr_status",
+    "Get the current status of a DDR (media player): playback state, "
+    "timecode position, clip name, loop, and autoplay mode.",
+    {"ddr": _DDR},
+    ["ddr"],
+    reads=("ddr_timecode",),
+)
+async def get_ddr_status(args: dict) -> str:
+    ddr = args["ddr"]
+    try:
+        reading = await _ddr_reading(ddr, args.get("fresh", False))
+    except ET.ParseError as e:
+        return f"DDR{ddr}: unparseable ddr_timecode response ({e})"
+    if reading is None:
+        return f"DDR{ddr} not found in timecode response (may have no clip loaded)."
+    return _format_ddr_status(ddr, reading)
+
+
+@tool("ddr_play", "Play a DDR (media player).", {"ddr": _DDR}, ["ddr"])
+async def ddr_play(args: dict) -> str:
+    ddr = args["ddr"]
+    resp = await shortcut(f"ddr{ddr}_play")
+    return f"DDR{ddr} play. Response: {resp}"
+
+
+@tool("ddr_stop", "Stop/pause a DDR (media player).", {"ddr": _DDR}, ["ddr"])
+async def ddr_stop(args: dict) -> str:
+    ddr = args["ddr"]
+    resp = await shortcut(f"ddr{ddr}_stop")
+    return f"DDR{ddr} stop. Response: {resp}"
+
+
+@tool(
+    "ddr_set_loop",
+    "Enable or disable loop mode on a DDR (media player).",
+    {"ddr": _DDR, "enabled": {"type": "boolean", "description": "True to enable loop, False to disable"}},
+    ["ddr", "enabled"],
+)
+async def ddr_set_loop(args: dict) -> str:
+    ddr = args["ddr"]
+    val = "true" if args["enabled"] else "false"
+    resp = await shortcut(f"ddr{ddr}_loop_mode_toggle", val)
+    state = "enabled" if args["enabled"] else "disabled"
+    return f"DDR{ddr} loop {state}. Response: {resp}"
+
+
+@tool(
+    "ddr_set_autoplay",
+    "Enable or disable autoplay mode on a DDR (media player).",
+    {"ddr": _DDR, "enabled": {"type": "boolean", "description": "True to enable autoplay, False to disable"}},
+    ["ddr", "enabled"],
+)
+async def ddr_set_autoplay(args: dict) -> str:
+    ddr = args["ddr"]
+    val = "true" if args["enabled"] else "false"
+    resp = await shortcut(f"ddr{ddr}_autoplay_mode_toggle", val)
+    state = "enabled" if args["enabled"] else "disabled"
+    return f"DDR{ddr} autoplay {state}. Response: {resp}"
+
+
+# ── Media browser ───────────────────────────────────────────────────────
+
+@tool(
+    "browse_media",
+    "Browse available media files on the TriCaster. "
+    "Optionally provide a path to browse a specific folder. "
+    "To find a clip by name use find_media, which searches a local index instead.",
+    {"path": {"type": "string", "description": "Optional folder path to browse (leave empty for root)"}},
+    reads=("filebrowser",),
+)
+async def browse_media(args: dict) -> str:
+    path = args.get("path", "")
+    key = f"filebrowser:{path}" if path else "filebrowser"
+    if args.get("fresh", False):
+        return await _browse_media_stream(key)
+    return _parse_filebrowser(await dictionary(key))
+
+
+_CURSOR = {"type": "string", "description": "'Next page' cursor from a previous call with the same arguments"}
+
+
+@tool(
+    "find_media",
+    "Find media files by name in a local index of the whole media library, e.g. 'river bridge'. "
+    "Matches name prefixes, then substrings, then close spellings. Much faster than walking folders "
+    "with browse_media.",
+    {
+        "query": {"type": "string", "description": "Part of the clip name"},
+        "mode": {
+            "type": "string",
+            "enum": ["auto", "prefix", "substring", "fuzzy"],
+            "description": "Match type (default auto: prefix, then substring, then fuzzy)",
+            "default": "auto",
+        },
+        "folder": {"type": "string", "description": "Only search below this folder path"},
+        "limit": {"type": "integer", "description": "Results per page (default 20, max 200)", "default": 20},
+        "cursor": _CURSOR,
+    },
+    ["query"],
+)
+async def find_media(args: dict) -> str:
+    index, note = await _media_index()
+    try:
+        rows, cursor, total = index.search(
+            args["query"], args.get("mode", "auto"), args.get("folder", ""),
+            min(int(args.get("limit", 20)), 200), args.get("cursor"),
+        )
+    except ValueError as e:
+        return f"Cannot search: {e}"
+    lines = [f"=== Media matching {args['query']!r}: {total} ===", note]
+    lines += [f"  {f.name}  [{how}]\n    {f.path}" for f, how in rows] or ["  (no matches)"]
+    if cursor:
+        lines.append(f"Next page: cursor={cursor}")
+    return "\n".join(lines)
+
+
+@tool(
+    "list_media",
+    "List a media folder from the local media index, a page at a time: its subfolders and files "
+    "(or every file below it with recursive=true).",
+    {
+        "folder": {"type": "string", "description": "Folder path (leave empty for the top level)"},
+        "recursive": {"type": "boolean", "description": "Include files in all subfolders", "default": False},
+        "limit": {"type": "integer", "description": "Files per page (default 50, max 500)", "default": 50},
+        "cursor": _CURSOR,
+    },
+)
+async def list_media(args: dict) -> str:
+    index, note = await _media_index()
+    folder = args.get("folder", "")
+    try:
+        subfolders, files, cursor, total = index.listing(
+            folder, bool(args.get("recursive", False)), min(int(args.get("limit", 50)), 500), args.get("cursor")
+        )
+    except ValueError as e:
+        return f"Cannot list: {e}"
+    lines = [f"=== Media in {folder or '(top level)'}: {total} file(s) ===", note]
+    if subfolders and not args.get("cursor"):
+        lines += ["Folders:", *(f"  [{p}]" for p in subfolders)]
+    if files:
+        lines += ["Files:", *(f"  {f.name}  ({f.path})" for f in files)]
+    if not subfolders and not files:
+        lines.append("  (empty, or not indexed)")
+    if cursor:
+        lines.append(f"Next page: cursor={cursor}")
+    return "\n".join(lines)
+
+
+@tool(
+    "refresh_media_index",
+    "Refresh the local media index now. Only folders whose contents changed are fetched and re-indexed; "
+    "pass full=true to revisit every folder.",
+    {"full": {"type": "boolean", "description": "Revisit every folder, not just changed ones", "default": False}},
+    deadline=None,
+)
+async def refresh_media_index(args: dict) -> str:
+    index = _unit().media
+    with deadline(None, detach=True):  # the crawl carries on if this call is abandoned
+        task = index.refresh(bool(args.get("full", False)))
+    report = await asyncio.shield(task)
+    return f"{_fmt_refresh(report)}\n{_media_note(index)}"
+
+
+async def _media_index() -> tuple[MediaIndex, str]:
+    """The current unit's media index, built first if it never has been, and a line on its state."""
+    index = _unit().media
+    if index.last_refresh is None:
+        with deadline(None, detach=True):
+            task = index.refresh()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), MEDIA_BUILD_WAIT)
+        except TimeoutError:
+            pass  # answer from what has been indexed so far
+    return index, _media_note(index)
+
+
+def _media_note(index: MediaIndex) -> str:
+    line = f"(index: {index.size} files in {len(index.folders)} folders"
+    if index.last_refresh is not None:
+        line += f", refreshed {time.time() - index.last_refresh.started:.0f} s ago"
+        if index.last_refresh.errors:
+            line += f", {len(index.last_refresh.errors)} folder(s) failed"
+    if index.refreshing:
+        line += ", refresh in progress" if index.last_refresh is not None else ", still being built"
+    return line + ")"
+
+
+def _fmt_refresh(r: RefreshReport) -> str:
+    lines = [
+        f"Media index {'full ' if r.full else ''}refresh in {r.elapsed:.2f} s: {r.fetched} folder(s) fetched, "
+        f"{r.changed} re-indexed, {r.unchanged} unchanged, {r.skipped} skipped (stamp unchanged), "
+        f"{r.removed} removed"
+    ]
+    lines += [f"  failed: {e}" for e in r.errors[:10]]
+    if len(r.errors) > 10:
+        lines.append(f"  ... and {len(r.errors) - 10} more")
+    return "\n".join(lines)
+
+
+async def _refresh_media_indexes() -> None:
+    """Build every unit's media index, then refresh it every MEDIA_REFRESH_INTERVAL seconds."""
+    rounds = 0
+    while True:
+        full = rounds > 0 and rounds % MEDIA_FULL_REFRESH_EVERY == 0
+        await asyncio.gather(*(unit.media.refresh(full) for unit in UNITS.values()), return_exceptions=True)
+        rounds += 1
+        await asyncio.sleep(MEDIA_REFRESH_INTERVAL)
+
+
+# ── Macros ──────────────────────────────────────────────────────────────
+
+@tool(
+    "list_macros",
+    "List all available macros (system and session) by name and ID.",
+    reads=("macros_list",),
+)
+async def list_macros(args: dict) -> str:
+    xml = await dictionary("macros_list", fresh=args.get("fresh", False))
+    return _parse_macros(xml)
+
+
+@tool(
+    "run_macro",
+    "Execute a macro by name.",
+    {"name": {"type": "string", "description": "Macro name as shown in the macro list"}},
+    ["name"],
+)
+async def run_macro(args: dict) -> str:
+    macro_name = args["name"]
+    resp = await trigger("macro", macro_name)
+    return f"Macro '{macro_name}' triggered. Response: {resp}"
+
+
+# ── Raw / advanced ──────────────────────────────────────────────────────
+
+@tool(
+    "send_shortcut",
+    "Send any raw shortcut command to the TriCaster. "
+    "Use this for advanced/custom control not covered by other tools.",
+    {
+        "name": {"type": "string", "description": "Shortcut name, e.g. 'main_background_auto'"},
+        "value": {"type": "string", "description": "Optional value for the shortcut"},
+    },
+    ["name"],
+)
+async def send_shortcut(args: dict) -> str:
+    sc_name = args["name"]
+    resp = await _set_shortcut(sc_name, args.get("value"))
+    if resp is None:
+        return f"Shortcut '{sc_name}' skipped: a newer value replaced it before it was sent."
+    return f"Shortcut '{sc_name}' sent. Response: {resp}"
+
+
+@tool(
+    "get_dictionary",
+    "Read any TriCaster state dictionary by key. "
+    "Common keys: switcher, tally, buffer, macros_list, switcher_ui_effects, filebrowser, audiomixer, ddr_timecode.",
+    {"key": {"type": "string", "description": "Dictionary key, e.g. 'switcher', 'tally'"}},
+    ["key"],
+    fresh=True,
+)
+async def get_dictionary(args: dict) -> str:
+    return await dictionary(args["key"], fresh=args.get("fresh", False))
+
+
+@tool("get_datalink", "Get all current DataLink key/value pairs (live data fields like scores, time, etc.).")
+async def get_datalink(args: dict) -> str:
+    return await datalink_get_all()
+
+
+@tool(
+    "set_datalink",
+    "Set a DataLink key to a value (e.g. update a score or text field).",
+    {
+        "key": {"type": "string", "description": "DataLink key name"},
+        "value": {"type": "string", "description": "Value to set"},
+    },
+    ["key", "value"],
+)
+async def set_datalink(args: dict) -> str:
+    key, value = args["key"], args["value"]
+    resp = await _coalesced(f"datalink:{key}", lambda: datalink_set(key, value))
+    if resp is None:
+        return f"DataLink '{key}' = '{value}' skipped: a newer value replaced it before it was sent."
+    return f"DataLink '{key}' set to '{value}'. Response: {resp}"
+
+
+@tool(
+    "set_datalink_many",
+    "Set many DataLink keys in one call (e.g. every field of a lower third or scoreboard). "
+    "Keys already holding the requested value are skipped; the rest are sent in parallel.",
+    {
+        "values": {
+            "type": "object",
+            "description": "DataLink key -> value, e.g. {'home_score': '3', 'away_score': '1'}",
+            "additionalProperties": {"type": "string"},
+        },
+        "skip_unchanged": {
+            "type": "boolean",
+            "description": "Don't resend keys that already have the value (default true)",
+            "default": True,
+        },
+    },
+    ["values"],
+)
+async def set_datalink_many(args: dict) -> str:
+    values = {str(k): str(v) for k, v in args["values"].items()}
+    if args.get("skip_unchanged", True):
+        current = (await _datalink_table()).values
+        values = {k: v for k, v in values.items() if current.get(k) != v}
+    skipped = len(args["values"]) - len(values)
+    start = time.perf_counter()
+    # Through the coalescer, so a queued set_datalink for the same key can't land afterwards.
+    results = await asyncio.gather(
+        *(_coalesced(f"datalink:{k}", lambda k=k, v=v: datalink_set(k, v)) for k, v in values.items()),
+        return_exceptions=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    failed = [(k, r) for k, r in zip(values, results) if isinstance(r, BaseException)]
+    superseded = sum(r is None for r in results)
+    lines = [f"Set {len(values) - len(failed) - superseded} DataLink key(s) in {elapsed:.1f} ms"]
+    if skipped:
+        lines.append(f"  {skipped} unchanged key(s) skipped")
+    if superseded:
+        lines.append(f"  {superseded} key(s) replaced by a newer value before they were sent")
+    lines += [f"  FAILED {k}: {e or type(e).__name__}" for k, e in failed]
+    return "\n".join(lines)
+
+
+@tool(
+    "get_datalink_changes",
+    "Get only the DataLink keys that changed since an earlier call, instead of the whole table. "
+    "Pass the token from the previous result as 'since'; without one, every key is returned.",
+    {"since": {"type": "string", "description": "Token returned by the previous get_datalink_changes call"}},
+    fresh=True,
+)
+async def get_datalink_changes(args: dict) -> str:
+    table = await _datalink_table(args.get("fresh", False))
+    since = args.get("since")
+    changes = table.changes_since(since)
+    if changes is None:
+        header = "All DataLink keys" + (" (token not recognised)" if since else "")
+        changes = dict(table.values)
+    else:
+        header = "Changed DataLink keys" if changes else "No DataLink changes"
+    lines = [f"=== {header} ===", f"Token: {table.token}"]
+    lines += [f"  {k} = {v}" if v is not None else f"  {k} (removed)" for k, v in sorted(changes.items())]
+    return "\n".join(lines)
+
+
+@tool("get_feed_status", "Show the data files being pushed into DataLink (TRICASTER_FEEDS) and how each is doing.")
+async def get_feed_status(args: dict) -> str:
+    if not FEEDS:
+        return "No DataLink feeds configured. Set TRICASTER_FEEDS to JSON or CSV files to push into DataLink."
+    now = time.time()
+    lines = [f"=== DataLink Feeds ({_feed_watcher.mode}) -> {DEFAULT_HOST} ==="]
+    for feed in FEEDS:
+        loaded = f"loaded {now - feed.loaded_at:.0f} s ago" if feed.loaded_at else "not loaded yet"
+        prefix = f" (prefix '{feed.prefix}')" if feed.prefix else ""
+        lines.append(f"  {feed.path}{prefix}: {len(feed.pushed)} keys, {loaded}")
+        lines.append("    " + ", ".join(f"{k}={v}" for k, v in feed.stats.items()))
+        if feed.last_error:
+            lines.append(f"    ERROR: {feed.last_error}")
+    return "\n".join(lines)
+
+
+@tool(
+    "flush_writes",
+    "Immediately send any DataLink and volume values still waiting on the per-key rate limit "
+    f"(at most {COALESCE_RATE:g} sends per second per key).",
+    deadline=None,
+)
+async def flush_writes(args: dict) -> str:
+    return f"Flushed {await _flush_writes()} queued write(s)."
+
+
+async def _flush_writes(*keys: str) -> int:
+    """Flush the coalesced writes for ``keys`` (all keys if none) on every member of the target."""
+    return sum(await asyncio.gather(*(unit.writes.flush(*keys) for unit in _current_target.get())))
+
+
+@tool(
+    "run_batch",
+    "Run an ordered list of shortcuts, triggers and DataLink sets in one call, "
+    "e.g. a full look change (preview, effect, DSK on, auto, unmute a mic). "
+    "Steps run in order with optional delays; returns per-step latency.",
+    {
+        "steps": {
+            "type": "array",
+            "description": "Operations to run in order",
+            "items": {
                 "type": "object",
                 "properties": {
-                    "channel": {
+                    "op": {
                         "type": "string",
-                        "description": "Channel name, e.g. 'master', 'input1', 'ddr1'",
+                        "enum": ["send_shortcut", "trigger", "set_datalink"],
+                        "description": "Operation type",
                     },
-                    "volume": {
+                    "name": {"type": "string", "description": "Shortcut or trigger name"},
+                    "key": {"type": "string", "description": "DataLink key (set_datalink)"},
+                    "value": {"type": "string", "description": "Optional value"},
+                    "delay_ms": {
                         "type": "number",
-                        "description": "Volume level as a float (0 = unity)",
+                        "description": "Wait this long before running the step",
+                        "default": 0,
                     },
                 },
-                "required": ["channel", "volume"],
-            },
-        ),
-
-        # ── DDR (media players) ───────────────────────────────────────────
-        Tool(
-            name="get_ddr_status",
-            description=(
-                "Get the current status of a DDR (media player): playback state, "
-                "timecode position, clip name, loop, and autoplay mode."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "ddr": {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]}
-                },
-                "required": ["ddr"],
-            },
-        ),
-        Tool(
-            name="ddr_play",
-            description="Play a DDR (media player).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "ddr": {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]}
-                },
-                "required": ["ddr"],
-            },
-        ),
-        Tool(
-            name="ddr_stop",
-            description="Stop/pause a DDR (media player).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "ddr": {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]}
-                },
-                "required": ["ddr"],
-            },
-        ),
-        Tool(
-            name="ddr_set_loop",
-            description="Enable or disable loop mode on a DDR (media player).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "ddr": {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]},
-                    "enabled": {"type": "boolean", "description": "True to enable loop, False to disable"},
-                },
-                "required": ["ddr", "enabled"],
-            },
-        ),
-        Tool(
-            name="ddr_set_autoplay",
-            description="Enable or disable autoplay mode on a DDR (media player).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "ddr": {"type": "integer", "description": "DDR number (1 or 2)", "enum": [1, 2]},
-                    "enabled": {"type": "boolean", "description": "True to enable autoplay, False to disable"},
-                },
-                "required": ["ddr", "enabled"],
-            },
-        ),
-
-        # ── Media browser ─────────────────────────────────────────────────
-        Tool(
-            name="browse_media",
-            description=(
-                "Browse available media files on the TriCaster. "
-                "Optionally provide a path to browse a specific folder."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {
-                        "type": "string",
-                        "description": "Optional folder path to browse (leave empty for root)",
-                    }
-                },
-                "required": [],
-            },
-        ),
-
-        # ── Macros ────────────────────────────────────────────────────────
-        Tool(
-            name="list_macros",
-            description="List all available macros (system and session) by name and ID.",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="run_macro",
-            description="Execute a macro by name.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "Macro name as shown in the macro list"}
-                },
-                "required": ["name"],
-            },
-        ),
-
-        # ── Raw / advanced ────────────────────────────────────────────────
-        Tool(
-            name="send_shortcut",
-            description=(
-                "Send any raw shortcut command to the TriCaster. "
-                "Use this for advanced/custom control not covered by other tools."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "Shortcut name, e.g. 'main_background_auto'"},
-                    "value": {"type": "string", "description": "Optional value for the shortcut"},
-                },
-                "required": ["name"],
-            },
-        ),
-        Tool(
-            name="get_dictionary",
-            description=(
-                "Read any TriCaster state dictionary by key. "
-                "Common keys: switcher, tally, buffer, macros_list, switcher_ui_effects, filebrowser, audiomixer, ddr_timecode."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "key": {"type": "string", "description": "Dictionary key, e.g. 'switcher', 'tally'"}
-                },
-                "required": ["key"],
+                "required": ["op"],
             },
-        ),
-        Tool(
-            name="get_datalink",
-            description="Get all current DataLink key/value pairs (live data fields like scores, time, etc.).",
-            inputSchema={"type": "object", "properties": {}, "required": []},
-        ),
-        Tool(
-            name="set_datalink",
-            description="Set a DataLink key to a value (e.g. update a score or text field).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "key": {"type": "string", "description": "DataLink key name"},
-                    "value": {"type": "string", "description": "Value to set"},
-                },
-                "required": ["key", "value"],
-            },
-        ),
+        },
+        "stop_on_error": {
+            "type": "boolean",
+            "description": "Skip the remaining steps after the first failure (default true)",
+            "default": True,
+        },
+    },
+    ["steps"],
+    deadline=None,
+)
+async def run_batch(args: dict) -> str:
+    return await _run_batch(args["steps"], args.get("stop_on_error", True))
+
+
+async def _run_batch(steps: list[dict], stop_on_error: bool) -> str:
+    """Execute batch steps in order over the pooled connection and report per-step timing."""
+    # Check every step's shape and delay first, so a bad one can't stop the batch halfway.
+    delays = []
+    for i, step in enumerate(steps, 1):
+        if not isinstance(step, dict):
+            return f"Batch not run: step {i} must be an object, not {step!r}."
+        try:
+            delays.append(max(_number(step, "delay_ms", 0), 0.0) / 1000)
+        except ValueError as e:
+            return f"Batch not run: step {i}: {e}."
+    lines = []
+    ok = 0
+    start = time.perf_counter()
+    for i, (step, delay) in enumerate(zip(steps, delays), 1):
+        op = step.get("op")
+        if delay:
+            await asyncio.sleep(delay)
+        step_start = time.perf_counter()
+        try:
+            if op == "send_shortcut":
+                label = step["name"] if step.get("value") is None else f"{step['name']}={step['value']}"
+                await _set_shortcut(step["name"], step.get("value"))
+            elif op == "trigger":
+                label = f"trigger {step['name']}"
+                await trigger(step["name"], step.get("value"))
+            elif op == "set_datalink":
+                label = f"datalink {step['key']}={step['value']}"
+                await _set_datalink(step["key"], step["value"])
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except Exception as e:
+            elapsed = (time.perf_counter() - step_start) * 1000
+            error = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            lines.append(f"  {i}. {op}: ERROR {error} ({elapsed:.1f} ms)")
+            if stop_on_error:
+                lines.append(f"  (stopped; {len(steps) - i} remaining step(s) skipped)")
+                break
+            continue
+        ok += 1
+        lines.append(f"  {i}. {label}  {(time.perf_counter() - step_start) * 1000:.1f} ms")
+    total = (time.perf_counter() - start) * 1000
+    return f"=== Batch: {ok}/{len(steps)} steps OK in {total:.1f} ms ===\n" + "\n".join(lines)
+
+
+# ── Waiting ─────────────────────────────────────────────────────────────
+
+_CONDITION = re.compile(r"\s*([A-Za-z0-9_.]+)\s*(?:(==|!=|<=|>=|<|>)\s*(\S.*?))?\s*$")
+_DDR_SUBJECT = re.compile(r"ddr(\d+)\.(remaining|elapsed|playing)$")
+_SWITCHER_SUBJECTS = {"tbar": None, "program": "main_source", "preview": "preview_source", "effect": "effect"}
+_OPS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+@tool(
+    "wait_for",
+    "Wait until a condition on TriCaster state holds, e.g. for a clip to end or a transition to finish, "
+    "instead of polling with repeated status calls. The condition is '<subject> <op> <value>', or a bare "
+    "shortcut name meaning 'is active'. Subjects: ddr1.remaining, ddr1.elapsed (seconds), ddr1.playing, "
+    "tbar, program, preview, effect, or any shortcut_states name (streaming_toggle, record_toggle, "
+    "input1_mute, ...). Ops: == != < <= > >=. Returns when the condition holds or the timeout expires.",
+    {
+        "condition": {
+            "type": "string",
+            "description": "e.g. 'ddr1.remaining < 2', 'tbar == 0', 'program == input3', 'streaming_toggle'",
+        },
+        "timeout": {
+            "type": "number",
+            "description": f"Give up after this many seconds (default 30, max {WAIT_MAX_TIMEOUT})",
+            "default": 30,
+        },
+    },
+    ["condition"],
+    deadline=None,
+)
+async def wait_for(args: dict) -> str:
+    match = _CONDITION.fullmatch(args["condition"])
+    if match is None:
+        return f"Invalid condition {args['condition']!r}; expected '<subject> <op> <value>', e.g. 'ddr1.remaining < 2'"
+    subject, op, expected = match.groups()
+    if op is None:
+        op, expected = "==", "true"
+    try:
+        timeout = min(max(_number(args, "timeout", 30), 0.0), WAIT_MAX_TIMEOUT)
+    except ValueError as e:
+        return f"Cannot wait for {args['condition']!r}: {e}"
+    try:
+        return await _wait_for(subject, op, coerce(expected), timeout)
+    except ValueError as e:
+        return f"Cannot wait for {args['condition']!r}: {e}"
+
+
+async def _wait_for(subject: str, op: str, expected: bool | float | str, timeout: float) -> str:
+    """Re-check ``subject`` until the comparison holds, sleeping as long as nothing can have changed.
+
+    A playing DDR's position is predictable, so the wait sleeps until the predicted
+    crossing. With notifications live, other subjects are re-read from the mirror
+    whenever it changes. Otherwise the poll interval starts short, grows while
+    the value holds still and shrinks again once it moves.
+    """
+    unit = _unit()
+    start = time.monotonic()
+    give_up_at = start + timeout
+    interval = WAIT_POLL_INTERVAL[0]
+    checks = 0
+    previous = None
+    while True:
+        value, rate = await _read_subject(subject)
+        checks += 1
+        if _compare(value, op, expected):
+            return (
+                f"Condition met after {time.monotonic() - start:.1f} s: {subject} = {_fmt_value(value)} "
+                f"({checks} check{'s' if checks != 1 else ''})"
+            )
+        left = give_up_at - time.monotonic()
+        if left <= 0:
+            return (
+                f"Timed out after {timeout:g} s waiting for {subject} {op} {_fmt_value(expected)}; "
+                f"last value {_fmt_value(value)} ({checks} checks)"
+            )
+        if rate and isinstance(value, float) and isinstance(expected, float) and (expected - value) / rate > 0:
+            # Land just past the predicted crossing, but look again at least every poll interval
+            # in case the clip is paused or changed.
+            await asyncio.sleep(min((expected - value) / rate + 0.01, WAIT_POLL_INTERVAL[1], left))
+        elif unit.mirror.live and not subject.startswith("ddr"):
+            await unit.mirror.wait_changed(min(WAIT_POLL_INTERVAL[1], left))
+        else:
+            moving = previous is not None and value != previous
+            interval = WAIT_POLL_INTERVAL[0] if moving else min(interval * 1.5, WAIT_POLL_INTERVAL[1])
+            await asyncio.sleep(min(interval, left))
+        previous = value
+
+
+async def _read_subject(subject: str) -> tuple[bool | float | str, float | None]:
+    """Current value of a wait_for subject, and its rate of change per second if predictable."""
+    ddr = _DDR_SUBJECT.match(subject)
+    if ddr is not None:
+        reading = await _ddr_reading(int(ddr.group(1)), fresh=False)
+        if reading is None:
+            raise ValueError(f"DDR{ddr.group(1)} not found in ddr_timecode")
+        if ddr.group(2) == "playing":
+            return reading.speed != 0, None
+        if ddr.group(2) == "remaining":
+            return reading.remaining, -reading.speed
+        return reading.elapsed, reading.speed
+
+    if subject in _SWITCHER_SUBJECTS:
+        xml = await dictionary("switcher")
+        with parsing():
+            root = ET.fromstring(xml)
+        attr = _SWITCHER_SUBJECTS[subject]
+        if attr is None:
+            tbar = root.find(".//tbar")
+            return coerce(tbar.get("position", "0") if tbar is not None else "0"), None
+        return (root.get(attr, "") or ("cut" if subject == "effect" else "")), None
+
+    with parsing():
+        states = parse_shortcut_states(await dictionary("shortcut_states"))
+    value = states.value(subject)
+    if value is None:
+        raise ValueError(f"no '{subject}' in shortcut_states")
+    return value, None
+
+
+def _compare(value: bool | float | str, op: str, expected: bool | float | str) -> bool:
+    if isinstance(expected, bool):
+        value = value not in (0, "", False) and str(value).lower() not in ("false", "off", "no")
+    elif isinstance(expected, float) and not isinstance(value, (bool, float)):
+        raise ValueError(f"can't compare {_fmt_value(value)!r} with a number")
+    elif isinstance(expected, str):
+        value, expected = str(value).lower(), expected.lower()
+        if op not in ("==", "!="):
+            raise ValueError(f"'{op}' needs a number")
+    return _OPS[op](value, expected)
+
+
+def _fmt_value(value: bool | float | str) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return f"{round(value, 2):g}"
+    return value
+
+
+# ── Cues ────────────────────────────────────────────────────────────────
+
+async def _prewarm_target() -> None:
+    """Scheduler hook: have a connection open to every unit the cue will write to."""
+    await asyncio.gather(*(unit.client.warm() for unit in _current_target.get()))
+
+
+_scheduler = Scheduler(prewarm=_prewarm_target)
+
+
+@tool(
+    "schedule_cue",
+    "Schedule a shortcut, trigger, macro or DataLink set to fire at an exact moment, independent of "
+    "how long the next tool call takes: at a wall-clock time, after a delay, or a number of seconds "
+    "before a DDR's clip ends (e.g. DSK off 3 s before DDR1 ends). Returns the cue id.",
+    {
+        "action": {
+            "type": "string",
+            "enum": ["shortcut", "trigger", "macro", "set_datalink"],
+            "description": "What to fire",
+        },
+        "name": {"type": "string", "description": "Shortcut, trigger or macro name"},
+        "key": {"type": "string", "description": "DataLink key (set_datalink)"},
+        "value": {"type": "string", "description": "Optional shortcut/trigger value, or the DataLink value"},
+        "at": {"type": "string", "description": "Local wall-clock time today, 'HH:MM:SS[.fff]', or an ISO date-time"},
+        "in_seconds": {"type": "number", "description": "Fire this many seconds from now"},
+        "ddr": {**_DDR, "description": "Fire relative to the end of this DDR's clip (use with before_end)"},
+        "before_end": {
+            "type": "number",
+            "description": "Seconds before the DDR clip ends (default 0, i.e. as it ends)",
+            "default": 0,
+        },
+        "label": {"type": "string", "description": "Optional name for the cue"},
+    },
+    ["action"],
+)
+async def schedule_cue(args: dict) -> str:
+    try:
+        label, action = _cue_action(args)
+    except KeyError as e:
+        return f"'{args['action']}' needs {e}."
+    timings = [k for k in ("at", "in_seconds", "ddr") if args.get(k) is not None]
+    if len(timings) != 1:
+        return "Give exactly one of 'at', 'in_seconds' or 'ddr' (with 'before_end')."
+    retime = None
+    now = time.monotonic()
+    if "at" in timings:
+        try:
+            due = now + _parse_cue_time(args["at"]) - time.time()
+        except ValueError:
+            return f"Can't read time {args['at']!r}; use 'HH:MM:SS' (24 h, local) or an ISO date-time."
+        timing = f"at {args['at']}"
+    elif "in_seconds" in timings:
+        try:
+            delay = _number(args, "in_seconds", 0)
+        except ValueError as e:
+            return f"Cue not scheduled: {e}."
+        due = now + delay
+        timing = f"in {delay:g} s"
+    else:
+        try:
+            ddr, before = args["ddr"], _number(args, "before_end", 0)
+        except ValueError as e:
+            return f"Cue not scheduled: {e}."
+
+        async def retime(fresh: bool = False) -> float | None:
+            reading = await _ddr_reading(ddr, fresh)
+            if reading is None or not reading.speed:
+                return None  # stopped or empty; keep checking until it plays
+            return time.monotonic() + (reading.remaining - before) / reading.speed
+
+        due = await retime(fresh=True)
+        if due is None:
+            due = math.inf
+        timing = f"{before:g} s before DDR{ddr} ends"
+    if due < now:
+        return f"Cue not scheduled: {timing} is already in the past."
+    with deadline(None, detach=True):  # the cue's context outlives this call and its deadline
+        cue = _scheduler.add(args.get("label") or label, action, due, timing, retime)
+    return f"Cue #{cue.id} scheduled: {cue.label}, {timing} ({_fmt_due(cue)})."
+
+
+def _cue_action(args: dict) -> tuple[str, Callable[[], Awaitable[str]]]:
+    """Label and coroutine for a cue's action. Raises KeyError for a missing field."""
+    action, value = args["action"], args.get("value")
+    if action == "set_datalink":
+        key, value = args["key"], args["value"]
+        label, send = f"datalink {key}={value}", lambda: _set_datalink(key, value)
+    elif action == "macro":
+        name = args["name"]
+        label, send = f"macro {name}", lambda: trigger("macro", name)
+    else:
+        name = args["name"]
+        command = _set_shortcut if action == "shortcut" else trigger
+        label = (name if action == "shortcut" else f"trigger {name}") + ("" if value is None else f"={value}")
+
+        def send():
+            return command(name, value)
+
+    async def run() -> str:
+        # Collect mirror-group reports for the cue itself; the scheduling call has long returned.
+        log: list[str] = []
+        _fanout_log.set(log)
+        with deadline(ON_AIR_DEADLINE, detach=True):
+            resp = await send()
+        return "\n".join([f"OK{f' ({resp})' if resp else ''}", *log])
+
+    return label, run
+
+
+def _parse_cue_time(text: str) -> float:
+    """Epoch seconds for 'HH:MM[:SS[.fff]]' today (local time) or an ISO date-time. Raises ValueError."""
+    try:
+        return dt.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return dt.datetime.combine(dt.date.today(), dt.time.fromisoformat(text)).timestamp()
+
+
+def _fmt_due(cue: Cue) -> str:
+    if cue.due == math.inf:
+        return "waiting for the clip to play"
+    wall = cue.due_wall()
+    return f"{time.strftime('%H:%M:%S', time.localtime(wall))}.{int(wall % 1 * 1000):03d}, in {cue.due - time.monotonic():.1f} s"
+
+
+def _cue_line(cue: Cue) -> str:
+    line = f"  #{cue.id} {cue.label} — {cue.timing}"
+    if len(UNITS) > 1:
+        line += f" on {'+'.join(u.name for u in cue.context.get(_current_target, (_default_unit,)))}"
+    if cue.status == "pending":
+        return f"{line}: {_fmt_due(cue)}"
+    if cue.jitter is None:
+        return f"{line}: {cue.status}"
+    done = f", completed in {cue.duration * 1000:.1f} ms" if cue.duration is not None else ""
+    return f"{line}: {cue.status}, fired {cue.jitter * 1000:+.2f} ms from deadline{done}"
+
+
+@tool("list_cues", "List pending cues, recently fired ones, and how precisely cues have been firing.")
+async def list_cues(args: dict) -> str:
+    pending = _scheduler.pending()
+    lines = [f"=== Cues: {len(pending)} pending ==="]
+    lines += [_cue_line(cue) for cue in pending] or ["  (none)"]
+    recent = list(_scheduler.history)[-10:]
+    if recent:
+        lines.append("Recent:")
+        lines += [_cue_line(cue) for cue in reversed(recent)]
+    jitter = _scheduler.jitter_summary()
+    if jitter:
+        lines.append(
+            f"Dispatch jitter over {jitter['count']} cue(s): mean {jitter['mean_ms']:.2f} ms, "
+            f"p95 {jitter['p95_ms']:.2f} ms, max {jitter['max_ms']:.2f} ms"
+        )
+    return "\n".join(lines)
+
+
+@tool(
+    "get_cue",
+    "Show everything about one cue: timing, deadline, dispatch jitter, response and any notes.",
+    {"id": {"type": "integer", "description": "Cue id from schedule_cue or list_cues"}},
+    ["id"],
+)
+async def get_cue(args: dict) -> str:
+    cue = _scheduler.get(args["id"])
+    if cue is None:
+        return f"No cue #{args['id']} (only the last {_scheduler.history.maxlen} finished cues are kept)."
+    lines = [
+        f"=== Cue #{cue.id}: {cue.label} ===",
+        f"  Status:   {cue.status}",
+        f"  Timing:   {cue.timing}",
+        f"  Created:  {time.strftime('%H:%M:%S', time.localtime(cue.created))}",
     ]
+    if cue.status == "pending":
+        lines.append(f"  Due:      {_fmt_due(cue)}")
+    if cue.fired_at is not None:
+        lines.append(f"  Fired:    {time.strftime('%H:%M:%S', time.localtime(cue.fired_at))}"
+                     f".{int(cue.fired_at % 1 * 1000):03d} ({cue.jitter * 1000:+.2f} ms from deadline)")
+    if cue.duration is not None:
+        lines.append(f"  Took:     {cue.duration * 1000:.1f} ms")
+    if cue.result:
+        lines.append("  Result:   " + cue.result.replace("\n", "\n            "))
+    lines += [f"  Note:     {note}" for note in cue.notes]
+    return "\n".join(lines)
 
 
-# ---------------------------------------------------------------------------
-# Tool handlers
-# ---------------------------------------------------------------------------
+@tool(
+    "cancel_cue",
+    "Cancel a pending cue by id, or every pending cue.",
+    {
+        "id": {"type": "integer", "description": "Cue id to cancel"},
+        "all": {"type": "boolean", "description": "Cancel every pending cue", "default": False},
+    },
+)
+async def cancel_cue(args: dict) -> str:
+    if args.get("all"):
+        cancelled = [c for c in _scheduler.pending() if _scheduler.cancel(c.id)]
+        return f"Cancelled {len(cancelled)} cue(s)."
+    if args.get("id") is None:
+        return "Give a cue 'id', or all=true."
+    cue = _scheduler.cancel(args["id"])
+    if cue is None:
+        return f"No pending cue #{args['id']}."
+    return f"Cancelled cue #{cue.id} ({cue.label})."
+
+
+# ── Automation ──────────────────────────────────────────────────────────
+
+_automation = Automation()
+
+_EASING = {
+    "type": "string",
+    "description": f"Curve: {', '.join(EASINGS)}, or 'cubic-bezier(x1, y1, x2, y2)'",
+    "default": "sine",
+}
+_RAMP_DURATION = {"type": "number", "description": "Seconds the move takes (default 2, max 300)", "default": 2}
+_RAMP_WAIT = {
+    "type": "boolean",
+    "description": "Return when the move has finished, with its report (default true); false returns at once",
+    "default": True,
+}
+
+
+@tool(
+    "fade_audio",
+    "Fade an audio channel's volume smoothly to a new level over a duration, instead of jumping. "
+    "Channel names: 'master', 'input1'–'input8', 'ddr1', 'ddr2', 'aux1', 'phones'.",
+    {
+        "channel": _CHANNEL,
+        "to": {"type": "number", "description": "Target volume (0 = unity gain, negative = lower)"},
+        "from": {"type": "number", "description": "Starting volume (default: the channel's current volume)"},
+        "duration": _RAMP_DURATION,
+        "easing": _EASING,
+        "wait": _RAMP_WAIT,
+    },
+    ["channel", "to"],
+    deadline=None,
+)
+async def fade_audio(args: dict) -> str:
+    channel = args["channel"]
+    start = args.get("from")
+    await _flush_writes(f"{channel}_volume")  # a held-back set_audio_volume lands before the fade, not in it
+    if start is None:
+        with parsing():
+            start = parse_shortcut_states(await dictionary("shortcut_states")).value(f"{channel}_volume")
+        if not isinstance(start, float):
+            return f"Current volume of '{channel}' is unknown; pass 'from'."
+    return await _run_ramp(f"{channel}_volume", f"{channel} volume", start, args, "{:.2f}")
+
+
+@tool(
+    "move_tbar",
+    "Move the main T-bar smoothly to a position (0 = start, 1 = transition complete) over a duration, "
+    "for a manual transition with its own speed and curve.",
+    {
+        "to": {"type": "number", "minimum": 0, "maximum": 1, "description": "Target T-bar position, 0–1"},
+        "from": {"type": "number", "minimum": 0, "maximum": 1, "description": "Start position (default: current)"},
+        "duration": _RAMP_DURATION,
+        "easing": _EASING,
+        "wait": _RAMP_WAIT,
+    },
+    ["to"],
+    deadline=None,
+)
+async def move_tbar(args: dict) -> str:
+    start = args.get("from")
+    await _flush_writes("main_tbar")
+    if start is None:
+        start, _ = await _read_subject("tbar")
+    return await _run_ramp("main_tbar", "T-bar", float(start), args, "{:.4f}")
+
+
+async def _run_ramp(name: str, label: str, start: float, args: dict, fmt: str) -> str:
+    """Ramp shortcut ``name`` from ``start`` to args['to'] on the current target."""
+    target = _current_target.get()
+    end = float(args["to"])
+
+    async def send(value: float) -> str:
+        # Per-frame writes skip cache invalidation; the final value invalidates once. Frames share
+        # the coalescer slot for ``name``, so a set_audio_volume sent mid-ramp stays in order with them.
+        path = f"/v1/shortcut?{urlencode({'name': name, 'value': fmt.format(value)})}"
+        with deadline(ON_AIR_DEADLINE, detach=True):
+            resp = await _coalesced(name, lambda: _write(path, label), urgent=True)
+        if resp is None:
+            raise RuntimeError("replaced by a newer write before it was sent")
+        if value == end:
+            for unit in target:
+                _invalidate_for_shortcut(name, unit)
+        return resp
+
+    parameter = f"{'+'.join(u.name for u in target)}/{label}"
+    try:
+        ramp = Ramp(parameter, start, end, min(float(args.get("duration", 2)), 300.0),
+                    args.get("easing", "sine"), send, await _frame_rate())
+    except ValueError as e:
+        return str(e)
+    token = _fanout_log.set(None)  # no per-frame fan-out lines; the report covers the ramp
+    try:
+        task = _automation.start(ramp)
+    finally:
+        _fanout_log.reset(token)
+    if not args.get("wait", True):
+        return f"Started: {_fmt_ramp(ramp.report)}"
+    try:
+        report = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if not task.cancelled():
+            raise  # this call was cancelled; the ramp carries on
+        report = ramp.report  # stopped by stop_automation or a newer ramp
+    return _fmt_ramp(report)
 
-@server.call_tool()
-async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+
+async def _frame_rate() -> float:
+    """The current unit's session frame rate, or FRAME_RATE if its session dictionary doesn't give one."""
     try:
-        result = _handle(name, arguments)
-    except Exception as e:
-        result = f"Error communicating with TriCaster: {e}"
-    return [TextContent(type="text", text=result)]
+        xml = await dictionary("session")
+        with parsing():
+            root = ET.fromstring(xml)
+    except (OSError, TimeoutError, ET.ParseError):
+        return FRAME_RATE
+    for el in root.iter():
+        # e.g. "29.97", "59.94" or "1080i 29.97": the rate is the last number
+        numbers = re.findall(r"\d+(?:\.\d+)?", el.get("framerate") or el.get("frame_rate") or "")
+        if numbers and float(numbers[-1]) > 0:
+            return float(numbers[-1])
+    return FRAME_RATE
+
+
+def _fmt_ramp(r: RampReport) -> str:
+    line = f"{r.parameter} {r.start:g} -> {r.end:g} over {r.duration:g} s ({r.easing})"
+    if r.status == "running":
+        return line
+    line += (
+        f": {r.status} in {r.elapsed:.2f} s, {r.updates} updates ({r.rate:.1f}/s at {r.frame_rate:g} fps), "
+        f"{r.skipped} frame(s) skipped, overrun {r.overrun * 1000:.0f} ms, overshoot {r.overshoot:g}"
+    )
+    if r.errors:
+        line += f"; {r.errors} error(s), last: {r.last_error}"
+    return line
+
+
+@tool(
+    "get_automation_status",
+    "Show running fades/T-bar moves and reports for recent ones (update rate, skipped frames, overrun, overshoot).",
+)
+async def get_automation_status(args: dict) -> str:
+    lines = [f"=== Automation: {len(_automation.running)} running ==="]
+    for ramp, _ in _automation.running.values():
+        lines.append(f"  {_fmt_ramp(ramp.report)}")
+    recent = list(_automation.history)[-10:]
+    if recent:
+        lines.append("Recent:")
+        lines += [f"  {_fmt_ramp(r)}" for r in reversed(recent)]
+    return "\n".join(lines)
 
 
-def _handle(name: str, args: dict) -> str:
-    # ── System info ─────────────────────────────────────────────────────
-    if name == "get_system_info":
-        return _get("/v1/version")
-
-    if name == "get_tally":
-        xml = dictionary("tally")
-        return _parse_tally(xml)
-
-    if name == "list_sources":
-        tally_xml = dictionary("tally")
-        switcher_xml = dictionary("switcher")
-        return _parse_source_list(tally_xml, switcher_xml)
-
-    # ── Switcher ─────────────────────────────────────────────────────────
-    if name == "get_switcher_state":
-        xml = dictionary("switcher")
-        return _parse_switcher_state(xml)
-
-    if name == "switch_program":
-        source = args["source"]
-        resp = shortcut("main_a_row_named_input", source)
-        return f"Program cut to '{source}'. Response: {resp}"
-
-    if name == "switch_preview":
-        source = args["source"]
-        resp = shortcut("main_b_row_named_input", source)
-        return f"Preview set to '{source}'. Response: {resp}"
-
-    if name == "auto_transition":
-        resp = shortcut("main_background_auto")
-        return f"Auto transition executed. Response: {resp}"
-
-    if name == "cut_transition":
-        resp = shortcut("main_background_cut")
-        return f"Cut transition executed. Response: {resp}"
-
-    if name == "set_transition_effect":
-        effect = args["effect"].lower()
-        if effect in ("fade", "dissolve"):
-            resp = shortcut("main_background_select_fade", "true")
-            return f"Transition effect set to fade/dissolve. Response: {resp}"
-        elif effect == "cut":
-            resp = shortcut("main_background_select_fade", "false")
-            return f"Transition effect set to cut. Response: {resp}"
+@tool(
+    "stop_automation",
+    "Stop a running fade or T-bar move where it is, or all of them.",
+    {"channel": {"type": "string", "description": "Audio channel name or 'tbar'; omit to stop everything"}},
+)
+async def stop_automation(args: dict) -> str:
+    channel = args.get("channel")
+    if channel is None:
+        return f"Stopped {_automation.stop()} ramp(s)."
+    label = "T-bar" if channel.lower() in ("tbar", "t-bar") else f"{channel} volume"
+    stopped = _automation.stop(f"{'+'.join(u.name for u in _current_target.get())}/{label}")
+    return f"Stopped {label}." if stopped else f"No ramp running on {label}."
+
+
+# ── Diagnostics ─────────────────────────────────────────────────────────
+
+@tool(
+    "get_server_metrics",
+    "Show this server's own performance: per-tool call counts, errors and latency percentiles, "
+    "per-endpoint TriCaster request latency and bytes, plus connection, cache and notification counters.",
+    {
+        "format": {
+            "type": "string",
+            "enum": ["summary", "openmetrics"],
+            "description": "'summary' (readable, default) or 'openmetrics' (text exposition format)",
+            "default": "summary",
+        }
+    },
+)
+async def get_server_metrics(args: dict) -> str:
+    if args.get("format") == "openmetrics":
+        return _openmetrics()
+    # One unit when asked about a specific host, otherwise the whole control room.
+    units = list(_current_target.get()) if args.get("host") or len(UNITS) == 1 else list(UNITS.values())
+    return "\n\n".join(_unit_summary(unit) for unit in units)
+
+
+def _unit_summary(unit: Unit) -> str:
+    counters = [
+        ("Connections", {"circuit_open": int(unit.client.circuit_open), **unit.client.stats}),
+        ("Cache", unit.cache.stats),
+        ("Notifications", {"live": int(unit.mirror.live), **unit.mirror.stats}),
+        ("DDR tracking", unit.ddr.stats),
+        ("Coalesced writes", unit.writes.stats),
+        ("Media index", {"files": unit.media.size, "folders": len(unit.media.folders), **unit.media.stats}),
+    ]
+    title = "Server Metrics" if len(UNITS) == 1 else f"Server Metrics: {unit.name} ({unit.host}:{unit.port})"
+    return unit.metrics.summary(title) + "".join(
+        f"\n{title}: " + ", ".join(f"{k}={v}" for k, v in stats.items()) for title, stats in counters
+    )
+
+
+def _openmetrics() -> str:
+    return openmetrics(
+        {name: unit.metrics for name, unit in UNITS.items()},
+        {
+            name: {
+                "connection": unit.client.stats,
+                "cache": unit.cache.stats,
+                "notification": unit.mirror.stats,
+                "ddr_tracking": unit.ddr.stats,
+                "coalesced_write": unit.writes.stats,
+                "media_index": unit.media.stats,
+            }
+            for name, unit in UNITS.items()
+        },
+        {name: {"circuit_open": int(unit.client.circuit_open)} for name, unit in UNITS.items()},
+    )
+
+
+async def _dump_metrics(path: str) -> None:
+    """Rewrite ``path`` with the OpenMetrics dump every METRICS_DUMP_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(METRICS_DUMP_INTERVAL)
+        try:
+            with open(path + ".tmp", "w") as f:
+                f.write(_openmetrics())
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # a missing or read-only directory must not take the server down
+
+
+@tool(
+    "check_consistency",
+    "Compare switcher and tally state across the members of a mirror group (see TRICASTER_GROUPS) "
+    "and flag every field where a backup has drifted from the primary.",
+    reads=("switcher", "tally"),
+)
+async def check_consistency(args: dict) -> str:
+    members = _current_target.get()
+    if len(members) == 1:
+        groups = ", ".join(f"{name} ({'+'.join(u.name for u in units)})" for name, units in GROUPS.items())
+        return f"'{members[0].name}' is a single TriCaster, not a mirror group. Groups: {groups or '(none configured)'}"
+    fresh = args.get("fresh", False)
+    results = await asyncio.gather(
+        *(_with_unit(unit, _read_dictionaries, "switcher", "tally", fresh=fresh) for unit in members),
+        return_exceptions=True,
+    )
+    now = time.monotonic()
+    states: dict[str, dict[str, str]] = {}
+    lines = [f"=== Consistency: {' / '.join(u.name for u in members)} ==="]
+    for unit, fetched in zip(members, results):
+        if isinstance(fetched, BaseException):
+            lines.append(f"  {unit.name}: UNREACHABLE ({fetched or type(fetched).__name__})")
+            continue
+        oldest = max(now - fetched[k][1] for k in ("switcher", "tally"))
+        lines.append(f"  {unit.name}: data {oldest * 1000:.0f} ms old")
+        states[unit.name] = _switching_fields(fetched["switcher"][0], fetched["tally"][0])
+    if len(states) < 2:
+        return "\n".join(lines + ["Fewer than two members answered; nothing to compare."])
+
+    mismatched = 0
+    for field in dict.fromkeys(f for fields in states.values() for f in fields):
+        values = {name: fields.get(field, "(missing)") for name, fields in states.items()}
+        if len(set(values.values())) == 1:
+            lines.append(f"  {field}: {next(iter(values.values()))}")
         else:
-            # Try selecting by effect path/name for file-based effects
-            resp = shortcut("main_background_effect_select", args["effect"])
-            return f"Transition effect '{args['effect']}' selected. Response: {resp}"
-
-    # ── DSK ──────────────────────────────────────────────────────────────
-    if name == "dsk_on":
-        dsk = args["dsk"]
-        resp = shortcut(f"main_dsk{dsk}_on")
-        return f"DSK{dsk} brought on air. Response: {resp}"
-
-    if name == "dsk_off":
-        dsk = args["dsk"]
-        resp = shortcut(f"main_dsk{dsk}_off")
-        return f"DSK{dsk} taken off air. Response: {resp}"
-
-    if name == "dsk_auto":
-        dsk = args["dsk"]
-        resp = shortcut(f"main_dsk{dsk}_auto")
-        return f"DSK{dsk} auto transition. Response: {resp}"
-
-    # ── Recording ────────────────────────────────────────────────────────
-    if name == "start_record":
-        recorder = args.get("recorder", 1)
-        shortcut_name = "record_toggle" if recorder == 1 else f"record{recorder}_toggle"
-        resp = shortcut(shortcut_name, "1")
-        return f"Recorder {recorder} start sent. Response: {resp}"
-
-    if name == "stop_record":
-        recorder = args.get("recorder", 1)
-        shortcut_name = "record_toggle" if recorder == 1 else f"record{recorder}_toggle"
-        resp = shortcut(shortcut_name, "0")
-        return f"Recorder {recorder} stop sent. Response: {resp}"
-
-    if name == "get_record_state":
-        recorder = args.get("recorder", 1)
-        shortcut_name = "record_toggle" if recorder == 1 else f"record{recorder}_toggle"
-        return _get_shortcut_state(shortcut_name, f"Recording (recorder {recorder})")
-
-    # ── Streaming ────────────────────────────────────────────────────────
-    if name == "start_stream":
-        resp = shortcut("streaming_toggle", "1")
-        return f"Stream start sent. Response: {resp}"
-
-    if name == "stop_stream":
-        resp = shortcut("streaming_toggle", "0")
-        return f"Stream stop sent. Response: {resp}"
-
-    if name == "get_stream_state":
-        return _get_shortcut_state("streaming_toggle", "Streaming")
-
-    # ── Fade to Black ────────────────────────────────────────────────────
-    if name == "fade_to_black":
-        resp = shortcut("main_ftb_auto")
-        return f"Fade to black executed. Response: {resp}"
-
-    if name == "take_to_black":
-        resp = shortcut("main_ftb_take")
-        return f"Take to black executed. Response: {resp}"
-
-    # ── Audio mixer ──────────────────────────────────────────────────────
-    if name == "get_audio_state":
-        mixer_xml = dictionary("audiomixer")
-        state_xml = dictionary("shortcut_states")
-        return _parse_audio_state(mixer_xml, state_xml)
-
-    if name == "set_audio_mute":
-        channel = args["channel"]
-        mute_val = "true" if args["mute"] else "false"
-        resp = shortcut(f"{channel}_mute", mute_val)
-        state = "muted" if args["mute"] else "unmuted"
-        return f"Channel '{channel}' {state}. Response: {resp}"
-
-    if name == "set_audio_volume":
-        channel = args["channel"]
-        volume = args["volume"]
-        resp = shortcut(f"{channel}_volume", str(volume))
-        return f"Channel '{channel}' volume set to {volume}. Response: {resp}"
-
-    # ── DDR ──────────────────────────────────────────────────────────────
-    if name == "get_ddr_status":
-        ddr = args["ddr"]
-        xml = dictionary("ddr_timecode")
-        return _parse_ddr_status(xml, ddr)
-
-    if name == "ddr_play":
-        ddr = args["ddr"]
-        resp = shortcut(f"ddr{ddr}_play")
-        return f"DDR{ddr} play. Response: {resp}"
-
-    if name == "ddr_stop":
-        ddr = args["ddr"]
-        resp = shortcut(f"ddr{ddr}_stop")
-        return f"DDR{ddr} stop. Response: {resp}"
-
-    if name == "ddr_set_loop":
-        ddr = args["ddr"]
-        val = "true" if args["enabled"] else "false"
-        resp = shortcut(f"ddr{ddr}_loop_mode_toggle", val)
-        state = "enabled" if args["enabled"] else "disabled"
-        return f"DDR{ddr} loop {state}. Response: {resp}"
-
-    if name == "ddr_set_autoplay":
-        ddr = args["ddr"]
-        val = "true" if args["enabled"] else "false"
-        resp = shortcut(f"ddr{ddr}_autoplay_mode_toggle", val)
-        state = "enabled" if args["enabled"] else "disabled"
-        return f"DDR{ddr} autoplay {state}. Response: {resp}"
-
-    # ── Media browser ─────────────────────────────────────────────────────
-    if name == "browse_media":
-        path = args.get("path", "")
-        key = f"filebrowser:{path}" if path else "filebrowser"
-        xml = dictionary(key)
-        return _parse_filebrowser(xml)
-
-    # ── Macros ───────────────────────────────────────────────────────────
-    if name == "list_macros":
-        xml = dictionary("macros_list")
-        return _parse_macros(xml)
-
-    if name == "run_macro":
-        macro_name = args["name"]
-        resp = trigger("macro", macro_name)
-        return f"Macro '{macro_name}' triggered. Response: {resp}"
-
-    # ── Raw / advanced ───────────────────────────────────────────────────
-    if name == "send_shortcut":
-        sc_name = args["name"]
-        value = args.get("value")
-        resp = shortcut(sc_name, value)
-        return f"Shortcut '{sc_name}' sent. Response: {resp}"
-
-    if name == "get_dictionary":
-        return dictionary(args["key"])
-
-    if name == "get_datalink":
-        return datalink_get_all()
-
-    if name == "set_datalink":
-        resp = datalink_set(args["key"], args["value"])
-        return f"DataLink '{args['key']}' set to '{args['value']}'. Response: {resp}"
-
-    return f"Unknown tool: {name}"
+            mismatched += 1
+            lines.append(f"  {field}: MISMATCH " + ", ".join(f"{n}={v}" for n, v in values.items()))
+    lines.append("In sync." if not mismatched else f"{mismatched} field(s) differ.")
+    return "\n".join(lines)
+
+
+# Built once; list_tools hands out the same list on every call.
+_TOOL_LIST = [spec.tool for spec in TOOLS.values()]
+
+
+# ---------------------------------------------------------------------------
+# Show state snapshot
+# ---------------------------------------------------------------------------
+
+async def _show_state(fresh: bool) -> str:
+    """Fetch every dictionary behind the get_* tools at once and summarise them compactly.
+
+    Each dictionary is parsed exactly once; shortcut_states feeds recording,
+    streaming and audio. Every line notes how old its data is.
+    """
+    fetched = await _read_dictionaries(*_SHOW_STATE_KEYS, fresh=fresh)
+    now = time.monotonic()
+    roots: dict[str, ET.Element | None] = {}
+    with parsing():
+        for key in ("switcher", "tally", "ddr_timecode"):
+            try:
+                roots[key] = ET.fromstring(fetched[key][0])
+            except ET.ParseError:
+                roots[key] = None
+
+    def age(*keys: str) -> str:
+        oldest = max(now - fetched[k][1] for k in keys)
+        return f"[{oldest * 1000:.0f} ms old]"
+
+    lines = [f"=== Show State @ {time.strftime('%H:%M:%S')} ==="]
+
+    sw = roots["switcher"]
+    if sw is None:
+        lines.append(f"Switcher {age('switcher')}: (unparseable)")
+    else:
+        tbar_el = sw.find(".//tbar")
+        tbar = tbar_el.get("position", "?") if tbar_el is not None else "?"
+        lines.append(
+            f"Switcher {age('switcher')}: PGM {sw.get('main_source', '?')} | "
+            f"PVW {sw.get('preview_source', '?')} | effect {sw.get('effect', '') or 'cut'} | T-bar {tbar}"
+        )
+        for i, ov in enumerate(sw.findall(".//switcher_overlays/overlay"), 1):
+            ov_tbar = ov.find(".//tbar")
+            if ov.get("source"):
+                pos = ov_tbar.get("position", "0") if ov_tbar is not None else "0"
+                lines.append(f"  Overlay {i}: {ov.get('source')} (tbar={pos})")
+
+    tally = roots["tally"]
+    if tally is None:
+        lines.append(f"Tally {age('tally')}: (unparseable)")
+    else:
+        on_pgm = [c.get("name") for c in tally if c.get("on_pgm") == "true"]
+        on_prev = [c.get("name") for c in tally if c.get("on_prev") == "true"]
+        lines.append(
+            f"Tally {age('tally')}: PGM {', '.join(on_pgm) or '(none)'} | PVW {', '.join(on_prev) or '(none)'}"
+        )
+
+    try:
+        with parsing():
+            states = parse_shortcut_states(fetched["shortcut_states"][0])
+    except ET.ParseError:
+        states = None
+    if states is None:
+        lines.append(f"Record/Stream/Audio {age('shortcut_states')}: (shortcut_states unparseable)")
+    else:
+        def active(name: str) -> str:
+            state = states.is_active(name)
+            return "unknown" if state is None else "active" if state else "inactive"
+
+        # record_toggle, record2_toggle, ... -> "record", "record2", ...
+        recorders = sorted(
+            n for n in states.with_suffix("_toggle") if n == "record" or fnmatchcase(n, "record[0-9]*")
+        )
+        record = ", ".join(f"{r} {active(r + '_toggle')}" for r in recorders) or "unknown"
+        lines.append(f"Record/Stream {age('shortcut_states')}: {record} | stream {active('streaming_toggle')}")
+
+        display_names = _audio_display_names(fetched["audiomixer"][0])
+        mutes, volumes = _audio_states(states)
+        channels = []
+        for ch in sorted(set(mutes) | set(volumes)):
+            muted = " MUTED" if mutes.get(ch) in ("true", "1") else ""
+            vol = f" {volumes[ch]}" if volumes.get(ch) else ""
+            label = display_names.get(ch.lower())
+            channels.append(f"{ch}{f' ({label})' if label else ''}{muted}{vol}")
+        lines.append(f"Audio {age('audiomixer', 'shortcut_states')}: {', '.join(channels) or '(no data)'}")
+
+    timecode = roots["ddr_timecode"]
+    for ddr in (1, 2):
+        ddr_el = timecode.find(f"ddr{ddr}") if timecode is not None else None
+        if ddr_el is None:
+            lines.append(f"DDR{ddr} {age('ddr_timecode')}: no clip loaded")
+            continue
+        try:
+            speed = float(ddr_el.get("play_speed") or 0)
+            elapsed = float(ddr_el.get("clip_seconds_elapsed", 0))
+            remaining = float(ddr_el.get("clip_seconds_remaining", 0))
+            duration = float(ddr_el.get("file_duration", 0))
+            if not all(map(math.isfinite, (speed, elapsed, remaining, duration))):
+                raise ValueError("non-finite value")
+        except ValueError:
+            lines.append(f"DDR{ddr} {age('ddr_timecode')}: unknown (malformed ddr_timecode)")
+            continue
+        state = "playing" if speed != 0 else "stopped"
+        lines.append(
+            f"DDR{ddr} {age('ddr_timecode')}: {state} {_fmt_time(elapsed)} elapsed, "
+            f"{_fmt_time(remaining)} left of {_fmt_time(duration)}"
+        )
+
+    return "\n".join(lines)
 
 
 # ---------------------------------------------------------------------------
 # XML parsing helpers
 # ---------------------------------------------------------------------------
 
-def _get_shortcut_state(shortcut_name: str, label: str) -> str:
-    """Read a single shortcut value from shortcut_states."""
+async def _get_shortcut_state(shortcut_name: str, label: str, fresh: bool = False) -> str:
+    """Read a single shortcut value from shortcut_states.
+
+    Fresh reads stream the dictionary and stop at the first match instead of
+    downloading and parsing the whole document.
+    """
     try:
-        xml = dictionary("shortcut_states")
-        root = ET.fromstring(xml)
-        for el in root:
-            if el.get("name") == shortcut_name:
-                val = el.get("value", "unknown")
-                state = "active" if val not in ("0", "false", "") else "inactive"
-                return f"{label}: {state} (raw value: {val!r})"
-        return f"{label}: unknown (shortcut '{shortcut_name}' not found in shortcut_states)"
+        if fresh:
+            val = await _scan_shortcut_value(shortcut_name)
+        else:
+            xml = await dictionary("shortcut_states")
+            with parsing():
+                val = parse_shortcut_states(xml).get(shortcut_name)
     except ET.ParseError:
         return f"{label}: parse error reading shortcut_states"
+    if val is None:
+        return f"{label}: unknown (shortcut '{shortcut_name}' not found in shortcut_states)"
+    state = "active" if val not in ("0", "false", "") else "inactive"
+    return f"{label}: {state} (raw value: {val!r})"
 
 
+async def _scan_shortcut_value(shortcut_name: str) -> str | None:
+    """Stream shortcut_states from the unit and return one value as soon as it is seen."""
+    async with dictionary_stream("shortcut_states") as body:
+        async with aclosing(scan_stream(body, depth=1)) as elements:
+            async for _, attrs in elements:
+                if attrs.get("name") == shortcut_name:
+                    return attrs.get("value", MISSING_VALUE)
+    return None
+
+
+@timed_parse
 def _parse_tally(xml: str) -> str:
     """Parse tally XML and return a readable summary."""
     try:
@@ -755,6 +2144,7 @@ def _parse_tally(xml: str) -> str:
         return xml
 
 
+@timed_parse
 def _parse_source_list(tally_xml: str, switcher_xml: str) -> str:
     """List all sources from tally, annotated with friendly labels from the switcher."""
     # Build label map from switcher XML: physical_input_number → iso_label
@@ -784,6 +2174,29 @@ def _parse_source_list(tally_xml: str, switcher_xml: str) -> str:
         return tally_xml
 
 
+@timed_parse
+def _switching_fields(switcher_xml: str, tally_xml: str) -> dict[str, str]:
+    """Flatten the switching state that mirrored units must agree on into comparable strings."""
+    fields: dict[str, str] = {}
+    try:
+        sw = ET.fromstring(switcher_xml)
+        fields["program"] = sw.get("main_source", "?")
+        fields["preview"] = sw.get("preview_source", "?")
+        fields["effect"] = sw.get("effect", "") or "cut"
+        for i, ov in enumerate(sw.findall(".//switcher_overlays/overlay"), 1):
+            fields[f"overlay {i}"] = ov.get("source", "") or "(empty)"
+    except ET.ParseError:
+        fields["switcher"] = "(unparseable)"
+    try:
+        tally = ET.fromstring(tally_xml)
+        fields["tally PGM"] = ", ".join(sorted(c.get("name") for c in tally if c.get("on_pgm") == "true")) or "(none)"
+        fields["tally PVW"] = ", ".join(sorted(c.get("name") for c in tally if c.get("on_prev") == "true")) or "(none)"
+    except ET.ParseError:
+        fields["tally"] = "(unparseable)"
+    return fields
+
+
+@timed_parse
 def _parse_switcher_state(xml: str) -> str:
     """Parse switcher XML into a human-readable summary.
 
@@ -834,9 +2247,19 @@ def _parse_switcher_state(xml: str) -> str:
         return xml
 
 
+@timed_parse
 def _parse_audio_state(mixer_xml: str, state_xml: str) -> str:
     """Build audio state from audiomixer (channel names) + shortcut_states (mute/volume values)."""
-    # Build display-name map from audiomixer
+    try:
+        states = parse_shortcut_states(state_xml)
+    except ET.ParseError:
+        states = ShortcutStates({})
+    return _format_audio_state(_audio_display_names(mixer_xml), states)
+
+
+@timed_parse
+def _audio_display_names(mixer_xml: str) -> dict[str, str]:
+    """Map lower-cased channel names to their display names from audiomixer."""
     display_names: dict[str, str] = {}
     try:
         mixer_root = ET.fromstring(mixer_xml)
@@ -847,24 +2270,20 @@ def _parse_audio_state(mixer_xml: str, state_xml: str) -> str:
                 display_names[name.lower()] = display
     except ET.ParseError:
         pass
+    return display_names
 
-    # Extract mute/volume from shortcut_states
-    mutes: dict[str, str] = {}
-    volumes: dict[str, str] = {}
-    try:
-        state_root = ET.fromstring(state_xml)
-        for el in state_root:
-            sc = el.get("name", "")
-            val = el.get("value", "")
-            if sc.endswith("_mute"):
-                ch = sc[: -len("_mute")]
-                mutes[ch] = val
-            elif sc.endswith("_volume"):
-                ch = sc[: -len("_volume")]
-                volumes[ch] = val
-    except ET.ParseError:
-        pass
 
+def _audio_states(states: ShortcutStates) -> tuple[dict[str, str], dict[str, str]]:
+    """Mute and volume values by channel, with "" for entries that have no value (shown as no data)."""
+    mutes, volumes = states.with_suffix("_mute"), states.with_suffix("_volume")
+    return (
+        {ch: "" if v == MISSING_VALUE else v for ch, v in mutes.items()},
+        {ch: "" if v == MISSING_VALUE else v for ch, v in volumes.items()},
+    )
+
+
+def _format_audio_state(display_names: dict[str, str], states: ShortcutStates) -> str:
+    mutes, volumes = _audio_states(states)
     if not mutes and not volumes:
         return "Audio state unavailable (could not parse shortcut_states)"
 
@@ -882,82 +2301,83 @@ def _parse_audio_state(mixer_xml: str, state_xml: str) -> str:
     return "\n".join(lines)
 
 
-def _parse_ddr_status(xml: str, ddr: int) -> str:
-    """Parse ddr_timecode XML for a specific DDR.
+def _format_ddr_status(ddr: int, reading: DDRReading) -> str:
+    """Render a DDR reading from the tracker.
 
-    Real structure: <timecode><ddr1 clip_seconds_elapsed="0" clip_seconds_remaining="5" ... /></timecode>
+    Attributes come from ddr_timecode: <timecode><ddr1 clip_seconds_elapsed="0" clip_seconds_remaining="5" ... /></timecode>
     """
-    try:
-        root = ET.fromstring(xml)
-        ddr_el = root.find(f"ddr{ddr}")
-        if ddr_el is None:
-            return f"DDR{ddr} not found in timecode response (may have no clip loaded).\n\nRaw:\n{xml}"
-
-        elapsed = float(ddr_el.get("clip_seconds_elapsed", 0))
-        remaining = float(ddr_el.get("clip_seconds_remaining", 0))
-        duration = float(ddr_el.get("file_duration", 0))
-        speed = ddr_el.get("play_speed", "0")
-        num_clips = ddr_el.get("num_clips", "")
-        clip_index = ddr_el.get("clip_index", "")
-        framerate = ddr_el.get("clip_framerate", "")
-
-        playing = float(speed) != 0 if speed else False
-        state = "playing" if playing else "stopped"
+    attrs = reading.attrs
+    speed = attrs.get("play_speed", "0")
+    state = "playing" if reading.speed else "stopped"
+    position = f"{_fmt_time(reading.elapsed)} elapsed / {_fmt_time(reading.remaining)} remaining"
+    if reading.extrapolated:
+        position += f" (extrapolated from a sample {reading.age:.1f} s old)"
+    lines = [
+        f"=== DDR{ddr} Status ===",
+        f"  State:     {state} (speed={speed})",
+        f"  Position:  {position}",
+        f"  Duration:  {_fmt_time(reading.duration)}",
+    ]
+    if attrs.get("num_clips"):
+        lines.append(f"  Playlist:  clip {attrs.get('clip_index', '')} of {attrs['num_clips']}")
+    if attrs.get("clip_framerate"):
+        lines.append(f"  Framerate: {attrs['clip_framerate']}")
+    return "\n".join(lines)
 
-        def fmt_time(s: float) -> str:
-            m, sec = divmod(int(s), 60)
-            return f"{m}:{sec:02d}"
 
-        lines = [
-            f"=== DDR{ddr} Status ===",
-            f"  State:     {state} (speed={speed})",
-            f"  Position:  {fmt_time(elapsed)} elapsed / {fmt_time(remaining)} remaining",
-            f"  Duration:  {fmt_time(duration)}",
-        ]
-        if num_clips:
-            lines.append(f"  Playlist:  clip {clip_index} of {num_clips}")
-        if framerate:
-            lines.append(f"  Framerate: {framerate}")
-        return "\n".join(lines)
-    except ET.ParseError:
-        return xml
+def _fmt_time(s: float) -> str:
+    m, sec = divmod(int(s), 60)
+    return f"{m}:{sec:02d}"
 
 
+@timed_parse
 def _parse_filebrowser(xml: str) -> str:
     """Parse filebrowser XML into a readable file list.
 
     Real structure: <media><clips><file path="d:\\..." name="River Bridge" /></clips></media>
     """
     try:
-        root = ET.fromstring(xml)
-        lines = ["=== Media Browser ==="]
-
-        # Group files by their parent folder
-        current_folder = ""
-        for el in root.iter("file"):
-            name = el.get("name", "")
-            path = el.get("path", "")
-            if not name:
-                continue
-            folder = path.rsplit("\\", 1)[0] if "\\" in path else ""
-            if folder != current_folder:
-                current_folder = folder
-                lines.append(f"\n  [{folder}]" if folder else "\n  [root]")
-            lines.append(f"    {name}")
-
-        if len(lines) == 1:
-            lines.append("(No media files found)")
-        return "\n".join(lines)
+        return _format_media(attrs for _, attrs in scan_text(xml, {"file"}))
     except ET.ParseError:
         return xml
 
 
+async def _browse_media_stream(key: str) -> str:
+    """Render a filebrowser listing while it downloads, without holding the body or a tree."""
+    try:
+        async with dictionary_stream(key) as body:
+            return _format_media([attrs async for _, attrs in scan_stream(body, {"file"})])
+    except ET.ParseError:
+        return f"Could not parse the '{key}' listing from the TriCaster."
+
+
+def _format_media(files: Iterable[dict[str, str]]) -> str:
+    lines = ["=== Media Browser ==="]
+
+    # Group files by their parent folder
+    current_folder = ""
+    for attrs in files:
+        name = attrs.get("name", "")
+        path = attrs.get("path", "")
+        if not name:
+            continue
+        folder = path.rsplit("\\", 1)[0] if "\\" in path else ""
+        if folder != current_folder:
+            current_folder = folder
+            lines.append(f"\n  [{folder}]" if folder else "\n  [root]")
+        lines.append(f"    {name}")
+
+    if len(lines) == 1:
+        lines.append("(No media files found)")
+    return "\n".join(lines)
+
+
+@timed_parse
 def _parse_macros(xml: str) -> str:
     """Parse macros_list XML into a readable list."""
     try:
-        root = ET.fromstring(xml)
         macros = []
-        for m in root.iter("macro"):
+        for _, m in scan_text(xml, {"macro"}):
             macro_name = m.get("name", "")
             macro_id = m.get("id", "")
             macros.append(f"  {macro_name} (id: {macro_id})")
@@ -973,14 +2393,29 @@ def _parse_macros(xml: str) -> str:
 # ---------------------------------------------------------------------------
 
 async def main():
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options(),
-        )
+    if NOTIFICATIONS:
+        for unit in UNITS.values():
+            unit.mirror.start()
+    dump = asyncio.create_task(_dump_metrics(METRICS_FILE)) if METRICS_FILE else None
+    if FEEDS:
+        _feed_watcher.start()
+    media = asyncio.create_task(_refresh_media_indexes()) if MEDIA_REFRESH_INTERVAL > 0 else None
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options(),
+            )
+    finally:
+        if dump is not None:
+            dump.cancel()
+        if media is not None:
+            media.cancel()
+        await _feed_watcher.stop()
+        await _scheduler.stop()
+        _automation.stop()
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Indexed model of the TriCaster ``shortcut_states`` dictionary.
+
+``shortcut_states`` holds the current value of every stateful shortcut and can
+run to thousands of entries on a large session. ``ShortcutStates`` parses it
+once into a name -> value map with O(1) lookup, and builds prefix/suffix
+family indexes (``*_mute``, ``*_volume``, ``ddr1_*``) on first use.
+"""
+
+from functools import lru_cache
+
+from xmlstream import scan_text
+
+_TRUE = ("true", "on", "yes")
+_FALSE = ("false", "off", "no")
+# Stands in for an entry with no value attribute. It is not falsy, so such a shortcut still reads as active.
+MISSING_VALUE = "unknown"
+
+
+def coerce(raw: str) -> bool | float | str:
+    """Convert a raw shortcut value to bool, float or str."""
+    lowered = raw.strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    try:
+        return float(lowered)
+    except ValueError:
+        return raw
+
+
+class ShortcutStates:
+    """Parsed shortcut_states with O(1) lookup by name and cached family indexes."""
+
+    def __init__(self, values: dict[str, str]):
+        self.values = values
+        self._suffixes: dict[str, dict[str, str]] = {}
+        self._prefixes: dict[str, dict[str, str]] = {}
+
+    @classmethod
+    def from_xml(cls, xml: str) -> "ShortcutStates":
+        """Parse shortcut_states XML without building a tree. Raises ET.ParseError on malformed input."""
+        values: dict[str, str] = {}
+        for _, attrs in scan_text(xml, depth=1):
+            name = attrs.get("name")
+            if name and name not in values:
+                values[name] = attrs.get("value", MISSING_VALUE)
+        return cls(values)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        return self.values.get(name, default)
+
+    def value(self, name: str) -> bool | float | str | None:
+        """Typed value of a shortcut, or None if it isn't present."""
+        raw = self.values.get(name)
+        return coerce(raw) if raw is not None else None
+
+    def is_active(self, name: str) -> bool | None:
+        """True unless the value is 0/false/empty; None if the shortcut isn't present."""
+        raw = self.values.get(name)
+        if raw is None:
+            return None
+        return raw not in ("0", "false", "")
+
+    def with_suffix(self, suffix: str) -> dict[str, str]:
+        """Shortcuts ending in ``suffix``, keyed by the remaining prefix (e.g. '_mute' -> {'input1': 'true'})."""
+        index = self._suffixes.get(suffix)
+        if index is None:
+            cut = len(suffix)
+            index = {n[:-cut]: v for n, v in self.values.items() if n.endswith(suffix) and len(n) > cut}
+            self._suffixes[suffix] = index
+        return index
+
+    def with_prefix(self, prefix: str) -> dict[str, str]:
+        """Shortcuts starting with ``prefix``, keyed by the remainder (e.g. 'ddr1_' -> {'play': ...})."""
+        index = self._prefixes.get(prefix)
+        if index is None:
+            cut = len(prefix)
+            index = {n[cut:]: v for n, v in self.values.items() if n.startswith(prefix) and len(n) > cut}
+            self._prefixes[prefix] = index
+        return index
+
+
+@lru_cache(maxsize=8)
+def parse_shortcut_states(xml: str) -> ShortcutStates:
+    """Parse shortcut_states, reusing the model while the same fetch is being served.
+
+    Cached and mirrored reads hand back the same string until the next fetch,
+    so repeated tools share one parse and one set of indexes.
+    """
+    return ShortcutStates.from_xml(xml)
@@ -0,0 +1,553 @@
+"""
+Local TriCaster simulator.
+
+A stand-in for a TriCaster's HTTP API so the server can be run, measured and
+debugged without hardware. It keeps a small model of the show (program and
+preview, DSKs, recording/streaming, audio, DDR playback and timecode, DataLink)
+that the ``/v1/shortcut``, ``/v1/trigger`` and ``/v1/datalink`` endpoints
+change and ``/v1/dictionary`` reports, and pushes the changed dictionary keys
+over ``/v1/change_notifications`` like the real unit.
+
+Latency, jitter, dropped and slow responses, HTTP/1.0-only behaviour and
+payload sizes are configurable:
+
+    uv run python simulator.py --port 8080 --latency 0.02 --jitter 0.01
+    uv run python simulator.py --drop 0.02 --slow 0.05 --slow-delay 1.0
+    TRICASTER_HOST=127.0.0.1 TRICASTER_PORT=8080 uv run python server.py
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import random
+import time
+import zlib
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import quoteattr
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_REASONS = {101: "Switching Protocols", 200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+# Dictionaries that change on their own (timecode runs while a DDR plays) and are never reused.
+_LIVE_FAMILIES = {"ddr_timecode"}
+
+
+# ---------------------------------------------------------------------------
+# Show model
+# ---------------------------------------------------------------------------
+
+class _DDR:
+    """A media player whose timecode advances with the wall clock while playing."""
+
+    def __init__(self, duration: float, num_clips: int):
+        self.duration = duration
+        self.num_clips = num_clips
+        self.clip_index = 1
+        self.loop = False
+        self.autoplay = False
+        self.speed = 0.0
+        self._position = 0.0
+        self._since = time.monotonic()
+
+    def elapsed(self) -> float:
+        position = self._position + (time.monotonic() - self._since) * self.speed
+        if position < self.duration:
+            return position
+        if self.loop and self.duration > 0:
+            return position % self.duration
+        # Ran off the end of the clip: park on the last frame.
+        self._position, self._since, self.speed = self.duration, time.monotonic(), 0.0
+        return self.duration
+
+    def set_speed(self, speed: float) -> None:
+        self._position = self.elapsed()
+        self._since = time.monotonic()
+        self.speed = speed
+
+
+class SimulatedShow:
+    """The state a TriCaster exposes, and how shortcuts change it."""
+
+    def __init__(
+        self, inputs: int = 8, shortcuts: int = 0, files: int = 50, macros: int = 10, nested: bool = False
+    ):
+        self.inputs = [f"input{i}" for i in range(1, inputs + 1)]
+        self.sources = self.inputs + ["ddr1", "ddr2", "gfx1", "gfx2", "bfr1", "bfr2", "black"]
+        self.labels = {name: f"Camera {i}" for i, name in enumerate(self.inputs, 1)}
+        self.program = self.sources[0]
+        self.preview = self.sources[1]
+        self.effect = "Crossfade"
+        self.frame_rate = 29.97
+        self.tbar = 0.0
+        self._before_black = self.program
+        self.dsk_on = {1: False, 2: False}
+        self.ddrs = {1: _DDR(90.0, 3), 2: _DDR(45.0, 1)}
+        self.channels = ["master"] + self.inputs + ["ddr1", "ddr2", "aux1", "phones"]
+        self.datalink: dict[str, str] = {}
+        self.fired: list[tuple[str, str | None]] = []
+        self.macros = [(f"Macro {i}", f"{{{i:08x}-0000-0000-0000-000000000000}}") for i in range(1, macros + 1)]
+        self.files = [
+            (f"d:\\media\\clips\\folder{i // 100}\\clip{i}.mov", f"clip {i}") for i in range(files)
+        ]
+        # False: filebrowser:<folder> lists every file below the folder. True: only the folder's own
+        # files, plus <folder> entries for its subfolders stamped with a checksum of their contents.
+        self.nested = nested
+        # Raw shortcut values, in the order shortcut_states lists them. ``shortcuts``
+        # pads the dictionary out to a realistic size for a large session.
+        self.shortcuts: dict[str, str] = {"record_toggle": "0", "streaming_toggle": "0"}
+        for channel in self.channels:
+            self.shortcuts[f"{channel}_mute"] = "false"
+            self.shortcuts[f"{channel}_volume"] = "0"
+        for n in self.ddrs:
+            self.shortcuts[f"ddr{n}_loop_mode_toggle"] = "false"
+            self.shortcuts[f"ddr{n}_autoplay_mode_toggle"] = "false"
+        for i in range(shortcuts):
+            self.shortcuts[f"v{i // 16 + 1}_param{i % 16}_value"] = str(i % 10)
+        self._rendered: dict[str, str] = {}
+
+    def shortcut(self, name: str, value: str | None) -> set[str]:
+        """Apply a shortcut and return the dictionary keys it changed."""
+        changed = self._apply(name, value)
+        self.changed(changed)
+        return changed
+
+    def _apply(self, name: str, value: str | None) -> set[str]:
+        if name == "main_a_row_named_input" and value:
+            self.program = value.lower()
+            return {"switcher", "tally"}
+        if name == "main_b_row_named_input" and value:
+            self.preview = value.lower()
+            return {"switcher", "tally"}
+        if name in ("main_background_auto", "main_background_cut", "main_background_take"):
+            self.program, self.preview = self.preview, self.program
+            return {"switcher", "tally"}
+        if name == "main_tbar" and value:
+            # Completing a manual T-bar move takes the transition; the handle is treated as back at 0.
+            self.tbar = min(max(float(value), 0.0), 1.0)
+            if self.tbar >= 1.0:
+                self.program, self.preview, self.tbar = self.preview, self.program, 0.0
+                return {"switcher", "tally"}
+            return {"switcher"}
+        if name == "main_background_select_fade":
+            self.effect = "Crossfade" if value in ("true", "1") else ""
+            return {"switcher"}
+        if name == "main_background_effect_select" and value:
+            self.effect = value
+            return {"switcher"}
+        if name.startswith("main_dsk") and name[8:9].isdigit():
+            dsk, action = int(name[8]), name[10:]
+            if dsk in self.dsk_on and action in ("on", "off", "auto", "take"):
+                self.dsk_on[dsk] = action == "on" or (action in ("auto", "take") and not self.dsk_on[dsk])
+                return {"switcher", "tally"}
+        if name in ("main_ftb_auto", "main_ftb_take"):
+            if self.program == "black":
+                self.program = self._before_black
+            else:
+                self._before_black, self.program = self.program, "black"
+            return {"switcher", "tally"}
+        if name.startswith("ddr") and name[3:4].isdigit() and int(name[3]) in self.ddrs:
+            ddr, action = self.ddrs[int(name[3])], name[5:]
+            if action == "play":
+                ddr.set_speed(1.0)
+                return {"ddr_timecode"}
+            if action in ("stop", "pause"):
+                ddr.set_speed(0.0)
+                return {"ddr_timecode"}
+            if action == "loop_mode_toggle":
+                ddr.loop = value in ("true", "1")
+            elif action == "autoplay_mode_toggle":
+                ddr.autoplay = value in ("true", "1")
+        if value is None:
+            return set()
+        self.shortcuts[name] = value
+        return {"shortcut_states"}
+
+    def dictionary(self, key: str) -> str | None:
+        """Render a dictionary as the unit would, or None if the key is unknown.
+
+        Renders are kept until a change touches the family, so large padded
+        dictionaries cost the simulator nothing on repeat reads.
+        """
+        xml = self._rendered.get(key)
+        if xml is not None:
+            return xml
+        family, _, arg = key.partition(":")
+        render = getattr(self, f"_render_{family}", None)
+        if render is None:
+            return None
+        xml = render(arg)
+        if family not in _LIVE_FAMILIES:
+            self._rendered[key] = xml
+        return xml
+
+    def changed(self, families: set[str]) -> None:
+        """Forget renders of the given dictionary families."""
+        for key in [k for k in self._rendered if k.partition(":")[0] in families]:
+            del self._rendered[key]
+
+    def _render_tally(self, _: str) -> str:
+        columns = "".join(
+            f'<column index="{i}" name="{name}" on_pgm="{str(self._on_program(name)).lower()}" '
+            f'on_prev="{str(name == self.preview).lower()}" />'
+            for i, name in enumerate(self.sources)
+        )
+        return f"<tally>{columns}</tally>"
+
+    def _on_program(self, name: str) -> bool:
+        keyed = {f"gfx{n}" for n, on in self.dsk_on.items() if on}
+        return name == self.program or name in keyed
+
+    def _render_switcher(self, _: str) -> str:
+        inputs = "".join(
+            f'<physical_input physical_input_number="{name.capitalize()}" iso_label={quoteattr(label)} />'
+            for name, label in self.labels.items()
+        )
+        overlays = "".join(
+            f'<overlay source="GFX{n}" effect=""><tbar position="{1 if on else 0}" /></overlay>'
+            for n, on in self.dsk_on.items()
+        )
+        return (
+            f'<switcher_update main_source="{self.program.upper()}" preview_source="{self.preview.upper()}" '
+            f"effect={quoteattr(self.effect)}><inputs>{inputs}</inputs><tbar position=\"{self.tbar:g}\" />"
+            f"<switcher_overlays>{overlays}</switcher_overlays></switcher_update>"
+        )
+
+    def _render_shortcut_states(self, _: str) -> str:
+        entries = "".join(
+            f"<shortcut_state name={quoteattr(name)} value={quoteattr(value)} />"
+            for name, value in self.shortcuts.items()
+        )
+        return f"<shortcut_states>{entries}</shortcut_states>"
+
+    def _render_ddr_timecode(self, _: str) -> str:
+        players = []
+        for n, ddr in self.ddrs.items():
+            elapsed = ddr.elapsed()
+            players.append(
+                f'<ddr{n} clip_seconds_elapsed="{elapsed:.3f}" clip_seconds_remaining="{ddr.duration - elapsed:.3f}" '
+                f'file_duration="{ddr.duration:.3f}" play_speed="{ddr.speed:g}" num_clips="{ddr.num_clips}" '
+                f'clip_index="{ddr.clip_index}" clip_framerate="29.97" />'
+            )
+        return f"<timecode>{''.join(players)}</timecode>"
+
+    def _render_session(self, _: str) -> str:
+        return f'<session framerate="{self.frame_rate:g}" />'
+
+    def _render_audiomixer(self, _: str) -> str:
+        channels = "".join(
+            f'<channel name="{name}" display_name={quoteattr(self.labels.get(name, name.upper()))} />'
+            for name in self.channels
+        )
+        return f"<audiomixer>{channels}</audiomixer>"
+
+    def _render_macros_list(self, _: str) -> str:
+        macros = "".join(f"<macro name={quoteattr(name)} id={quoteattr(id_)} />" for name, id_ in self.macros)
+        return f"<macros><systemfolder>{macros}</systemfolder></macros>"
+
+    def _render_filebrowser(self, folder: str) -> str:
+        if not self.nested:
+            files = "".join(
+                f"<file path={quoteattr(path)} name={quoteattr(name)} />"
+                for path, name in self.files
+                if path.startswith(folder)
+            )
+            return f"<media><clips>{files}</clips></media>"
+        folder = folder.rstrip("\\")
+        prefix = folder + "\\" if folder else ""
+        own, subfolders = [], {}
+        for path, name in self.files:
+            if not path.startswith(prefix):
+                continue
+            rest = path[len(prefix):]
+            if "\\" not in rest:
+                own.append(f"<file path={quoteattr(path)} name={quoteattr(name)} />")
+            else:
+                child = prefix + rest.split("\\", 1)[0]
+                subfolders[child] = zlib.crc32(f"{path}\0{name}\0".encode(), subfolders.get(child, 0))
+        folders = "".join(
+            f'<folder path={quoteattr(path)} name={quoteattr(name)} modified="{stamp}" />'
+            for path, name, stamp in sorted((p, p.rpartition("\\")[2], c) for p, c in subfolders.items())
+        )
+        return f"<media><folders>{folders}</folders><clips>{''.join(own)}</clips></media>"
+
+    def _render_switcher_ui_effects(self, _: str) -> str:
+        return '<effects><effect name="Crossfade" /><effect name="Wipe" /><effect name="Push" /></effects>'
+
+    def render_datalink(self) -> str:
+        entries = "".join(f"<entry key={quoteattr(k)} value={quoteattr(v)} />" for k, v in self.datalink.items())
+        return f"<datalink>{entries}</datalink>"
+
+
+# ---------------------------------------------------------------------------
+# HTTP / WebSocket front end
+# ---------------------------------------------------------------------------
+
+class Simulator:
+    """Serve a ``SimulatedShow`` over the TriCaster HTTP API.
+
+    ``latency`` (plus up to ``jitter``, uniformly distributed) seconds are added
+    before every HTTP response. With ``http10`` the simulator answers like older
+    firmware: HTTP/1.0, no Content-Length, one request per connection.
+    ``timecode_interval`` is how often ``ddr_timecode`` change notifications are
+    pushed while a DDR is playing (0 to disable).
+
+    A ``drop`` fraction of requests are processed but never answered, as when a
+    response is lost on the network. A ``slow`` fraction are answered
+    ``slow_delay`` seconds late. While ``offline`` is set, nothing is answered at
+    all, like a unit whose cable was pulled.
+    """
+
+    def __init__(
+        self,
+        show: SimulatedShow | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        http10: bool = False,
+        timecode_interval: float = 0.5,
+        seed: int | None = None,
+        drop: float = 0.0,
+        slow: float = 0.0,
+        slow_delay: float = 1.0,
+    ):
+        self.show = show or SimulatedShow()
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.http10 = http10
+        self.timecode_interval = timecode_interval
+        self.drop = drop
+        self.slow = slow
+        self.slow_delay = slow_delay
+        self.offline = False
+        self.stats = {"requests": 0, "connections": 0, "bytes_sent": 0, "notifications": 0, "dropped": 0}
+        self._random = random.Random(seed)
+        self._server: asyncio.base_events.Server | None = None
+        self._subscribers: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self._ticker: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.timecode_interval > 0:
+            self._ticker = asyncio.create_task(self._tick_timecode())
+
+    async def close(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "Simulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def notify(self, keys: set[str]) -> None:
+        """Push a change notification naming ``keys`` to every subscriber."""
+        if not keys:
+            return
+        frame = _ws_frame(0x1, " ".join(sorted(keys)).encode())
+        for writer in list(self._subscribers):
+            if writer.is_closing():
+                self._subscribers.discard(writer)
+                continue
+            writer.write(frame)
+            self.stats["notifications"] += 1
+
+    async def _tick_timecode(self) -> None:
+        while True:
+            await asyncio.sleep(self.timecode_interval)
+            if any(ddr.speed for ddr in self.show.ddrs.values()):
+                self.notify({"ddr_timecode"})
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while request_line := await reader.readline():
+                parts = request_line.decode("latin-1").split()
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, "malformed request line", close=True)
+                    return
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                url = urlparse(parts[1])
+                if url.path == "/v1/change_notifications" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._subscribe(reader, writer, headers)
+                    return
+                self.stats["requests"] += 1
+                if self.offline:
+                    self.stats["dropped"] += 1
+                    await reader.read()  # hold the connection silently until the client gives up
+                    return
+                status, payload = self._route(url.path, parse_qs(url.query), body)
+                if self._random.random() < self.drop:
+                    self.stats["dropped"] += 1
+                    await reader.read()
+                    return
+                close = self.http10 or headers.get("connection", "").lower() == "close"
+                delay = self.latency + self._random.uniform(0, self.jitter)
+                if self._random.random() < self.slow:
+                    delay += self.slow_delay
+                await asyncio.sleep(delay)
+                await self._respond(writer, status, payload, close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # close() is shutting the simulator down
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    def _route(self, path: str, query: dict[str, list[str]], body: bytes) -> tuple[int, str]:
+        arg = {name: values[0] for name, values in query.items()}
+        if path == "/v1/version":
+            return 200, (
+                "<product_information><product_name>TriCaster Simulator</product_name>"
+                "<product_version>8-5</product_version><session_name>simulated</session_name>"
+                "<resolution>1920x1080</resolution></product_information>"
+            )
+        if path == "/v1/shortcut":
+            if "name" not in arg:
+                return 400, "missing shortcut name"
+            self.notify(self.show.shortcut(arg["name"], arg.get("value")))
+            return 200, ""
+        if path == "/v1/dictionary":
+            xml = self.show.dictionary(arg.get("key", ""))
+            return (200, xml) if xml is not None else (404, f"unknown dictionary {arg.get('key')!r}")
+        if path == "/v1/trigger":
+            if "name" not in arg:
+                return 400, "missing trigger name"
+            self.show.fired.append((arg["name"], arg.get("value")))
+            return 200, ""
+        if path == "/v1/datalink":
+            if "key" in arg and "value" in arg:
+                self.show.datalink[arg["key"]] = arg["value"]
+                return 200, ""
+            return 200, self.show.render_datalink()
+        return 404, f"no such endpoint {path}"
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: str, close: bool) -> None:
+        body = payload.encode()
+        if self.http10:
+            head = f"HTTP/1.0 {status} {_REASONS[status]}\r\nContent-Type: text/xml\r\n\r\n"
+        else:
+            head = (
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: text/xml\r\n"
+                f"Content-Length: {len(body)}\r\n" + ("Connection: close\r\n" if close else "") + "\r\n"
+            )
+        data = head.encode("latin-1") + body
+        writer.write(data)
+        self.stats["bytes_sent"] += len(data)
+        await writer.drain()
+
+    async def _subscribe(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict[str, str]
+    ) -> None:
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + _WS_GUID).encode()).digest())
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        await writer.drain()
+        self._subscribers.add(writer)
+        try:
+            while True:
+                opcode, payload = await _read_client_frame(reader)
+                if opcode == 0x8:
+                    writer.write(_ws_frame(0x8, payload[:2]))
+                    return
+                if opcode == 0x9:
+                    writer.write(_ws_frame(0xA, payload))
+        finally:
+            self._subscribers.discard(writer)
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    """Server-to-client frames are unmasked."""
+    n = len(payload)
+    if n < 126:
+        head = bytes([0x80 | opcode, n])
+    elif n < 1 << 16:
+        head = bytes([0x80 | opcode, 126]) + n.to_bytes(2, "big")
+    else:
+        head = bytes([0x80 | opcode, 127]) + n.to_bytes(8, "big")
+    return head + payload
+
+
+async def _read_client_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    data = await reader.readexactly(length)
+    return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+async def _run(args: argparse.Namespace) -> None:
+    show = SimulatedShow(
+        inputs=args.inputs, shortcuts=args.shortcuts, files=args.files, macros=args.macros, nested=args.nested
+    )
+    simulator = Simulator(
+        show, args.host, args.port, args.latency, args.jitter, args.http10, args.timecode_interval, args.seed,
+        args.drop, args.slow, args.slow_delay,
+    )
+    async with simulator:
+        mode = "HTTP/1.0" if args.http10 else "HTTP/1.1 keep-alive"
+        print(f"Simulated TriCaster on http://{args.host}:{simulator.port} ({mode}, "
+              f"{args.latency * 1000:.0f} ms + up to {args.jitter * 1000:.0f} ms jitter)")
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument("--http10", action="store_true", help="answer like HTTP/1.0-only firmware")
+    parser.add_argument("--inputs", type=int, default=8, help="number of physical inputs")
+    parser.add_argument("--shortcuts", type=int, default=0, help="extra entries to pad shortcut_states with")
+    parser.add_argument("--files", type=int, default=50, help="clips in the filebrowser listing")
+    parser.add_argument("--macros", type=int, default=10, help="entries in macros_list")
+    parser.add_argument("--nested", action="store_true", help="list one folder level per filebrowser request")
+    parser.add_argument("--timecode-interval", type=float, default=0.5,
+                        help="seconds between ddr_timecode notifications while a DDR plays (0 disables)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the jitter generator")
+    parser.add_argument("--drop", type=float, default=0.0, help="fraction of requests never answered")
+    parser.add_argument("--slow", type=float, default=0.0, help="fraction of responses delayed by --slow-delay")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="extra seconds for slow responses")
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
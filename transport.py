@@ -0,0 +1,787 @@
+"""
+Asyncio HTTP transport for the TriCaster API.
+
+The TriCaster speaks a small subset of HTTP/1.x. This module implements just
+enough of it on top of asyncio streams that many requests can be in flight at
+once without blocking the MCP server's event loop.
+
+Connections are pooled and kept alive between requests. Units whose firmware
+only speaks HTTP/1.0 (no persistent connections) are detected from their first
+response and switched to one connection per request with ``Connection: close``.
+
+Requests queue for a connection slot by priority. On-air commands (URGENT) go
+first and may use slots held back for them. State reads (NORMAL) come next.
+Bulk reads such as file listings (BULK) go last and may fill at most half the
+slots.
+
+Every request is bounded by the client timeout and by the deadline of the call
+it is part of (``deadline()``). Idempotent reads that take longer than their
+endpoint's recent p95 are hedged: a second copy goes out on another connection
+and whichever answers first wins. After a run of connection failures the
+client's circuit breaker opens. Requests then fail at once instead of waiting
+out the timeout, while a background probe watches for the unit to come back.
+"""
+
+import asyncio
+import base64
+import hashlib
+import heapq
+import itertools
+import os
+import struct
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+# Read size when streaming a response body.
+STREAM_CHUNK = 64 * 1024
+
+# Paths whose GETs change the show (cuts, record toggles, DDR play). After a dropped connection they are
+# only resent if the request never fully went out, so a cut can't run twice.
+SIDE_EFFECT_PATHS = ("/v1/shortcut", "/v1/trigger")
+
+# Request priority classes, most urgent first.
+URGENT, NORMAL, BULK = 0, 1, 2
+PRIORITY_NAMES = ("urgent", "normal", "bulk")
+
+# Hedging: recent exchange times kept per endpoint, how many are needed before the p95 is
+# trusted (HEDGE_DEFAULT_DELAY is used until then), and the floor on the hedge delay.
+HEDGE_WINDOW = 100
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = 0.5
+HEDGE_MIN_DELAY = 0.02
+# Hedges earned per hedgeable request, and how many may be banked: at most ~10% extra load.
+HEDGE_BUDGET = (0.1, 10.0)
+
+# Consecutive connection failures (timeouts, refused or reset connections) that open the breaker,
+# and the range the background probe interval backs off within while it is open (seconds).
+BREAKER_THRESHOLD = 3
+BREAKER_PROBE_INTERVAL = (0.5, 10.0)
+
+# Monotonic time by which the current call must be finished; None for no deadline.
+_deadline: ContextVar[float | None] = ContextVar("tricaster_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None, detach: bool = False) -> Iterator[None]:
+    """Bound every request made inside the block to finish within ``seconds`` from now.
+
+    Nested deadlines only ever tighten. ``detach`` starts afresh instead, for background
+    work (cues, ramps) that outlives the call that started it; ``seconds=None`` then means none.
+    """
+    current = None if detach else _deadline.get()
+    new = current if seconds is None else time.monotonic() + seconds
+    if current is not None and new is not None:
+        new = min(current, new)
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Seconds until the current call's deadline, or None if it has none."""
+    due = _deadline.get()
+    return None if due is None else due - time.monotonic()
+
+
+class CircuitOpenError(ConnectionError):
+    """The unit has been unreachable; requests fail fast until a probe gets through."""
+
+
+class _StaleConnection(ConnectionError):
+    """A pooled connection was closed by the TriCaster before it answered."""
+
+
+class _ExchangeTimeout(TimeoutError):
+    """The unit didn't answer within the time the request had once it held a connection slot."""
+
+    def __init__(self, budget: float):
+        super().__init__()
+        self.budget = budget
+
+
+class _Connection:
+    """One open socket to the TriCaster."""
+
+    __slots__ = ("reader", "writer", "last_used")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def is_stale(self, idle_timeout: float) -> bool:
+        """True if the peer has hung up or the socket sat idle for too long."""
+        return (
+            self.reader.at_eof()
+            or self.writer.is_closing()
+            or time.monotonic() - self.last_used > idle_timeout
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _Lanes:
+    """Connection slots handed out by priority.
+
+    ``reserved`` slots can only be taken by URGENT requests, and BULK requests may
+    hold at most ``bulk_limit`` slots, so neither a burst of reads nor a file
+    listing can make a cut wait for a connection.
+    """
+
+    def __init__(self, capacity: int, reserved: int, bulk_limit: int):
+        self.capacity = capacity
+        self.reserved = min(reserved, capacity - 1)
+        self.bulk_limit = max(bulk_limit, 1)
+        self.active = [0, 0, 0]
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _can_take(self, priority: int) -> bool:
+        free = self.capacity - sum(self.active)
+        if priority == URGENT:
+            return free > 0
+        if priority == BULK and self.active[BULK] >= self.bulk_limit:
+            return False
+        return free > self.reserved
+
+    async def acquire(self, priority: int) -> None:
+        self._drop_cancelled()
+        if (not self._waiters or self._waiters[0][0] > priority) and self._can_take(priority):
+            self.active[priority] += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(priority)  # granted just as we were cancelled
+            raise
+
+    def release(self, priority: int) -> None:
+        self.active[priority] -= 1
+        self._drop_cancelled()
+        # Strict priority: a waiter that can't run yet holds back everything queued behind it,
+        # except that URGENT waiters are always considered first by the heap order.
+        while self._waiters and self._can_take(self._waiters[0][0]):
+            priority, _, future = heapq.heappop(self._waiters)
+            self.active[priority] += 1
+            future.set_result(None)
+            self._drop_cancelled()
+
+    def _drop_cancelled(self) -> None:
+        while self._waiters and self._waiters[0][2].cancelled():
+            heapq.heappop(self._waiters)
+
+
+class TriCasterClient:
+    """Async HTTP client for a single TriCaster unit, with a keep-alive connection pool."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 80,
+        timeout: float = 5.0,
+        max_connections: int = 6,
+        idle_timeout: float = 15.0,
+        metrics=None,
+        classify: Callable[[str, str], int] | None = None,
+        reserved_connections: int = 1,
+        hedge: Callable[[str, str], bool] | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        # Optional sink with observe_request(path, seconds, nbytes, error) and
+        # observe_queue_wait(priority_name, seconds); see metrics.Metrics.
+        self.metrics = metrics
+        # (method, path) -> URGENT / NORMAL / BULK; everything is NORMAL without one.
+        self.classify = classify
+        # (method, path) -> whether the request is idempotent and may be hedged.
+        self.hedge = hedge
+        # None until the first response tells us whether the unit supports keep-alive.
+        self.keepalive: bool | None = None
+        self.stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "stale_discarded": 0,
+            "reconnects": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "breaker_opened": 0,
+            "fast_failures": 0,
+        }
+        self._idle: list[_Connection] = []
+        self._lanes = _Lanes(max_connections, reserved_connections, max_connections // 2)
+        self._samples: dict[str, deque[float]] = {}  # endpoint -> recent exchange seconds
+        self._hedge_tokens = HEDGE_BUDGET[1]
+        self._failures = 0
+        self._last_failure: str | None = None
+        self._opened_at: float | None = None
+        self._probe: asyncio.Task | None = None
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._opened_at is not None
+
+    async def get(self, path: str) -> str:
+        """Send an HTTP GET and return the decoded response body."""
+        return await self.request("GET", path)
+
+    async def post(self, path: str, body: str) -> str:
+        """Send an HTTP POST (XML shortcut) and return the decoded response body."""
+        return await self.request("POST", path, body.encode("utf-8"), content_type="text/xml")
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None = None,
+        content_type: str | None = None,
+    ) -> str:
+        """Perform one request/response exchange, bounded by ``self.timeout`` and the call's deadline.
+
+        The wait for a connection slot is bounded by the deadline alone, and only a unit that
+        doesn't answer once the request holds a slot counts towards the circuit breaker.
+        """
+        start = time.perf_counter()
+        try:
+            self._check_breaker()
+            if self.hedge is not None and self.hedge(method, path):
+                payload = await self._hedged(method, path, body, content_type)
+            else:
+                payload = await self._attempt(method, path, body, content_type)
+        except TimeoutError as e:
+            error = self._timeout_error(start)
+            # Only the unit not answering counts; running out of deadline in the queue says nothing about it.
+            if isinstance(e, _ExchangeTimeout) and e.budget > 0:
+                self._failed(error)
+            self._observe(path, start, 0, error)
+            raise error from None
+        except Exception as e:
+            if isinstance(e, OSError) and not isinstance(e, CircuitOpenError):
+                self._failed(e)
+            self._observe(path, start, 0, e)
+            raise
+        self._succeeded()
+        self._observe(path, start, len(payload))
+        return payload.decode("utf-8", errors="replace").strip()
+
+    @asynccontextmanager
+    async def stream(self, path: str) -> AsyncIterator["_Body"]:
+        """GET ``path`` and yield its body as an async iterator of byte chunks.
+
+        Each chunk must arrive within ``self.timeout``. Leaving the block before
+        the body is exhausted closes the connection instead of returning it to the pool.
+        """
+        start = time.perf_counter()
+        self._check_breaker()
+        async with AsyncExitStack() as stack:
+            try:
+                await stack.enter_async_context(self._slot("GET", path))
+            except TimeoutError:  # the call's deadline ran out in the queue
+                error = self._timeout_error(start)
+                self._observe(path, start, 0, error)
+                raise error from None
+            self.stats["requests"] += 1
+            request = _build_request(self.host, "GET", path, None, None, self.keepalive is not False)
+            budget = self._budget()  # after the queue wait, which may have used up most of the deadline
+            try:
+                async with asyncio.timeout(budget):
+                    conn, version, headers = await self._start(request, idempotent=True)
+            except TimeoutError:
+                error = self._timeout_error(start)
+                if budget > 0:  # as in request(): an expired deadline says nothing about the unit
+                    self._failed(error)
+                self._observe(path, start, 0, error)
+                raise error from None
+            except Exception as e:
+                if isinstance(e, OSError) and not isinstance(e, CircuitOpenError):
+                    self._failed(e)
+                self._observe(path, start, 0, e)
+                raise
+            self._succeeded()
+            body = _Body(conn.reader, headers, self.timeout)
+            try:
+                yield body
+            except BaseException as e:
+                conn.close()
+                self._observe(path, start, body.bytes, e if isinstance(e, Exception) else None)
+                raise
+            self._observe(path, start, body.bytes)
+            if body.done:
+                self._release(conn, version, headers)
+            else:
+                conn.close()
+
+    @asynccontextmanager
+    async def _slot(self, method: str, path: str) -> AsyncIterator[None]:
+        """Hold a connection slot for the request's priority class, timing the wait for it.
+
+        The wait is bounded by the call's deadline (TimeoutError), never by the request timeout.
+        """
+        priority = self.classify(method, path) if self.classify is not None else NORMAL
+        queued = time.perf_counter()
+        left = time_left()
+        async with asyncio.timeout(None if left is None else max(left, 0)):
+            await self._lanes.acquire(priority)
+        if self.metrics is not None:
+            self.metrics.observe_queue_wait(PRIORITY_NAMES[priority], time.perf_counter() - queued)
+        try:
+            yield
+        finally:
+            self._lanes.release(priority)
+
+    def _observe(self, path: str, start: float, nbytes: int, error: BaseException | None = None) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_request(path, time.perf_counter() - start, nbytes, error)
+
+    def _budget(self) -> float:
+        """Seconds this request may take: the client timeout, or less if the call's deadline is nearer."""
+        left = time_left()
+        return self.timeout if left is None else max(min(self.timeout, left), 0)
+
+    def _timeout_error(self, start: float) -> TimeoutError:
+        waited = time.perf_counter() - start
+        if waited < self.timeout - 0.01:
+            return TimeoutError(f"no response from {self.host}:{self.port} before the call's deadline "
+                                f"({waited:.2f}s)")
+        return TimeoutError(f"no response from {self.host}:{self.port} within {self.timeout}s")
+
+    async def _attempt(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None,
+        content_type: str | None,
+        sending: asyncio.Event | None = None,
+    ) -> bytes:
+        """One exchange on a connection slot, timed for the endpoint's hedge delay.
+
+        ``sending`` is set once the slot is held, i.e. when queueing is over. The exchange
+        gets ``self.timeout`` (or what is left of the call's deadline) from then on.
+        """
+        async with self._slot(method, path):
+            if sending is not None:
+                sending.set()
+            began = time.perf_counter()
+            samples = self._samples.setdefault(_endpoint(path), deque(maxlen=HEDGE_WINDOW))
+            budget = self._budget()
+            try:
+                async with asyncio.timeout(budget):
+                    payload = await self._exchange(method, path, body, content_type)
+            except TimeoutError:
+                raise _ExchangeTimeout(budget) from None
+            except asyncio.CancelledError:
+                # A hedge loser still took at least this long; leaving it out would bias the p95 low.
+                samples.append(time.perf_counter() - began)
+                raise
+        samples.append(time.perf_counter() - began)
+        return payload
+
+    async def _hedged(self, method: str, path: str, body: bytes | None, content_type: str | None) -> bytes:
+        """Send the request, and a second copy if the first is slower than the endpoint's p95."""
+        earn, cap = HEDGE_BUDGET
+        self._hedge_tokens = min(self._hedge_tokens + earn, cap)
+        sending = asyncio.Event()
+        first = asyncio.create_task(self._attempt(method, path, body, content_type, sending))
+        tasks = {first}
+        try:
+            # Time the hedge from when the request went out: a copy can't beat a queue it would join.
+            started = asyncio.create_task(sending.wait())
+            await asyncio.wait({first, started}, return_when=asyncio.FIRST_COMPLETED)
+            started.cancel()
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(path))
+            left = time_left()
+            if not done and self._hedge_tokens >= 1 and (left is None or left > 0):
+                self._hedge_tokens -= 1
+                self.stats["hedged"] += 1
+                tasks.add(asyncio.create_task(self._attempt(method, path, body, content_type)))
+            while True:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+                if not tasks:
+                    raise error
+        finally:
+            # The loser's connection is closed rather than returned mid-response.
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self, path: str) -> float:
+        samples = self._samples.get(_endpoint(path))
+        if samples is None or len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(samples)
+        return max(ordered[int(0.95 * (len(ordered) - 1))], HEDGE_MIN_DELAY)
+
+    def _check_breaker(self) -> None:
+        if self._opened_at is not None:
+            self.stats["fast_failures"] += 1
+            raise CircuitOpenError(
+                f"{self.host}:{self.port} unreachable for {time.monotonic() - self._opened_at:.0f}s "
+                f"(last error: {self._last_failure}); failing fast until it answers again"
+            )
+
+    def _failed(self, error: BaseException) -> None:
+        self._failures += 1
+        self._last_failure = str(error) or type(error).__name__
+        if self._failures >= BREAKER_THRESHOLD and self._opened_at is None:
+            self._opened_at = time.monotonic()
+            self.stats["breaker_opened"] += 1
+            self._probe = asyncio.create_task(self._probe_until_up())
+
+    def _succeeded(self) -> None:
+        self._failures = 0
+
+    async def _probe_until_up(self) -> None:
+        """While the breaker is open, try ``/v1/version`` with backoff; close the breaker once it answers."""
+        interval, longest = BREAKER_PROBE_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with asyncio.timeout(self.timeout):
+                    await self._exchange("GET", "/v1/version", None, None)
+            except (OSError, TimeoutError) as e:
+                self._last_failure = str(e) or type(e).__name__
+                interval = min(interval * 2, longest)
+                continue
+            self._failures = 0
+            self._opened_at = None
+            self._probe = None
+            return
+
+    async def warm(self) -> bool:
+        """Make sure a live idle connection is waiting for the next request.
+
+        Used ahead of time-critical requests so they don't pay for the TCP handshake.
+        Returns True if a connection had to be opened.
+        """
+        self._check_breaker()
+        for conn in [c for c in self._idle if c.is_stale(self.idle_timeout)]:
+            self._idle.remove(conn)
+            self.stats["stale_discarded"] += 1
+            conn.close()
+        if self._idle:
+            return False
+        async with asyncio.timeout(self.timeout):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.stats["connections_opened"] += 1
+        self._idle.append(_Connection(reader, writer))
+        return True
+
+    async def close(self) -> None:
+        """Close every idle pooled connection and stop probing."""
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+        while self._idle:
+            conn = self._idle.pop()
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _exchange(self, method: str, path: str, body: bytes | None, content_type: str | None) -> bytes:
+        """Send the request on a pooled connection and read the whole response."""
+        self.stats["requests"] += 1
+        request = _build_request(self.host, method, path, body, content_type, self.keepalive is not False)
+        conn, version, headers = await self._start(request, not path.startswith(SIDE_EFFECT_PATHS))
+        try:
+            payload = await _read_body(conn.reader, headers)
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn, version, headers)
+        return payload
+
+    async def _start(self, request: bytes, idempotent: bool) -> tuple[_Connection, str, dict[str, str]]:
+        """Send a request and read the response head, reconnecting if a pooled socket turns out dead.
+
+        A request that isn't ``idempotent`` is only resent if it failed before it was fully
+        written; once it may have reached the unit, the error goes to the caller.
+        """
+        while True:
+            conn, reused = await self._acquire()
+            sent = False
+            try:
+                conn.writer.write(request)
+                await conn.writer.drain()
+                sent = True
+                version, headers = await _read_head(conn.reader)
+            except (_StaleConnection, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused and (idempotent or not sent):
+                    # Most likely the unit dropped the socket while it sat idle in the pool.
+                    self.stats["reconnects"] += 1
+                    continue
+                if isinstance(e, _StaleConnection):
+                    raise ConnectionError("TriCaster closed the connection without responding") from None
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            return conn, version, headers
+
+    async def _acquire(self) -> tuple[_Connection, bool]:
+        """Return (connection, reused). Idle connections are checked for staleness first."""
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.is_stale(self.idle_timeout):
+                self.stats["stale_discarded"] += 1
+                conn.close()
+                continue
+            self.stats["connections_reused"] += 1
+            return conn, True
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.stats["connections_opened"] += 1
+        return _Connection(reader, writer), False
+
+    def _release(self, conn: _Connection, version: str, headers: dict[str, str]) -> None:
+        """Return a connection to the pool, or close it if the response ended the session."""
+        connection = headers.get("connection", "").lower()
+        framed = "content-length" in headers or headers.get("transfer-encoding", "").lower() == "chunked"
+        if (version == "HTTP/1.0" and connection != "keep-alive") or not framed:
+            # The unit really needs one connection per request; stop asking for keep-alive.
+            self.keepalive = False
+        elif connection != "close":
+            self.keepalive = True
+        if self.keepalive and connection != "close" and len(self._idle) < self.max_connections:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+
+def _endpoint(path: str) -> str:
+    """Group a request path for latency tracking: endpoint plus dictionary family."""
+    endpoint, _, query = path.partition("?")
+    key = parse_qs(query).get("key", [""])[0].split(":", 1)[0]
+    return f"{endpoint}?key={key}" if key else endpoint
+
+
+# ---------------------------------------------------------------------------
+# WebSocket (change notifications)
+# ---------------------------------------------------------------------------
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebSocket:
+    """Minimal client side of RFC 6455, enough to receive text notifications."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def recv(self) -> str:
+        """Return the next text (or binary) message. Raises ConnectionError once the peer closes."""
+        fragments: list[bytes] = []
+        while True:
+            fin, opcode, payload = await self._read_frame()
+            if opcode == 0x8:
+                raise ConnectionError("TriCaster closed the notification socket")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            fragments.append(payload)
+            if fin:
+                return b"".join(fragments).decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        if not self.writer.is_closing():
+            self._send_frame(0x8, b"")
+            self.writer.close()
+
+    async def _read_frame(self) -> tuple[bool, int, bytes]:
+        b0, b1 = await self.reader.readexactly(2)
+        length = b1 & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await self.reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await self.reader.readexactly(8))
+        mask = await self.reader.readexactly(4) if b1 & 0x80 else None
+        payload = await self.reader.readexactly(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return bool(b0 & 0x80), b0 & 0x0F, payload
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        # Client-to-server frames must be masked.
+        mask = os.urandom(4)
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([0x80 | len(payload)])
+        elif len(payload) < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack("!H", len(payload))
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", len(payload))
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.writer.write(header + mask + masked)
+
+
+async def open_websocket(host: str, port: int, path: str, timeout: float = 5.0) -> WebSocket:
+    """Perform the WebSocket upgrade handshake and return the open socket."""
+    async with asyncio.timeout(timeout):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            key = base64.b64encode(os.urandom(16)).decode()
+            writer.write(
+                (
+                    f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n"
+                    f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                    "Sec-WebSocket-Version: 13\r\n\r\n"
+                ).encode("latin-1")
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            headers: dict[str, str] = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            expected = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+            if status_line.split()[1:2] != [b"101"] or headers.get("sec-websocket-accept") != expected:
+                raise ConnectionError(f"WebSocket upgrade refused: {status_line.decode('latin-1').strip()}")
+        except BaseException:
+            writer.close()
+            raise
+    return WebSocket(reader, writer)
+
+
+# ---------------------------------------------------------------------------
+# HTTP/1.x wire format
+# ---------------------------------------------------------------------------
+
+def _build_request(
+    host: str,
+    method: str,
+    path: str,
+    body: bytes | None,
+    content_type: str | None,
+    keepalive: bool,
+) -> bytes:
+    """Serialise a request, asking for keep-alive unless the unit is HTTP/1.0-only."""
+    lines = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {host}",
+        f"Connection: {'keep-alive' if keepalive else 'close'}",
+    ]
+    if body is not None:
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        lines.append(f"Content-Length: {len(body)}")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head + body if body is not None else head
+
+
+class _Body:
+    """Async iterator over a streamed response body."""
+
+    def __init__(self, reader: asyncio.StreamReader, headers: dict[str, str], timeout: float):
+        self._chunks = _iter_body(reader, headers)
+        self._timeout = timeout
+        self.done = False
+        self.bytes = 0
+
+    def __aiter__(self) -> "_Body":
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            async with asyncio.timeout(self._timeout):
+                chunk = await anext(self._chunks)
+            self.bytes += len(chunk)
+            return chunk
+        except StopAsyncIteration:
+            self.done = True
+            raise
+        except TimeoutError:
+            raise TimeoutError(f"TriCaster stalled mid-response for {self._timeout}s") from None
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[str, dict[str, str]]:
+    """Read the status line and headers; return (http_version, lower-cased headers)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise _StaleConnection()
+    parts = status_line.decode("latin-1").split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"Malformed status line from TriCaster: {status_line!r}")
+    version = parts[0]
+
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return version, headers
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: dict[str, str]) -> bytes:
+    """Read a whole response body framed by ``headers``."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        return await _read_chunked(reader)
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    # HTTP/1.0 style: the body runs until the server closes the socket.
+    return await reader.read()
+
+
+async def _iter_body(reader: asyncio.StreamReader, headers: dict[str, str]) -> AsyncIterator[bytes]:
+    """Yield a response body piece by piece as it arrives."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            yield await reader.readexactly(size)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining:
+            chunk = await reader.read(min(remaining, STREAM_CHUNK))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        while chunk := await reader.read(STREAM_CHUNK):
+            yield chunk
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    """Decode a chunked transfer-encoded body."""
+    chunks = []
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+        if size == 0:
+            # Consume optional trailers up to the terminating blank line.
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
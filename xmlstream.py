@@ -0,0 +1,79 @@
+"""
+Incremental XML scanning for large TriCaster dictionaries.
+
+``filebrowser`` and ``shortcut_states`` can hold tens of thousands of elements,
+while the tools only need a few attributes from each. ``ElementScanner`` feeds
+bytes to an ``XMLPullParser`` as they arrive and reports each element's tag and
+attributes at its start tag, discarding parsed elements as it goes. The full
+tree is never built and callers can stop as soon as they have what they need.
+"""
+
+import xml.etree.ElementTree as ET
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+
+from metrics import parsing
+
+# Feed size when scanning an in-memory document.
+CHUNK_SIZE = 64 * 1024
+
+
+class ElementScanner:
+    """Push bytes in, get (tag, attrib) out for matching elements; no tree is retained."""
+
+    def __init__(self, tags: set[str] | None = None, depth: int | None = None):
+        self.tags = tags
+        self.depth = depth
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._open: list[ET.Element] = []
+
+    def feed(self, data: bytes | str) -> list[tuple[str, dict[str, str]]]:
+        """Parse another chunk and return the matching elements it started. Raises ET.ParseError."""
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> list[tuple[str, dict[str, str]]]:
+        """Signal end of input. Raises ET.ParseError if the document is incomplete."""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> list[tuple[str, dict[str, str]]]:
+        found = []
+        for event, el in self._parser.read_events():
+            if event == "end":
+                self._open.pop()
+                continue
+            level = len(self._open)
+            if (self.depth is None or level == self.depth) and (self.tags is None or el.tag in self.tags):
+                found.append((el.tag, el.attrib))
+            self._open.append(el)
+        # Drop every completed element. Only children are removed, so the attrib
+        # dicts handed out above stay intact.
+        for el in self._open:
+            del el[:]
+        return found
+
+
+def scan_text(
+    xml: str, tags: set[str] | None = None, depth: int | None = None
+) -> Iterator[tuple[str, dict[str, str]]]:
+    """Scan an in-memory document chunk by chunk. Raises ET.ParseError on malformed XML."""
+    scanner = ElementScanner(tags, depth)
+    for start in range(0, len(xml), CHUNK_SIZE):
+        yield from scanner.feed(xml[start:start + CHUNK_SIZE])
+    yield from scanner.close()
+
+
+async def scan_stream(
+    chunks: AsyncIterable[bytes], tags: set[str] | None = None, depth: int | None = None
+) -> AsyncIterator[tuple[str, dict[str, str]]]:
+    """Scan a document as its bytes arrive. Stop iterating to abandon the rest of the body."""
+    scanner = ElementScanner(tags, depth)
+    async for chunk in chunks:
+        with parsing():
+            found = scanner.feed(chunk)
+        for item in found:
+            yield item
+    with parsing():
+        found = scanner.close()
+    for item in found:
+        yield item